@@ -0,0 +1,324 @@
+"""Process-wide metrics for calls made to the RealEstateAPI.
+
+Every request made through reapi_client records its latency, response size,
+records per page and status here. The metrics are shared by all Streamlit
+sessions in the server process and are exposed both as an in-app
+diagnostics panel and as Prometheus text on ``/metrics`` (port set with
+``REAPI_METRICS_PORT``, 0 disables it). The endpoint listens on
+``REAPI_METRICS_HOST``, localhost by default, as the metrics describe the
+server's API usage; set it to ``0.0.0.0`` only behind a firewall or proxy.
+"""
+import bisect
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRICS_HOST = os.environ.get("REAPI_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("REAPI_METRICS_PORT", "9464"))
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7)
+RECORDS_BUCKETS = (0, 1, 10, 50, 100, 250, 500, 1000)
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return dict(self._values)
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.samples().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set."""
+
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {
+                    "counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0
+                }
+            state["counts"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def samples(self):
+        with self._lock:
+            return {
+                key: {"counts": list(state["counts"]), "sum": state["sum"], "count": state["count"]}
+                for key, state in self._values.items()
+            }
+
+    def quantile(self, q, **labels):
+        """Estimates a quantile by interpolating within the matching bucket."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        state = self.samples().get(key)
+        if not state or not state["count"]:
+            return None
+        rank = q * state["count"]
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets + (float("inf"),), state["counts"]):
+            if count and seen + count >= rank:
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return lower
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, state in sorted(self.samples().items()):
+            cumulative = 0
+            for upper, count in zip(self.buckets + (float("inf"),), state["counts"]):
+                cumulative += count
+                le = "+Inf" if upper == float("inf") else _format_number(upper)
+                labels = _format_labels(self.labelnames + ("le",), key + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{value}"'.replace("\n", " ") for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+# --- Metric Definitions ---
+
+REQUEST_SECONDS = Histogram(
+    "reapi_request_duration_seconds",
+    "Latency of RealEstateAPI requests, including retries.",
+    LATENCY_BUCKETS,
+    ("endpoint",),
+)
+RESPONSE_BYTES = Histogram(
+    "reapi_response_bytes",
+    "Size of decoded RealEstateAPI response bodies.",
+    BYTES_BUCKETS,
+    ("endpoint",),
+)
+RESPONSE_WIRE_BYTES = Histogram(
+    "reapi_response_wire_bytes",
+    "Bytes of RealEstateAPI response bodies received on the wire, before decompression.",
+    BYTES_BUCKETS,
+    ("endpoint",),
+)
+PAGE_RECORDS = Histogram(
+    "reapi_page_records",
+    "Number of records returned per page.",
+    RECORDS_BUCKETS,
+    ("endpoint",),
+)
+REQUESTS_TOTAL = Counter(
+    "reapi_requests_total",
+    "RealEstateAPI requests by final HTTP status ('error' for transport failures).",
+    ("endpoint", "status"),
+)
+RETRIES_TOTAL = Counter(
+    "reapi_retries_total",
+    "RealEstateAPI request attempts that were retried.",
+    ("endpoint",),
+)
+CACHE_LOOKUPS_TOTAL = Counter(
+    "reapi_cache_lookups_total",
+    "Cache lookups in front of the RealEstateAPI by result.",
+    ("cache", "result"),
+)
+COALESCED_TOTAL = Counter(
+    "reapi_coalesced_requests_total",
+    "Requests answered by joining an identical request already in flight.",
+    ("endpoint",),
+)
+
+REGISTRY = [
+    REQUEST_SECONDS,
+    RESPONSE_BYTES,
+    RESPONSE_WIRE_BYTES,
+    PAGE_RECORDS,
+    REQUESTS_TOTAL,
+    RETRIES_TOTAL,
+    CACHE_LOOKUPS_TOTAL,
+    COALESCED_TOTAL,
+]
+
+
+def observe_request(endpoint, status, seconds, response_bytes=None, records=None,
+                    wire_bytes=None):
+    """Records the outcome of one request to ``endpoint``."""
+    REQUESTS_TOTAL.inc(endpoint=endpoint, status=status)
+    REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+    if response_bytes is not None:
+        RESPONSE_BYTES.observe(response_bytes, endpoint=endpoint)
+    if wire_bytes is not None:
+        RESPONSE_WIRE_BYTES.observe(wire_bytes, endpoint=endpoint)
+    if records is not None:
+        PAGE_RECORDS.observe(records, endpoint=endpoint)
+
+
+def observe_retry(endpoint):
+    """Records that a request to ``endpoint`` is being retried."""
+    RETRIES_TOTAL.inc(endpoint=endpoint)
+
+
+def observe_cache_lookup(cache, hit):
+    """Records a hit or miss in one of the caches in front of the API."""
+    CACHE_LOOKUPS_TOTAL.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def observe_coalesced(endpoint):
+    """Records a request that shared the response of an identical in-flight one."""
+    COALESCED_TOTAL.inc(endpoint=endpoint)
+
+
+def render_prometheus():
+    """Returns all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
+
+
+def summary():
+    """Returns one row of headline numbers per endpoint."""
+    rows = []
+    statuses = REQUESTS_TOTAL.samples()
+    retries = RETRIES_TOTAL.samples()
+    latency = REQUEST_SECONDS.samples()
+    sizes = RESPONSE_BYTES.samples()
+    wire_sizes = RESPONSE_WIRE_BYTES.samples()
+    records = PAGE_RECORDS.samples()
+    for (endpoint,), state in sorted(latency.items()):
+        by_status = {status: n for (ep, status), n in statuses.items() if ep == endpoint}
+        failed = sum(n for status, n in by_status.items() if not status.startswith("2"))
+        size = sizes.get((endpoint,))
+        wire = wire_sizes.get((endpoint,))
+        page = records.get((endpoint,))
+        p50 = REQUEST_SECONDS.quantile(0.5, endpoint=endpoint)
+        p95 = REQUEST_SECONDS.quantile(0.95, endpoint=endpoint)
+        rows.append({
+            "endpoint": endpoint,
+            "requests": state["count"],
+            "failed": failed,
+            "retries": retries.get((endpoint,), 0),
+            "p50 ms": round(p50 * 1000) if p50 is not None else None,
+            "p95 ms": round(p95 * 1000) if p95 is not None else None,
+            "avg KB": round(size["sum"] / size["count"] / 1024, 1) if size else None,
+            "avg wire KB": round(wire["sum"] / wire["count"] / 1024, 1) if wire else None,
+            "compression": (
+                f"{size['sum'] / wire['sum']:.1f}x" if size and wire and wire["sum"] else None
+            ),
+            "avg records": round(page["sum"] / page["count"], 1) if page else None,
+            "statuses": ", ".join(f"{s}: {n}" for s, n in sorted(by_status.items())),
+        })
+    return rows
+
+
+def render_diagnostics_panel():
+    """Displays the API metrics inside the current Streamlit container."""
+    import streamlit as st
+
+    rows = summary()
+    if rows:
+        st.table(rows)
+    else:
+        st.write("No API requests yet.")
+    lookups = CACHE_LOOKUPS_TOTAL.samples()
+    if lookups:
+        st.table([
+            {"cache": cache, "result": result, "lookups": n}
+            for (cache, result), n in sorted(lookups.items())
+        ])
+    if _server is not None:
+        st.caption(f"Prometheus metrics: http://localhost:{_server.server_port}/metrics")
+    st.code(render_prometheus(), language="text")
+
+
+# --- Prometheus Endpoint ---
+
+_server = None
+_server_started = False
+_server_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics: " + format, *args)
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serves ``/metrics`` from a daemon thread, once per process.
+
+    Returns the server, or None when disabled or the port is already taken
+    (e.g. by another Streamlit worker on the same host).
+    """
+    global _server, _server_started
+    if not port:
+        return None
+    with _server_lock:
+        if not _server_started:
+            _server_started = True
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(
+                target=_server.serve_forever, name="reapi-metrics", daemon=True
+            ).start()
+        return _server
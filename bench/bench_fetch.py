@@ -0,0 +1,245 @@
+"""Benchmarks for the property fetch path against the local mock API.
+
+Measures, for each result-set size:
+
+* pull: end-to-end sequential paging through ``reapi_client.search_properties``
+* pull_concurrent: the same pages requested concurrently over the shared
+  pool (multiplexed over one connection when HTTP/2 is available)
+* flatten: ``flatten_property_data`` over the decoded records
+* dataframe: building the results DataFrame from the flattened rows
+* peak memory of flatten + DataFrame build (tracemalloc, separate pass)
+* json/typed decode: one response body decoded by ``json.loads`` vs.
+  ``property_model.decode_page``
+* stream_columnar: paging with records streamed straight into a
+  ``ColumnarBuilder`` and its DataFrame, plus that path's peak memory
+
+    python -m bench.bench_fetch --sizes 1000 10000 100000
+    python -m bench.bench_fetch --compare bench/results/<old-commit>.json
+
+Results are written to ``bench/results/<commit>.json`` so runs on different
+commits can be compared; ``--compare`` exits non-zero on a regression.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+import api_metrics
+import property_model
+import reapi_client
+from bench.mock_server import MockConfig, MockServer
+from property_data import ColumnarBuilder, flatten_property_data
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# Lower is better for every metric except the throughput ones
+HIGHER_IS_BETTER = {"pull_records_per_second", "pull_mb_per_second"}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def timed(function, repeat):
+    """Returns (median seconds, last result) of calling ``function`` ``repeat`` times."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def pull_all(page_size):
+    """Pages through the whole mock result set like a full pull would."""
+    records = []
+    result_index = 0
+    while True:
+        payload = {"count": False, "size": page_size, "resultIndex": result_index}
+        data = reapi_client.search_properties(payload, "bench", "bench-key")
+        page = data.get("data", [])
+        records.extend(page)
+        result_index += len(page)
+        if not page or result_index >= data.get("resultCount", 0):
+            return records
+
+
+def pull_columnar(page_size):
+    """Pages through the result set, streaming records into a DataFrame."""
+    builder = ColumnarBuilder()
+    result_index = 0
+    while True:
+        payload = {"count": False, "size": page_size, "resultIndex": result_index}
+        stream = reapi_client.stream_search_properties(payload, "bench", "bench-key")
+        before = builder.rows
+        builder.extend(stream)
+        result_index += builder.rows - before
+        if builder.rows == before or result_index >= stream.meta.get("resultCount", 0):
+            return builder.to_frame()
+
+
+def pull_concurrent(page_size, total):
+    """Requests every page of a result set of ``total`` records at once."""
+    payloads = [
+        {"count": False, "size": page_size, "resultIndex": result_index}
+        for result_index in range(0, total, page_size)
+    ]
+    records = []
+    for page in reapi_client.search_properties_concurrently(payloads, "bench", "bench-key"):
+        if isinstance(page, Exception):
+            raise page
+        records.extend(page["data"])
+    return records
+
+
+def _bytes_total(histogram):
+    return sum(state["sum"] for state in histogram.samples().values())
+
+
+def bench_size(size, page_size, latency_ms, throttle_rate, repeat):
+    config = MockConfig(
+        result_count=size, max_page_size=page_size, latency_ms=latency_ms,
+        throttle_rate=throttle_rate,
+    )
+    with MockServer(config) as server:
+        reapi_client.API_BASE_URL = server.url
+        bytes_before = _bytes_total(api_metrics.RESPONSE_BYTES)
+        wire_before = _bytes_total(api_metrics.RESPONSE_WIRE_BYTES)
+        pull_seconds, records = timed(lambda: pull_all(page_size), repeat)
+        response_bytes = (_bytes_total(api_metrics.RESPONSE_BYTES) - bytes_before) / repeat
+        wire_bytes = (_bytes_total(api_metrics.RESPONSE_WIRE_BYTES) - wire_before) / repeat
+        concurrent_seconds, _ = timed(lambda: pull_concurrent(page_size, size), repeat)
+        stream_seconds, df = timed(lambda: pull_columnar(page_size), repeat)
+        del df
+        gc.collect()
+        tracemalloc.start()
+        df = pull_columnar(page_size)
+        _, stream_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del df
+
+    body = json.dumps({"data": records, "resultCount": len(records)}).encode()
+    json_decode_seconds, _ = timed(lambda: json.loads(body), repeat)
+    typed_decode_seconds, _ = timed(lambda: property_model.decode_page(body), repeat)
+    del body
+
+    flatten_seconds, rows = timed(lambda: flatten_property_data(records), repeat)
+    dataframe_seconds, df = timed(lambda: pd.DataFrame(rows), repeat)
+    del rows, df
+
+    gc.collect()
+    tracemalloc.start()
+    df = pd.DataFrame(flatten_property_data(records))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    frame_bytes = int(df.memory_usage(deep=True).sum())
+    del df
+
+    return {
+        "records": len(records),
+        "pull_seconds": pull_seconds,
+        "pull_records_per_second": len(records) / pull_seconds,
+        "pull_mb_per_second": response_bytes / pull_seconds / 1e6,
+        "pull_wire_mb": wire_bytes / 1e6,
+        "pull_decoded_mb": response_bytes / 1e6,
+        "pull_concurrent_seconds": concurrent_seconds,
+        "json_decode_seconds": json_decode_seconds,
+        "typed_decode_seconds": typed_decode_seconds,
+        "flatten_seconds": flatten_seconds,
+        "dataframe_seconds": dataframe_seconds,
+        "peak_memory_mb": peak / 1e6,
+        "dataframe_mb": frame_bytes / 1e6,
+        "stream_columnar_seconds": stream_seconds,
+        "stream_peak_memory_mb": stream_peak / 1e6,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Prints per-metric deltas and returns the list of regressions."""
+    regressions = []
+    print(f"\nComparison against {baseline['commit']} (threshold {threshold:.0%}):")
+    for size, metrics in current["results"].items():
+        old = baseline["results"].get(size)
+        if not old:
+            continue
+        for name, value in metrics.items():
+            if name == "records" or not old.get(name):
+                continue
+            change = (value - old[name]) / old[name]
+            worse = -change if name in HIGHER_IS_BETTER else change
+            flag = "REGRESSION" if worse > threshold else ""
+            print(f"  {size:>7} {name:<26} {old[name]:>12.4f} -> {value:>12.4f} {change:>+8.1%} {flag}")
+            if flag:
+                regressions.append((size, name, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the property fetch path.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--page-size", type=int, default=250)
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Simulated server latency per page")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Fraction of requests the mock answers with 429")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Results file (default bench/results/<commit>.json)")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    # Injected 429s from the mock should not add backoff time to the pull
+    reapi_client.RETRY_BACKOFF_SECONDS = 0.0
+
+    report = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "page_size": args.page_size,
+        "latency_ms": args.latency_ms,
+        "throttle_rate": args.throttle_rate,
+        "repeat": args.repeat,
+        "results": {},
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} records...", flush=True)
+        metrics = bench_size(
+            size, args.page_size, args.latency_ms, args.throttle_rate, args.repeat
+        )
+        report["results"][str(size)] = metrics
+        for name, value in metrics.items():
+            print(f"  {name:<26} {value:.4f}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
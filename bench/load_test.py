@@ -0,0 +1,209 @@
+"""Multi-session load test for the Streamlit app against the local mock API.
+
+Each simulated analyst is a Streamlit ``AppTest`` session running
+``reapi-streamlit.py`` in this process, so the numbers reflect one Streamlit
+server shared by N sessions. Sessions log in, run searches, switch display
+modes and page through results; every rerun is timed.
+
+    python -m bench.load_test --sessions 20 --iterations 5 --latency-ms 150
+
+Reports rerun latency percentiles per action, process CPU usage and RSS
+growth per session.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# The harness runs many app sessions in one process; keep the metrics
+# endpoint from binding a port.
+os.environ.setdefault("REAPI_METRICS_PORT", "0")
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import reapi_client  # noqa: E402
+from bench.mock_server import MockConfig, MockServer  # noqa: E402
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reapi-streamlit.py")
+DISPLAY_MODES = ("Table", "Map", "Charts")
+
+
+def current_rss_bytes():
+    """Resident set size of this process."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _find(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+class SimulatedSession:
+    """One analyst's browser tab driving the app through AppTest."""
+
+    def __init__(self, index, timeout, rng):
+        self.index = index
+        self.rng = rng
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.timings = []
+
+    def _timed(self, action, function):
+        started = time.perf_counter()
+        function()
+        self.timings.append((action, time.perf_counter() - started))
+        if self.app.exception:
+            raise RuntimeError(f"Session {self.index} {action}: {self.app.exception[0].message}")
+
+    def start(self):
+        self._timed("initial load", self.app.run)
+        _find(self.app.sidebar.text_input, "Enter your API key").input(f"load-key-{self.index}")
+        _find(self.app.sidebar.text_input, "Enter your User ID").input(f"load-user-{self.index}")
+        self._timed("save credentials", _find(self.app.sidebar.button, "Save Credentials").click().run)
+
+    def search(self, result_index=0):
+        _find(self.app.sidebar.number_input, "Result Index").set_value(result_index)
+        self._timed("search", _find(self.app.sidebar.button, "Search").click().run)
+
+    def switch_display_mode(self):
+        selectboxes = [s for s in self.app.selectbox if s.label == "Choose how to display the data:"]
+        if selectboxes:
+            mode = self.rng.choice(DISPLAY_MODES)
+            self._timed(f"display {mode.lower()}", selectboxes[0].select(mode).run)
+
+    def next_page(self):
+        buttons = [b for b in self.app.button if b.label == "Next Page" and not b.disabled]
+        if buttons:
+            self._timed("next page", buttons[0].click().run)
+
+
+def run_session(index, iterations, timeout, seed):
+    rng = random.Random(seed + index)
+    session = SimulatedSession(index, timeout, rng)
+    session.start()
+    for _ in range(iterations):
+        session.search(0)
+        session.switch_display_mode()
+        session.next_page()
+        session.switch_display_mode()
+    return session
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(sessions):
+    by_action = {}
+    for session in sessions:
+        for action, seconds in session.timings:
+            by_action.setdefault(action, []).append(seconds)
+    every = [seconds for timings in by_action.values() for seconds in timings]
+    by_action["all reruns"] = every
+    rows = {}
+    for action, timings in by_action.items():
+        rows[action] = {
+            "reruns": len(timings),
+            "p50_ms": percentile(timings, 0.50) * 1000,
+            "p90_ms": percentile(timings, 0.90) * 1000,
+            "p99_ms": percentile(timings, 0.99) * 1000,
+            "max_ms": max(timings) * 1000,
+            "mean_ms": statistics.fmean(timings) * 1000,
+        }
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Streamlit app with N sessions.")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=3,
+                        help="Search/display/page cycles per session")
+    parser.add_argument("--result-count", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=120.0,
+                        help="Seconds allowed for a single rerun")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        result_count=args.result_count,
+        latency_ms=args.latency_ms,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+    )
+    with MockServer(config) as server:
+        reapi_client.API_BASE_URL = server.url
+        reapi_client.RETRY_BACKOFF_SECONDS = 0.0
+
+        rss_before = current_rss_bytes()
+        cpu_before = time.process_time()
+        wall_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            futures = [
+                pool.submit(run_session, i, args.iterations, args.timeout, args.seed)
+                for i in range(args.sessions)
+            ]
+            sessions = [future.result() for future in futures]
+        wall = time.perf_counter() - wall_started
+        cpu = time.process_time() - cpu_before
+        rss_after = current_rss_bytes()
+        requests_served = server.requests_served
+
+    report = {
+        "sessions": args.sessions,
+        "iterations": args.iterations,
+        "latency_ms": args.latency_ms,
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "cpu_utilization": cpu / wall,
+        "cpu_seconds_per_session": cpu / args.sessions,
+        "rss_mb_before": rss_before / 1e6,
+        "rss_mb_after": rss_after / 1e6,
+        "rss_mb_per_session": (rss_after - rss_before) / 1e6 / args.sessions,
+        "api_requests": requests_served,
+        "reruns": summarize(sessions),
+    }
+
+    print(f"{args.sessions} sessions x {args.iterations} iterations in {wall:.1f}s "
+          f"({requests_served} API requests)")
+    print(f"CPU {cpu:.1f}s ({report['cpu_utilization']:.0%} of one core), "
+          f"{report['cpu_seconds_per_session']:.2f}s per session")
+    print(f"RSS {report['rss_mb_before']:.0f} -> {report['rss_mb_after']:.0f} MB, "
+          f"{report['rss_mb_per_session']:.1f} MB per session")
+    print(f"\n{'action':<18} {'reruns':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for action, row in report["reruns"].items():
+        print(f"{action:<18} {row['reruns']:>7} {row['p50_ms']:>9.0f} {row['p90_ms']:>9.0f} "
+              f"{row['p99_ms']:>9.0f} {row['max_ms']:>9.0f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
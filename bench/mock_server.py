@@ -0,0 +1,431 @@
+"""Local stand-in for the RealEstateAPI ``/v2/PropertySearch`` and ``/v2/PropertyDetail`` endpoints.
+
+Serves deterministic synthetic property records with the same nested shape
+as the real API, with configurable latency, page size cap, result count and
+error/429 injection. Used by the benchmarks and load tests so they never
+spend API credits.
+
+    python -m bench.mock_server --port 8787 --result-count 10000 --latency-ms 50
+
+Point the apps at it with ``REAPI_BASE_URL=http://localhost:8787``.
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATES = {
+    "FL": ("Miami", "Orlando", "Tampa", "Jacksonville"),
+    "TX": ("Houston", "Austin", "Dallas", "San Antonio"),
+    "CA": ("Los Angeles", "San Diego", "Fresno", "Sacramento"),
+    "GA": ("Atlanta", "Savannah", "Macon", "Augusta"),
+    "OH": ("Columbus", "Cleveland", "Toledo", "Dayton"),
+}
+ZIPS_PER_CITY = 5
+PROPERTY_TYPES = ("SFR", "CONDO", "MFR", "LAND", "MOBILE")
+STREETS = ("Main St", "Oak Ave", "Pine Rd", "Maple Dr", "Cedar Ln", "Elm St", "Lake Blvd")
+FIRST_NAMES = ("James", "Maria", "Robert", "Linda", "Michael", "Patricia", "David")
+LAST_NAMES = ("Smith", "Garcia", "Johnson", "Brown", "Davis", "Miller", "Wilson")
+
+
+class MockConfig:
+    """Behaviour of the stand-in API."""
+
+    def __init__(self, result_count=10000, max_page_size=250, latency_ms=0.0,
+                 latency_per_record_ms=0.0, error_rate=0.0, throttle_rate=0.0, seed=0,
+                 compress=True):
+        self.result_count = result_count
+        self.max_page_size = max_page_size
+        self.latency_ms = latency_ms
+        self.latency_per_record_ms = latency_per_record_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.seed = seed
+        self.compress = compress  # gzip bodies when the client accepts it
+
+
+def _locations():
+    """All (state, city, county, zip) combinations the universe is spread over."""
+    locations = []
+    zip_base = 10000
+    for state, cities in STATES.items():
+        for city in cities:
+            for _ in range(ZIPS_PER_CITY):
+                zip_base += 7
+                locations.append((state, city, f"{city} County", str(zip_base)))
+    return locations
+
+
+LOCATIONS = _locations()
+
+
+def make_property(index, seed=0):
+    """Builds the synthetic record at ``index``; the same index always yields the same record."""
+    rng = random.Random(seed * 1_000_003 + index)
+    state, city, county, zip_code = LOCATIONS[index % len(LOCATIONS)]
+    value = round(rng.lognormvariate(12.6, 0.5), -2)
+    mortgage = round(value * rng.uniform(0, 1.1), -2) if rng.random() < 0.7 else 0.0
+    equity = value - mortgage
+    foreclosure = rng.random() < 0.04
+    pre_foreclosure = rng.random() < 0.06
+    auction_date = (
+        (date(2024, 1, 1) + timedelta(days=rng.randrange(0, 730))).isoformat()
+        if foreclosure or rng.random() < 0.02 else None
+    )
+    house = str(rng.randrange(1, 9999))
+    street = rng.choice(STREETS)
+    owner_state = state if rng.random() < 0.8 else rng.choice(tuple(STATES))
+    return {
+        "id": str(100000000 + index),
+        "propertyId": str(100000000 + index),
+        "absenteeOwner": rng.random() < 0.3,
+        "address": {
+            "address": f"{house} {street}, {city}, {state} {zip_code}",
+            "city": city,
+            "county": county,
+            "fips": f"{12000 + index % 97:05d}",
+            "house": house,
+            "state": state,
+            "street": street,
+            "zip": zip_code,
+        },
+        "auction": auction_date is not None,
+        "auctionDate": auction_date,
+        "bathrooms": rng.choice((1, 1.5, 2, 2.5, 3, 4)),
+        "bedrooms": rng.randrange(1, 7),
+        "cashBuyer": rng.random() < 0.15,
+        "corporateOwned": rng.random() < 0.1,
+        "equity": equity > 0,
+        "equityPercent": round(100 * equity / value) if value else 0,
+        "estimatedEquity": equity,
+        "estimatedMortgageBalance": mortgage,
+        "estimatedValue": value,
+        "floodZone": rng.random() < 0.1,
+        "foreclosure": foreclosure,
+        "freeClear": mortgage == 0,
+        "highEquity": equity > 0.5 * value,
+        "inStateAbsenteeOwner": owner_state == state and rng.random() < 0.2,
+        "investorBuyer": rng.random() < 0.12,
+        "lastSaleDate": (date(1990, 1, 1) + timedelta(days=rng.randrange(0, 12400))).isoformat(),
+        "lastSaleAmount": round(value * rng.uniform(0.4, 1.0), -2),
+        "latitude": round(25 + (index % len(LOCATIONS)) * 0.15 + rng.uniform(-0.05, 0.05), 6),
+        "longitude": round(-122 + (index % len(LOCATIONS)) * 0.4 + rng.uniform(-0.05, 0.05), 6),
+        "ltv": round(100 * mortgage / value) if value else 0,
+        "lotSquareFeet": rng.randrange(1500, 40000),
+        "mailAddress": {
+            "address": f"{rng.randrange(1, 9999)} {rng.choice(STREETS)}",
+            "city": city,
+            "state": owner_state,
+            "zip": zip_code,
+        },
+        "negativeEquity": equity < 0,
+        "outOfStateAbsenteeOwner": owner_state != state,
+        "owner1FirstName": rng.choice(FIRST_NAMES),
+        "owner1LastName": rng.choice(LAST_NAMES),
+        "ownerOccupied": rng.random() < 0.6,
+        "preForeclosure": pre_foreclosure,
+        "propertyType": rng.choice(PROPERTY_TYPES),
+        "reo": rng.random() < 0.02,
+        "squareFeet": rng.randrange(600, 5000),
+        "taxLien": rng.random() < 0.03,
+        "vacant": rng.random() < 0.05,
+        "yearBuilt": rng.randrange(1900, 2024),
+        "yearsOwned": rng.randrange(0, 40),
+    }
+
+
+def make_property_detail(index, seed=0):
+    """Builds the PropertyDetail record at ``index``: the search record plus detail sections."""
+    prop = make_property(index, seed)
+    rng = random.Random(seed * 1_000_003 + index + 7_919)
+    value = prop["estimatedValue"]
+    assessed = round(value * rng.uniform(0.6, 0.95), -2)
+    prop.update({
+        "taxInfo": {
+            "assessedValue": assessed,
+            "taxAmount": round(assessed * rng.uniform(0.008, 0.025), 2),
+            "year": 2024,
+        },
+        "lotInfo": {
+            "lotAcres": round(prop["lotSquareFeet"] / 43560, 3),
+            "zoning": rng.choice(("R1", "R2", "RM", "C1", "AG")),
+            "subdivision": f"{rng.choice(STREETS).split()[0]} Estates",
+        },
+        "ownerInfo": {
+            "ownershipLength": prop["yearsOwned"] * 12,
+            "ownerType": "Company" if prop["corporateOwned"] else "Individual",
+        },
+        "mortgageHistory": [
+            {
+                "amount": round(value * rng.uniform(0.3, 0.9), -2),
+                "recordingDate": (
+                    date(1995, 1, 1) + timedelta(days=rng.randrange(0, 10000))
+                ).isoformat(),
+            }
+            for _ in range(rng.randrange(0, 4))
+        ],
+    })
+    return prop
+
+
+# --- Filtering ---
+
+# Sidebar filter -> (record field, comparison) for the filters the mock honours
+RANGE_FILTERS = {
+    "value_min": ("estimatedValue", "min"),
+    "value_max": ("estimatedValue", "max"),
+    "year_built_min": ("yearBuilt", "min"),
+    "year_built_max": ("yearBuilt", "max"),
+    "beds_min": ("bedrooms", "min"),
+    "beds_max": ("bedrooms", "max"),
+    "last_sale_date_min": ("lastSaleDate", "min"),
+    "last_sale_date_max": ("lastSaleDate", "max"),
+}
+LOCATION_FILTERS = {"state": "state", "city": "city", "county": "county", "zip": "zip"}
+
+
+class PropertyUniverse:
+    """The full synthetic result set, with the filterable fields kept compact."""
+
+    def __init__(self, config):
+        self.config = config
+        self._index = None
+        self._matches = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _filter_index(self):
+        if self._index is None:
+            self._index = []
+            for i in range(self.config.result_count):
+                record = make_property(i, self.config.seed)
+                self._index.append({
+                    "state": record["address"]["state"],
+                    "city": record["address"]["city"],
+                    "county": record["address"]["county"],
+                    "zip": record["address"]["zip"],
+                    **{field: record[field] for field, _ in RANGE_FILTERS.values()},
+                })
+        return self._index
+
+    def matching(self, payload):
+        """Returns the indices of the records matching the honoured filters."""
+        criteria = {
+            key: payload[key]
+            for key in (*RANGE_FILTERS, *LOCATION_FILTERS)
+            if payload.get(key) not in (None, "", [])
+        }
+        if not criteria:
+            return range(self.config.result_count)
+        key = json.dumps(criteria, sort_keys=True, default=str)
+        with self._lock:
+            if key in self._matches:
+                self._matches.move_to_end(key)
+                return self._matches[key]
+            index = self._filter_index()
+        matches = [i for i, row in enumerate(index) if _row_matches(row, criteria)]
+        with self._lock:
+            self._matches[key] = matches
+            while len(self._matches) > 64:
+                self._matches.popitem(last=False)
+        return matches
+
+
+def _row_matches(row, criteria):
+    for key, wanted in criteria.items():
+        if key in LOCATION_FILTERS:
+            field = LOCATION_FILTERS[key]
+            values = wanted if isinstance(wanted, list) else [wanted]
+            if str(row[field]).lower() not in {str(v).lower() for v in values}:
+                return False
+        else:
+            field, bound = RANGE_FILTERS[key]
+            value = row[field]
+            if value is None:
+                return False
+            if isinstance(value, str):
+                wanted = str(wanted)
+            if bound == "min" and value < wanted:
+                return False
+            if bound == "max" and value > wanted:
+                return False
+    return True
+
+
+# --- HTTP Server ---
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"statusCode": 400, "message": "Invalid JSON"})
+            return
+        path = self.path.split("?")[0]
+        if path not in ("/v2/PropertySearch", "/v2/PropertyDetail"):
+            self._send_json(404, {"statusCode": 404, "message": "Not Found"})
+            return
+        if not self.headers.get("x-api-key"):
+            self._send_json(401, {"statusCode": 401, "message": "Missing API key"})
+            return
+
+        config = server.config
+        roll = server.random()
+        if roll < config.throttle_rate:
+            self._send_json(429, {"statusCode": 429, "message": "Too Many Requests"},
+                            extra_headers={"Retry-After": "0"})
+            return
+        if roll < config.throttle_rate + config.error_rate:
+            self._send_json(500, {"statusCode": 500, "message": "Injected failure"})
+            return
+
+        if path == "/v2/PropertyDetail":
+            self._property_detail(payload)
+            return
+
+        started = time.perf_counter()
+        matches = server.universe.matching(payload)
+        result_count = len(matches)
+        if payload.get("count"):
+            records = []
+        else:
+            result_index = int(payload.get("resultIndex") or 0)
+            size = min(int(payload.get("size") or 50), config.max_page_size)
+            window = matches[result_index:result_index + size]
+            records = [make_property(i, config.seed) for i in window]
+            if payload.get("ids_only"):
+                records = [record["id"] for record in records]
+        delay = (config.latency_ms + config.latency_per_record_ms * len(records)) / 1000
+        time.sleep(max(0.0, delay - (time.perf_counter() - started)))
+        self._send_json(200, {
+            "live": False,
+            "input": payload,
+            "data": records,
+            "resultCount": result_count,
+            "resultIndex": int(payload.get("resultIndex") or 0),
+            "recordCount": len(records),
+            "statusCode": 200,
+            "statusMessage": "Success",
+            "requestExecutionTimeMS": f"{(time.perf_counter() - started) * 1000:.0f}ms",
+        })
+
+    def _property_detail(self, payload):
+        config = self.server.config
+        started = time.perf_counter()
+        try:
+            index = int(payload.get("id")) - 100000000
+        except (TypeError, ValueError):
+            index = -1
+        if not 0 <= index < config.result_count:
+            self._send_json(404, {"statusCode": 404, "message": "Property not found"})
+            return
+        record = make_property_detail(index, config.seed)
+        delay = (config.latency_ms + config.latency_per_record_ms) / 1000
+        time.sleep(max(0.0, delay - (time.perf_counter() - started)))
+        self._send_json(200, {
+            "live": False,
+            "input": payload,
+            "data": record,
+            "statusCode": 200,
+            "statusMessage": "Success",
+            "requestExecutionTimeMS": f"{(time.perf_counter() - started) * 1000:.0f}ms",
+        })
+
+    def _send_json(self, status, body, extra_headers=None):
+        encoded = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if self.server.config.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            encoded = gzip.compress(encoded, compresslevel=5)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+        self.server.requests_served += 1
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threaded mock API server; use as a context manager to run it in the background."""
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host="127.0.0.1", port=0, verbose=False):
+        super().__init__((host, port), MockHandler)
+        self.config = config or MockConfig()
+        self.universe = PropertyUniverse(self.config)
+        self.verbose = verbose
+        self.requests_served = 0
+        self._random = random.Random(self.config.seed)
+        self._random_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def random(self):
+        with self._random_lock:
+            return self._random.random()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-reapi", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--result-count", type=int, default=10000)
+    parser.add_argument("--max-page-size", type=int, default=250)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-per-record-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-compress", action="store_true",
+                        help="Never gzip responses")
+    args = parser.parse_args()
+    config = MockConfig(
+        result_count=args.result_count,
+        max_page_size=args.max_page_size,
+        latency_ms=args.latency_ms,
+        latency_per_record_ms=args.latency_per_record_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+        compress=not args.no_compress,
+    )
+    server = MockServer(config, args.host, args.port, verbose=True)
+    print(f"Mock RealEstateAPI listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
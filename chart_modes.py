@@ -0,0 +1,271 @@
+"""Scatter plots that stay responsive as the number of points grows.
+
+Plotly's default scatter draws every point as an SVG element, which
+crawls beyond a few thousand points. ``scatter_figure`` picks a rendering
+mode from the number of points:
+
+* up to ``REAPI_WEBGL_THRESHOLD`` points: a regular (SVG) scatter;
+* up to ``REAPI_DENSITY_THRESHOLD`` points: the same scatter drawn with
+  WebGL traces;
+* beyond that: a 2D histogram computed here with NumPy and sent as a
+  density image, so only the bin counts cross the wire.
+
+Columns that aren't numeric can't be binned; such plots stay WebGL
+scatters at any size.
+
+Histograms and bar charts are binned or grouped here too, so only bin
+edges and counts (or category aggregates) are sent to the browser however
+many records are behind them. The aggregates are cached per result set
+version, column and settings, so switching between charts is cheap.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import api_metrics
+
+WEBGL_THRESHOLD = int(os.environ.get("REAPI_WEBGL_THRESHOLD", "2000"))
+DENSITY_THRESHOLD = int(os.environ.get("REAPI_DENSITY_THRESHOLD", "50000"))
+DENSITY_BINS = int(os.environ.get("REAPI_DENSITY_BINS", "200"))
+HISTOGRAM_BINS = 50
+BAR_MAX_CATEGORIES = 30  # The rest are summed up as "Other"
+AGGREGATE_CACHE_MAX_ENTRIES = 256
+
+SVG, WEBGL, DENSITY = "svg", "webgl", "density"
+
+
+def choose_mode(points, webgl_threshold=WEBGL_THRESHOLD, density_threshold=DENSITY_THRESHOLD):
+    """The rendering mode for a scatter of ``points`` points."""
+    if points > density_threshold:
+        return DENSITY
+    if points > webgl_threshold:
+        return WEBGL
+    return SVG
+
+
+def _frame(data):
+    """Accepts a DataFrame or a list of row dicts."""
+    import pandas as pd
+
+    return data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+
+
+def _numeric(series):
+    import pandas as pd
+
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+
+
+def density_grid(x, y, bins=DENSITY_BINS, log_x=False, log_y=False):
+    """Bins the finite (and, on log axes, positive) points into a 2D count grid.
+
+    Returns ``(counts, x_centers, y_centers)``; ``counts`` is indexed
+    ``[y_bin, x_bin]`` as images are.
+    """
+    import numpy as np
+
+    keep = np.isfinite(x) & np.isfinite(y)
+    if log_x:
+        keep &= x > 0
+    if log_y:
+        keep &= y > 0
+    x, y = x[keep], y[keep]
+    if not len(x):
+        return np.zeros((0, 0)), np.array([]), np.array([])
+
+    def edges(values, log):
+        low, high = values.min(), values.max()
+        if high == low:
+            high = low + (abs(low) or 1) * 1e-6
+        if log:
+            return np.logspace(np.log10(low), np.log10(high), bins + 1)
+        return np.linspace(low, high, bins + 1)
+
+    x_edges, y_edges = edges(x, log_x), edges(y, log_y)
+    counts, _, _ = np.histogram2d(x, y, bins=(x_edges, y_edges))
+    if log_x:
+        x_centers = np.sqrt(x_edges[:-1] * x_edges[1:])
+    else:
+        x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    if log_y:
+        y_centers = np.sqrt(y_edges[:-1] * y_edges[1:])
+    else:
+        y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    return counts.T.astype(np.int64), x_centers, y_centers
+
+
+def scatter_figure(px, data, x, y, title=None, mode=None, log_x=False, log_y=False,
+                   bins=DENSITY_BINS, **scatter_kwargs):
+    """Returns ``(figure, mode)`` for a scatter of ``data[x]`` against ``data[y]``.
+
+    ``scatter_kwargs`` (``color``, ``size``, ``hover_name``, ...) are passed
+    to ``px.scatter``; the density image shows counts only and ignores them.
+    """
+    df = _frame(data)
+    mode = mode or choose_mode(len(df))
+    if mode == DENSITY:
+        import numpy as np
+
+        x_values, y_values = _numeric(df[x]), _numeric(df[y])
+        if not (np.isfinite(x_values).any() and np.isfinite(y_values).any()):
+            mode = WEBGL  # Nothing numeric to bin; fall back to points
+        else:
+            counts, x_centers, y_centers = density_grid(
+                x_values, y_values, bins=bins, log_x=log_x, log_y=log_y
+            )
+            figure = px.imshow(
+                counts,
+                x=x_centers,
+                y=y_centers,
+                origin="lower",
+                aspect="auto",
+                color_continuous_scale="Viridis",
+                labels={"x": x, "y": y, "color": "properties"},
+                title=title,
+            )
+            if log_x:
+                figure.update_xaxes(type="log")
+            if log_y:
+                figure.update_yaxes(type="log")
+            return figure, mode
+    figure = px.scatter(
+        df, x=x, y=y, title=title, log_x=log_x, log_y=log_y,
+        render_mode="webgl" if mode == WEBGL else "svg",
+        **scatter_kwargs,
+    )
+    return figure, mode
+
+
+def describe_mode(mode, points):
+    """A short caption explaining how a scatter of ``points`` points was drawn."""
+    if mode == DENSITY:
+        return f"{points:,} points shown as a {DENSITY_BINS}x{DENSITY_BINS} density image."
+    if mode == WEBGL:
+        return f"{points:,} points drawn with WebGL."
+    return f"{points:,} points."
+
+
+# --- Binned Histograms and Bar Charts ---
+
+_aggregates = OrderedDict()
+_aggregates_lock = threading.Lock()
+
+
+def _cached(key, compute):
+    """Returns the aggregate for ``key``, computing it on a miss; ``key=None`` skips the cache."""
+    if key is None:
+        return compute()
+    with _aggregates_lock:
+        value = _aggregates.get(key)
+        if value is not None:
+            _aggregates.move_to_end(key)
+    api_metrics.observe_cache_lookup("chart", value is not None)
+    if value is None:
+        value = compute()
+        with _aggregates_lock:
+            _aggregates[key] = value
+            while len(_aggregates) > AGGREGATE_CACHE_MAX_ENTRIES:
+                _aggregates.popitem(last=False)
+    return value
+
+
+def _column(rows, name):
+    import pandas as pd
+
+    if isinstance(rows, pd.DataFrame):
+        return rows[name] if name in rows else pd.Series([], dtype=object)
+    return pd.Series([row.get(name) for row in rows])
+
+
+def histogram_bins(values, bins=HISTOGRAM_BINS):
+    """Bins a Series into ``(edges, counts, kind)``.
+
+    Numeric columns are binned by value and date columns by time (edges are
+    then datetimes); anything else returns ``kind="categorical"`` and the
+    value counts as ``(labels, counts)``.
+    """
+    import numpy as np
+    import pandas as pd
+
+    values = values.dropna()
+    numeric = pd.to_numeric(values, errors="coerce")
+    if len(values) and numeric.notna().mean() >= 0.9:
+        numeric = numeric.to_numpy(dtype=float)
+        counts, edges = np.histogram(numeric[np.isfinite(numeric)], bins=bins)
+        return edges, counts, "numeric"
+    if len(values) and _looks_like_dates(values):
+        dates = pd.to_datetime(values.astype(str).str[:10], format="%Y-%m-%d", errors="coerce")
+    else:
+        dates = pd.Series([], dtype="datetime64[ns]")
+    if len(dates) and dates.notna().mean() >= 0.9:
+        nanoseconds = dates.dropna().to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        counts, edges = np.histogram(nanoseconds, bins=bins)
+        return pd.to_datetime(edges), counts, "datetime"
+    counted = values.astype(str).value_counts()
+    return counted.index.to_numpy(), counted.to_numpy(), "categorical"
+
+
+def _looks_like_dates(values):
+    from datetime import date
+
+    sample = values.iloc[0]
+    return isinstance(sample, date) or (
+        isinstance(sample, str) and len(sample) >= 10 and sample[4] == "-" and sample[7] == "-"
+    )
+
+
+def bar_aggregate(categories, values=None, aggregate="count",
+                  max_categories=BAR_MAX_CATEGORIES):
+    """Groups ``values`` by ``categories`` into ``(labels, totals)``, largest first."""
+    import pandas as pd
+
+    categories = categories.where(categories.notna(), "(missing)").astype(str)
+    if values is None or aggregate == "count":
+        totals = categories.value_counts()
+    else:
+        values = pd.to_numeric(values, errors="coerce")
+        totals = values.groupby(categories).agg(aggregate).dropna().sort_values(ascending=False)
+    if len(totals) > max_categories:
+        shown = totals.iloc[:max_categories - 1]
+        if aggregate in ("count", "sum"):
+            other = totals.iloc[max_categories - 1:].sum()
+            shown = pd.concat([shown, pd.Series({"Other": other})])
+        totals = shown
+    return totals.index.to_numpy(), totals.to_numpy()
+
+
+def histogram_figure(px, rows, column, bins=HISTOGRAM_BINS, cache_key=None):
+    """A histogram of ``column`` built from server-side bin counts."""
+    edges, counts, kind = _cached(
+        None if cache_key is None else ("histogram", cache_key, column, bins),
+        lambda: histogram_bins(_column(rows, column), bins),
+    )
+    if kind == "categorical":
+        return px.bar(x=edges, y=counts, labels={"x": column, "y": "properties"},
+                      title=f"Histogram of {column}")
+    centers = edges[:-1] + (edges[1:] - edges[:-1]) / 2
+    figure = px.bar(x=centers, y=counts, labels={"x": column, "y": "properties"},
+                    title=f"Histogram of {column}")
+    widths = edges[1:] - edges[:-1]
+    if kind == "datetime":
+        import pandas as pd
+
+        widths = widths / pd.Timedelta(milliseconds=1)  # Plotly measures date widths in ms
+    figure.update_traces(width=widths, marker_line_width=0)
+    figure.update_layout(bargap=0)
+    return figure
+
+
+def bar_figure(px, rows, category, value=None, aggregate="count", cache_key=None):
+    """A bar chart of ``value`` aggregated by ``category`` (or the count per category)."""
+    labels, totals = _cached(
+        None if cache_key is None else ("bar", cache_key, category, value, aggregate),
+        lambda: bar_aggregate(
+            _column(rows, category),
+            None if value is None else _column(rows, value),
+            aggregate,
+        ),
+    )
+    y_label = "properties" if value is None or aggregate == "count" else f"{aggregate} of {value}"
+    return px.bar(x=labels, y=totals, labels={"x": category, "y": y_label},
+                  title=f"{y_label.capitalize()} by {category}")
@@ -0,0 +1,409 @@
+"""Credit-aware budgeting for PropertySearch fetches.
+
+Every record returned by PropertySearch costs API credits. Fetches made
+through this module are checked against a per-user daily cap and a
+server-wide daily cap before they are sent:
+
+* identical requests (compared in canonical form, see query_planner.py)
+  are answered from a short-lived response cache first and are not
+  charged, and so are searches the query planner can answer by filtering
+  a wider search's complete result set; both only reuse results fetched
+  with the same API key;
+* the records a request may return are reserved up front and its ``size``
+  is capped to the reservation, so concurrent sessions cannot overspend;
+* unused reservations are refunded once the page has arrived;
+* multi-page pulls stop cleanly when the budget runs out and return what
+  they have fetched so far, flagged as truncated.
+
+Usage is kept in a small JSON ledger (``REAPI_BUDGET_LEDGER``) so caps
+survive restarts and are shared by the Streamlit workers on one host.
+Count-only requests (``"count": true``) are treated as free, and so is
+everything while recorded traffic is being replayed (see traffic_journal.py).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+import requests
+
+import api_metrics
+import query_planner
+import reapi_client
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; the ledger is then per process
+    fcntl = None
+
+CREDITS_PER_RECORD = float(os.environ.get("REAPI_CREDITS_PER_RECORD", "1"))
+USER_DAILY_RECORD_CAP = int(os.environ.get("REAPI_USER_DAILY_CAP", "10000"))
+DAILY_RECORD_CAP = int(os.environ.get("REAPI_DAILY_CAP", "100000"))
+LEDGER_PATH = os.environ.get("REAPI_BUDGET_LEDGER", ".reapi_budget.json")
+
+CACHE_TTL_SECONDS = int(os.environ.get("REAPI_RESPONSE_CACHE_TTL", "900"))
+CACHE_MAX_ENTRIES = 256
+DEFAULT_PAGE_SIZE = 50  # What PropertySearch returns when the payload has no size
+
+
+class BudgetExceeded(Exception):
+    """Raised when a fetch can't return any records within the remaining budget."""
+
+
+class BudgetLedger:
+    """Records fetched per user per day, persisted to a JSON file."""
+
+    def __init__(self, path=LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, usage):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(usage, f)
+        os.replace(tmp_path, self.path)
+
+    def _locked(self, update):
+        """Applies ``update`` to today's usage under a process and file lock."""
+        with self._lock:
+            lock_file = open(f"{self.path}.lock", "a") if fcntl is not None else None
+            try:
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                usage = self._read()
+                today = date.today().isoformat()
+                # Only today's usage matters; older days are dropped
+                day = usage.get(today) or {"total": 0, "users": {}}
+                result = update(day)
+                self._write({today: day})
+                return result
+            finally:
+                if lock_file is not None:
+                    lock_file.close()
+
+    def usage(self, user_id):
+        """Returns (records used by ``user_id`` today, records used by everyone today)."""
+        day = self._read().get(date.today().isoformat()) or {"total": 0, "users": {}}
+        return day["users"].get(user_id, 0), day["total"]
+
+    def reserve(self, user_id, records, user_cap, daily_cap):
+        """Reserves up to ``records`` for ``user_id`` and returns how many were granted."""
+        def update(day):
+            used = day["users"].get(user_id, 0)
+            granted = max(0, min(records, user_cap - used, daily_cap - day["total"]))
+            day["users"][user_id] = used + granted
+            day["total"] += granted
+            return granted
+        return self._locked(update)
+
+    def refund(self, user_id, records):
+        """Returns unused reserved records to ``user_id``'s allowance."""
+        if records <= 0:
+            return
+
+        def update(day):
+            refunded = min(records, day["users"].get(user_id, 0))
+            day["users"][user_id] = day["users"].get(user_id, 0) - refunded
+            day["total"] = max(0, day["total"] - refunded)
+        self._locked(update)
+
+
+class ResponseCache:
+    """Small TTL + LRU cache of PropertySearch responses shared by all sessions."""
+
+    def __init__(self, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        api_metrics.observe_cache_lookup("response", entry is not None)
+        if entry is None:
+            return None
+        data = entry[1]
+        return {**data, "data": list(data.get("data", []))}
+
+    def put(self, key, data):
+        data = {**data, "data": list(data.get("data", [])), "fromCache": True}
+        with self._lock:
+            self._entries[key] = (time.monotonic(), data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict_rows(self, row_ids):
+        """Drops the responses holding any row whose ``id()`` is in ``row_ids``."""
+        with self._lock:
+            keys = [
+                key for key, (_, data) in self._entries.items()
+                if any(id(row) in row_ids for row in data.get("data", []))
+            ]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+
+def key_digest(api_key):
+    """Short digest of an API key; cached results are only shared under the same key."""
+    return hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+
+
+def cache_key(payload, transform=None, typed=False, api_key=None):
+    """Key identifying a response for a payload, the API key and the way records were decoded."""
+    return json.dumps(
+        [key_digest(api_key), query_planner.canonicalize(payload),
+         getattr(transform, "__qualname__", None), typed],
+        sort_keys=True,
+        default=str,
+    )
+
+
+class PullResult:
+    """Records fetched by a budgeted pull, and why it stopped."""
+
+    def __init__(self):
+        self.records = []
+        self.result_count = None
+        self.pages = 0
+        self.cache_hits = 0
+        self.records_charged = 0
+        self.truncated = False
+        self.reason = None
+        self.resumed_pages = 0  # Pages read back from a pull journal
+
+    @property
+    def credits_spent(self):
+        return self.records_charged * CREDITS_PER_RECORD
+
+
+class FetchBudget:
+    """Checks PropertySearch fetches against the per-user and daily caps."""
+
+    def __init__(self, ledger=None, cache=None, user_cap=USER_DAILY_RECORD_CAP,
+                 daily_cap=DAILY_RECORD_CAP, planner=None):
+        self.ledger = ledger or BudgetLedger()
+        self.cache = cache or ResponseCache()
+        self.planner = planner if planner is not None else query_planner.QueryPlanner()
+        self.user_cap = user_cap
+        self.daily_cap = daily_cap
+
+    def release_rows(self, rows):
+        """Forgets cached responses and planner entries holding ``rows``.
+
+        Called before a session spills ``rows`` to disk; otherwise these
+        references would keep the rows in memory anyway.
+        """
+        row_ids = {id(row) for row in rows}
+        if not row_ids:
+            return 0
+        return self.cache.evict_rows(row_ids) + self.planner.evict_rows(row_ids)
+
+    def remaining(self, user_id):
+        """Records ``user_id`` may still fetch today."""
+        user_used, total_used = self.ledger.usage(user_id)
+        return max(0, min(self.user_cap - user_used, self.daily_cap - total_used))
+
+    def reserve(self, user_id, records):
+        """Reserves up to ``records`` lookups for ``user_id``; returns ``(granted, charged)``.
+
+        While the client is offline every lookup is granted and none is
+        charged. Unused charged records go back with ``ledger.refund``.
+        """
+        if reapi_client.offline():
+            return records, 0
+        granted = self.ledger.reserve(user_id, records, self.user_cap, self.daily_cap)
+        return granted, granted
+
+    def estimate(self, filter_params, user_id, api_key, max_records=None):
+        """Counts the matching records (free) and estimates the cost of fetching them."""
+        payload = query_planner.canonicalize({**filter_params, "count": True})
+        payload.pop("size", None)
+        payload.pop("resultIndex", None)
+        data = self.planner.answer(payload, owner=key_digest(api_key))
+        if data is None:
+            data = reapi_client.search_properties(payload, user_id, api_key)
+        result_count = int(data.get("resultCount", 0))
+        records = result_count if max_records is None else min(result_count, max_records)
+        allowed = min(records, self.remaining(user_id))
+        return {
+            "result_count": result_count,
+            "records": records,
+            "credits": records * CREDITS_PER_RECORD,
+            "allowed_records": allowed,
+            "allowed_credits": allowed * CREDITS_PER_RECORD,
+        }
+
+    def lookup(self, payload, api_key, transform=None, typed=False):
+        """The response to ``payload`` from the cache or query planner, or None; never charged."""
+        payload = query_planner.canonicalize(payload)
+        cached = self.cache.get(cache_key(payload, transform, typed, api_key))
+        if cached is not None:
+            return cached
+        return self.planner.answer(payload, transform, typed, key_digest(api_key))
+
+    def search(self, payload, user_id, api_key, transform=None, typed=False):
+        """Runs one PropertySearch request within the budget.
+
+        Returns ``(data, charged)``. Cached responses (marked ``fromCache``)
+        are returned without charging; otherwise ``size`` is capped to what
+        the budget allows and a capped response is marked ``budgetTruncated``.
+        Searches the query planner can answer locally are returned free too,
+        marked ``fromPlanner``. Raises ``BudgetExceeded`` if no records can
+        be fetched.
+        """
+        payload = query_planner.canonicalize(payload)
+        owner = key_digest(api_key)
+        key = cache_key(payload, transform, typed, api_key)
+        known = self.lookup(payload, api_key, transform, typed)
+        if known is not None:
+            return known, 0
+
+        if payload.get("count") or reapi_client.offline():
+            data = reapi_client.search_properties(
+                payload, user_id, api_key, transform=transform, typed=typed
+            )
+            self.cache.put(key, data)
+            return data, 0
+
+        requested = int(payload.get("size") or DEFAULT_PAGE_SIZE)
+        granted = self.ledger.reserve(user_id, requested, self.user_cap, self.daily_cap)
+        if granted <= 0:
+            raise BudgetExceeded(
+                f"Daily record budget exhausted for {user_id} "
+                f"({self.user_cap} per user, {self.daily_cap} in total)"
+            )
+        try:
+            data = reapi_client.search_properties(
+                {**payload, "size": granted}, user_id, api_key, transform=transform, typed=typed
+            )
+        except Exception:
+            self.ledger.refund(user_id, granted)
+            raise
+        returned = len(data.get("data", []))
+        self.ledger.refund(user_id, granted - returned)
+        if granted == requested:
+            self.cache.put(key, data)
+            if not payload.get("resultIndex"):
+                # Ignored unless this one page is the whole result set
+                self.planner.record(
+                    payload, data.get("data", []), data.get("resultCount"), transform, typed,
+                    owner,
+                )
+        else:
+            data["budgetTruncated"] = True
+        return data, returned
+
+    def pull(self, filter_params, user_id, api_key, max_records, page_size=250,
+             result_index=0, transform=None, typed=False, on_page=None, journal=None):
+        """Pages through a search until ``max_records``, the result set or the budget runs out.
+
+        ``on_page(result)`` is called after each page so callers can report
+        progress. Budget exhaustion ends the pull with ``truncated`` set
+        instead of raising.
+
+        With a ``pull_journal.PullJournal`` every page is journaled as it
+        arrives and pages already in the journal are reused instead of being
+        requested again; a failed request then also ends the pull with
+        ``truncated`` set, so it can be resumed by pulling again.
+        """
+        result = PullResult()
+        first_index = result_index
+        journaled = journal.load() if journal is not None else {}
+        while len(result.records) < max_records:
+            size = min(page_size, max_records - len(result.records))
+            entry = journaled.get(result_index)
+            if entry is not None and (
+                len(entry[0]) >= size or result_index + len(entry[0]) >= (entry[1] or 0)
+            ):
+                page, result_count = entry[0][:size], entry[1]
+                result.resumed_pages += 1
+                budget_truncated = False
+            else:
+                payload = {**filter_params, "count": False, "size": size,
+                           "resultIndex": result_index}
+                try:
+                    data, charged = self.search(payload, user_id, api_key, transform, typed)
+                except BudgetExceeded as e:
+                    result.truncated = True
+                    result.reason = str(e)
+                    break
+                except requests.RequestException as e:
+                    if journal is None:
+                        raise
+                    result.truncated = True
+                    result.reason = f"Page at resultIndex {result_index} failed: {e}"
+                    break
+                page = data.get("data", [])
+                result_count = data.get("resultCount", result.result_count)
+                result.cache_hits += bool(data.get("fromCache"))
+                result.records_charged += charged
+                budget_truncated = data.get("budgetTruncated")
+                if journal is not None and page:
+                    journal.record(result_index, page, result_count)
+            result.pages += 1
+            result.records.extend(page)
+            result.result_count = result_count
+            result_index += len(page)
+            if on_page is not None:
+                on_page(result)
+            if budget_truncated:
+                result.truncated = True
+                result.reason = "Daily record budget reached"
+                break
+            if not page or (result.result_count is not None and result_index >= result.result_count):
+                break
+        if not result.truncated:
+            if journal is not None:
+                journal.discard()
+            if first_index == 0:
+                self.planner.record(
+                    filter_params, result.records, result.result_count, transform, typed,
+                    key_digest(api_key),
+                )
+        return result
+
+
+_default_budget = None
+_default_lock = threading.Lock()
+
+
+def default_budget():
+    """The process-wide budget shared by every session."""
+    global _default_budget
+    with _default_lock:
+        if _default_budget is None:
+            _default_budget = FetchBudget()
+        return _default_budget
+
+
+def render_budget_panel(user_id):
+    """Displays today's record usage and remaining budget for ``user_id``."""
+    import streamlit as st
+
+    budget = default_budget()
+    user_used, total_used = budget.ledger.usage(user_id)
+    st.write(f"Your records today: {user_used:,} / {budget.user_cap:,}")
+    st.write(f"All users today: {total_used:,} / {budget.daily_cap:,}")
+    remaining = budget.remaining(user_id)
+    st.write(
+        f"Remaining: {remaining:,} records "
+        f"(~{remaining * CREDITS_PER_RECORD:,.0f} credits)"
+    )
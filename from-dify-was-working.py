@@ -172,7 +172,7 @@ if 'search_filter' in st.session_state:
         "accept": "application/json",
         "content-type": "application/json",
         "x-user-id": "{st.session_state.user_id}",
-        "x-api-key": "{st.session_state.api_key}"
+        "x-api-key": "YOUR_API_KEY"  # Never echo the real key
     }}
     payload = {formatted_payload}
 
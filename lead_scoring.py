@@ -0,0 +1,162 @@
+"""Weighted lead scores for PropertySearch results.
+
+Each factor turns one record field into a value between 0 and 1: a flag
+(absentee owner, pre-foreclosure, ...), a quantity where more is better
+(equity percent, years owned) or one where less is better (LTV). A lead
+score is the weighted mean of the factors, scaled to 0-100, computed for
+a whole result set in one vectorized NumPy pass.
+
+``LeadRanking`` keeps the top-k leads of a search as its pages arrive, so
+the best leads seen so far are known without holding every page.
+
+Default weights can be overridden with ``REAPI_LEAD_WEIGHTS``, a JSON
+object of factor name to weight.
+"""
+import heapq
+import itertools
+import json
+import os
+
+import property_store
+
+# Factor -> (record field, kind, value at which the factor saturates)
+FACTORS = {
+    "equity": ("equityPercent", "higher", 100),
+    "low ltv": ("ltv", "lower", 100),
+    "years owned": ("yearsOwned", "higher", 20),
+    "absentee owner": ("absenteeOwner", "flag", None),
+    "out-of-state owner": ("outOfStateAbsenteeOwner", "flag", None),
+    "pre-foreclosure": ("preForeclosure", "flag", None),
+    "foreclosure": ("foreclosure", "flag", None),
+    "auction": ("auction", "flag", None),
+    "tax lien": ("taxLien", "flag", None),
+    "vacant": ("vacant", "flag", None),
+}
+DEFAULT_WEIGHTS = {
+    "equity": 3,
+    "low ltv": 2,
+    "years owned": 1,
+    "absentee owner": 2,
+    "out-of-state owner": 1,
+    "pre-foreclosure": 3,
+    "foreclosure": 2,
+    "auction": 2,
+    "tax lien": 2,
+    "vacant": 1,
+    **json.loads(os.environ.get("REAPI_LEAD_WEIGHTS", "{}")),
+}
+TOP_K = 100
+SCORE_COLUMN = "leadScore"
+
+
+def _field_values(data, field):
+    """The values of ``field`` as a float array, NaN where missing or not numeric."""
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(data, pd.DataFrame):
+        if field not in data:
+            return np.full(len(data), np.nan)
+        return pd.to_numeric(data[field], errors="coerce").to_numpy(dtype=float)
+    values = [row.get(field) if hasattr(row, "get") else None for row in data]
+    try:
+        return np.array(values, dtype=float)  # None -> NaN, bools -> 0/1
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+
+
+def score(data, weights=None):
+    """Returns the 0-100 lead score of every row of ``data`` (a DataFrame or list of rows)."""
+    import numpy as np
+
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    total = np.zeros(len(data))
+    weight_sum = 0.0
+    for name, weight in weights.items():
+        if not weight or name not in FACTORS:
+            continue
+        field, kind, saturation = FACTORS[name]
+        values = _field_values(data, field)
+        if kind == "flag":
+            factor = (values > 0).astype(float)
+        elif kind == "higher":
+            factor = np.clip(values / saturation, 0, 1)
+        else:
+            factor = np.clip(1 - values / saturation, 0, 1)
+        total += weight * np.nan_to_num(factor)
+        weight_sum += abs(weight)
+    if weight_sum:
+        total *= 100 / weight_sum
+    return total
+
+
+def top_k(scores, k=TOP_K):
+    """Indexes of the ``k`` highest scores, best first."""
+    import numpy as np
+
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, k)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class LeadRanking:
+    """The ``k`` best-scoring rows of a search, updated as pages arrive."""
+
+    def __init__(self, k=TOP_K, weights=None):
+        self.k = k
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.scored = 0
+        self._heap = []  # (score, tiebreak, row), worst lead first
+        self._seen = set()
+        self._tiebreak = itertools.count()
+
+    def add(self, rows):
+        """Scores the rows not seen before and keeps those that make the top k."""
+        import numpy as np
+
+        new_rows = []
+        for row in rows:
+            key = property_store.record_key(row)
+            if key not in self._seen:
+                self._seen.add(key)
+                new_rows.append(row)
+        if not new_rows:
+            return
+        scores = score(new_rows, self.weights)
+        self.scored += len(new_rows)
+        # Only rows that beat the current k-th best can enter the ranking
+        threshold = self._heap[0][0] if len(self._heap) >= self.k else -np.inf
+        for index in top_k(np.where(scores > threshold, scores, -np.inf), self.k):
+            if scores[index] <= threshold:
+                break
+            entry = (float(scores[index]), next(self._tiebreak), new_rows[index])
+            if len(self._heap) < self.k:
+                heapq.heappush(self._heap, entry)
+            else:
+                # Keeps the better of the entry and the current k-th best
+                heapq.heappushpop(self._heap, entry)
+            if len(self._heap) >= self.k:
+                threshold = self._heap[0][0]
+
+    def ranked(self):
+        """``(score, row)`` pairs, best first."""
+        return [(entry[0], entry[2]) for entry in sorted(self._heap, reverse=True)]
+
+    def rows(self):
+        """The ranked rows with their score in ``leadScore``."""
+        return [{SCORE_COLUMN: round(value, 1), **row} for value, row in self.ranked()]
+
+
+def render_weights_panel():
+    """Sidebar sliders for the factor weights; returns the chosen weights and k."""
+    import streamlit as st
+
+    weights = {
+        name: st.slider(name.capitalize(), min_value=0, max_value=5,
+                        value=int(DEFAULT_WEIGHTS.get(name, 0)), key=f"lead_weight_{name}")
+        for name in FACTORS
+    }
+    k = st.number_input("Top leads to keep", min_value=10, max_value=5000, value=TOP_K,
+                        step=10, key="lead_top_k")
+    return weights, int(k)
@@ -0,0 +1,53 @@
+"""Helpers for turning PropertySearch records into tabular rows."""
+
+
+def flatten_property(prop):
+    """Flattens one property record, prefixing nested fields with their parent key."""
+    flattened_prop = {}
+    for key, value in prop.items():
+        if isinstance(value, dict):
+            flattened_prop.update(
+                {f"{key}_{sub_key}": sub_value for sub_key, sub_value in value.items()}
+            )
+        else:
+            flattened_prop[key] = value
+    return flattened_prop
+
+
+def flatten_property_data(properties):
+    """Flattens the nested JSON structure of the property data."""
+    return [flatten_property(prop) for prop in properties]
+
+
+class ColumnarBuilder:
+    """Accumulates flattened records column by column.
+
+    Records can be appended one at a time straight from a ``PropertyStream``;
+    columns that only appear in later records are back-filled with None.
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.rows = 0
+
+    def append(self, prop):
+        flattened = flatten_property(prop)
+        for key, value in flattened.items():
+            column = self.columns.get(key)
+            if column is None:
+                column = self.columns[key] = [None] * self.rows
+            column.append(value)
+        self.rows += 1
+        for column in self.columns.values():
+            if len(column) < self.rows:
+                column.append(None)
+
+    def extend(self, properties):
+        for prop in properties:
+            self.append(prop)
+        return self
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.columns)
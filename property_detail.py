@@ -0,0 +1,135 @@
+"""Hydrates selected search results with their full PropertyDetail records.
+
+PropertySearch rows only carry summary fields. ``hydrate`` fetches the
+detail record for each selected property id in parallel batches over the
+shared connection pool, caches the flattened details by API key and id
+(so the same lead is never fetched twice within ``REAPI_DETAIL_CACHE_TTL``,
+and one key's responses are never served to another) and
+``merge_into_store`` adds the new columns to the rows in the shared
+property store, where every session's result frame picks them up.
+
+Detail lookups are charged one record each against the fetch budget,
+except while the client is offline (replaying recorded traffic).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import api_metrics
+import fetch_budget
+import property_store
+import reapi_client
+from property_data import flatten_property
+
+DETAIL_BATCH_SIZE = int(os.environ.get("REAPI_DETAIL_BATCH_SIZE", "25"))
+DETAIL_CACHE_TTL_SECONDS = int(os.environ.get("REAPI_DETAIL_CACHE_TTL", "3600"))
+DETAIL_CACHE_MAX_ENTRIES = 5000
+
+
+class DetailCache:
+    """TTL + LRU cache of flattened detail records keyed by API key digest and property id."""
+
+    def __init__(self, ttl=DETAIL_CACHE_TTL_SECONDS, max_entries=DETAIL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, property_id, owner=None):
+        key = (owner, property_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        api_metrics.observe_cache_lookup("detail", entry is not None)
+        return None if entry is None else entry[1]
+
+    def put(self, property_id, detail, owner=None):
+        key = (owner, property_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), detail)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class HydrationResult:
+    """Details fetched for a set of property ids, and the ids that weren't."""
+
+    def __init__(self):
+        self.details = {}
+        self.cache_hits = 0
+        self.fetched = 0
+        self.failed = {}  # property id -> error message
+        self.skipped = []  # ids left out because the budget ran out
+
+    @property
+    def done(self):
+        return len(self.details) + len(self.failed) + len(self.skipped)
+
+
+_cache = DetailCache()
+
+
+def hydrate(property_ids, user_id, api_key, budget=None, batch_size=DETAIL_BATCH_SIZE,
+            max_workers=reapi_client.CONCURRENT_REQUESTS, on_batch=None, cache=None):
+    """Fetches the flattened detail record for each of ``property_ids``.
+
+    Cached details are used first. The rest are fetched ``batch_size`` at a
+    time, up to ``max_workers`` in parallel; ``on_batch(result, total)`` is
+    called after each batch (or once, if nothing needed fetching) so callers
+    can report progress. With a ``fetch_budget.FetchBudget``, lookups beyond
+    the remaining budget are skipped, and lookups that fail or are never
+    made because a batch raised are refunded.
+    """
+    cache = cache or _cache
+    owner = fetch_budget.key_digest(api_key)
+    result = HydrationResult()
+    property_ids = list(dict.fromkeys(str(property_id) for property_id in property_ids))
+    missing = []
+    for property_id in property_ids:
+        detail = cache.get(property_id, owner)
+        if detail is None:
+            missing.append(property_id)
+        else:
+            result.details[property_id] = detail
+            result.cache_hits += 1
+
+    charged = 0
+    if missing and budget is not None:
+        granted, charged = budget.reserve(user_id, len(missing))
+        missing, result.skipped = missing[:granted], missing[granted:]
+
+    try:
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            responses = reapi_client.get_property_details_concurrently(
+                batch, user_id, api_key, max_workers=max_workers
+            )
+            for property_id, response in zip(batch, responses):
+                if isinstance(response, Exception):
+                    result.failed[property_id] = str(response)
+                    continue
+                detail = flatten_property(response)
+                cache.put(property_id, detail, owner)
+                result.details[property_id] = detail
+                result.fetched += 1
+            if on_batch is not None:
+                on_batch(result, len(property_ids))
+    finally:
+        # Refunds failed lookups, and those never made if a batch raised
+        if charged:
+            budget.ledger.refund(user_id, charged - result.fetched)
+    if not missing and on_batch is not None:
+        on_batch(result, len(property_ids))  # Everything was cached or skipped
+    return result
+
+
+def merge_into_store(details, store=None):
+    """Adds the detail columns to the matching rows in the property store."""
+    store = store or property_store.get_store()
+    return sum(store.merge(property_id, detail) for property_id, detail in details.items())
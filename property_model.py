@@ -0,0 +1,203 @@
+"""Typed model for PropertySearch records.
+
+Each response is parsed once and the known fields of every record are
+converted into slotted ``PropertyRecord`` objects with real types (bools
+for the distress flags, floats for coordinates and values, dates for
+sale/auction dates). Fields the model does not know about are kept in
+``record.extra`` so nothing the API returns is lost.
+
+msgspec is used when installed; otherwise records are decoded with the
+standard json module and coerced into an equivalent slotted class.
+Records expose ``items()`` like a dict, so ``flatten_property`` accepts
+them unchanged.
+"""
+import json
+from datetime import date, datetime
+
+try:
+    import msgspec
+except ImportError:  # Optional: fall back to json + manual coercion
+    msgspec = None
+
+BOOL_FIELDS = (
+    "absenteeOwner", "adjustableRate", "assumable", "auction", "basement",
+    "cashBuyer", "corporateOwned", "death", "deck", "equity", "floodZone",
+    "foreclosure", "freeClear", "garage", "highEquity", "inherited",
+    "inStateAbsenteeOwner", "investorBuyer", "judgment", "MFH2to4", "MFH5plus",
+    "mlsActive", "negativeEquity", "outOfStateAbsenteeOwner", "ownerOccupied",
+    "patio", "pool", "preForeclosure", "privateLender", "quitClaim", "reo",
+    "rvParking", "taxLien", "trustOwned", "vacant",
+)
+FLOAT_FIELDS = (
+    "bathrooms", "equityPercent", "estimatedEquity", "estimatedMortgageBalance",
+    "estimatedValue", "lastSaleAmount", "latitude", "longitude", "ltv", "medianIncome",
+    "openMortgageBalance",
+)
+INT_FIELDS = (
+    "bedrooms", "lotSquareFeet", "rooms", "squareFeet", "stories", "unitsCount",
+    "yearBuilt", "yearsOwned",
+)
+DATE_FIELDS = ("auctionDate", "foreclosureDate", "lastSaleDate", "preForeclosureDate")
+STR_FIELDS = (
+    "id", "propertyId", "apn", "companyName", "lenderName", "owner1FirstName",
+    "owner1LastName", "owner2FirstName", "owner2LastName", "propertyType",
+    "propertyUse", "propertyUseCode",
+)
+DICT_FIELDS = ("address", "mailAddress", "neighborhood")
+
+FIELD_TYPES = {
+    **{name: bool for name in BOOL_FIELDS},
+    **{name: float for name in FLOAT_FIELDS},
+    **{name: int for name in INT_FIELDS},
+    **{name: date for name in DATE_FIELDS},
+    **{name: str for name in STR_FIELDS},
+    **{name: dict for name in DICT_FIELDS},
+}
+KNOWN_FIELDS = frozenset(FIELD_TYPES)
+
+
+def _items(self):
+    """Yields (field, value) for every populated field, then the unknown ones."""
+    for name in FIELD_TYPES:
+        value = getattr(self, name)
+        if value is not None:
+            yield name, value
+    yield from self.extra.items()
+
+
+def _get(self, name, default=None):
+    if name in KNOWN_FIELDS:
+        value = getattr(self, name)
+        return default if value is None else value
+    return self.extra.get(name, default)
+
+
+def _coerce(kind, value):
+    """Converts a decoded JSON value to ``kind``, raising ValueError/TypeError if it can't."""
+    if kind is date and isinstance(value, datetime):
+        return value.date()
+    if value is None or isinstance(value, kind) and not (kind is int and isinstance(value, bool)):
+        return value
+    if kind is bool:
+        if isinstance(value, str):
+            lowered = value.strip().lower()
+            if lowered in ("true", "1", "yes", "y"):
+                return True
+            if lowered in ("false", "0", "no", "n", ""):
+                return False
+            raise ValueError(f"not a boolean: {value!r}")
+        if isinstance(value, (int, float)):
+            return bool(value)
+    elif kind is float:
+        return float(value)
+    elif kind is int:
+        number = float(value)
+        if number.is_integer():
+            return int(number)
+        raise ValueError(f"not a whole number: {value!r}")  # Kept in extra, not truncated
+    elif kind is date:
+        if isinstance(value, str):
+            return date.fromisoformat(value[:10])
+    elif kind is str:
+        if isinstance(value, (int, float)):
+            return str(value)
+    raise TypeError(f"expected {kind.__name__}, got {type(value).__name__}")
+
+
+def record_from_dict(prop):
+    """Builds a ``PropertyRecord`` from an already decoded record.
+
+    Values that can't be coerced to their field's type are kept as-is in
+    ``extra`` rather than dropped.
+    """
+    fields = {}
+    extra = {}
+    for key, value in prop.items():
+        kind = FIELD_TYPES.get(key)
+        if kind is None:
+            extra[key] = value
+            continue
+        try:
+            fields[key] = _coerce(kind, value)
+        except (TypeError, ValueError):
+            extra[key] = value
+    return PropertyRecord(extra=extra, **fields)
+
+
+def to_dict(record):
+    """Returns a plain dict with the record's populated and unknown fields."""
+    return dict(record.items())
+
+
+if msgspec is not None:
+    PropertyRecord = msgspec.defstruct(
+        "PropertyRecord",
+        [(name, kind | None, None) for name, kind in FIELD_TYPES.items()]
+        + [("extra", dict, {})],
+        namespace={"items": _items, "get": _get},
+        module=__name__,  # So records pickle, e.g. back from sharded pull workers
+        kw_only=True,
+        omit_defaults=True,
+        gc=False,
+    )
+
+    class _Page(msgspec.Struct):
+        data: list | None = None
+        resultCount: int = 0
+        resultIndex: int = 0
+        recordCount: int = 0
+        statusCode: int = 0
+        statusMessage: str = ""
+
+    _page_decoder = msgspec.json.Decoder(_Page, strict=False)
+
+    def decode_record(prop):
+        """Builds a ``PropertyRecord`` from a decoded record; non-objects (ids_only) pass through."""
+        if not isinstance(prop, dict):
+            return prop
+        try:
+            record = msgspec.convert(prop, PropertyRecord, strict=False)
+        except msgspec.ValidationError:
+            # e.g. a datetime where a date was expected; coerce field by field
+            return record_from_dict(prop)
+        record.extra = {key: value for key, value in prop.items() if key not in KNOWN_FIELDS}
+        return record
+
+    def decode_page(body):
+        """Decodes a PropertySearch response body into (records, meta)."""
+        page = _page_decoder.decode(body)
+        records = [decode_record(prop) for prop in page.data or []]
+        meta = {
+            "resultCount": page.resultCount,
+            "resultIndex": page.resultIndex,
+            "recordCount": page.recordCount,
+            "statusCode": page.statusCode,
+            "statusMessage": page.statusMessage,
+        }
+        return records, meta
+
+else:
+    class PropertyRecord:
+        """Slotted stand-in for the msgspec struct when msgspec is not installed."""
+
+        __slots__ = tuple(FIELD_TYPES) + ("extra",)
+        items = _items
+        get = _get
+
+        def __init__(self, extra=None, **fields):
+            for name in FIELD_TYPES:
+                setattr(self, name, fields.get(name))
+            self.extra = extra or {}
+
+        def __repr__(self):
+            return f"PropertyRecord(id={self.id!r})"
+
+    def decode_record(prop):
+        """Builds a ``PropertyRecord`` from a decoded record; non-objects (ids_only) pass through."""
+        return record_from_dict(prop) if isinstance(prop, dict) else prop
+
+    def decode_page(body):
+        """Decodes a PropertySearch response body into (records, meta)."""
+        data = json.loads(body)
+        records = [decode_record(prop) for prop in data.pop("data", None) or []]
+        return records, data
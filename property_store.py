@@ -0,0 +1,339 @@
+"""Process-wide store of property rows shared by every session.
+
+Each row is held once, keyed by its property id, in a numbered slot.
+Sessions keep a ``ResultSet`` instead of their own copy of the rows: an
+array of slot numbers into the store. Slots are reference counted; when
+the last result set referring to a row is released (explicitly or when it
+is garbage collected, e.g. because a session ran a new search or ended),
+the row is evicted and its slot reused.
+
+Rows are shared between sessions and must be treated as read-only.
+
+A result set can be spilled to disk (see session_memory.py): its rows are
+written column by column to a pickle file and its slots released; the
+next access reads them back into the store transparently.
+"""
+import gzip
+import itertools
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import weakref
+from array import array
+from collections import deque
+from contextlib import contextmanager
+
+_result_tokens = itertools.count(1)
+
+
+def record_key(row):
+    """Identifies a row (a dict or typed record) by its property id, or by its content."""
+    get = getattr(row, "get", None)
+    if get is not None:
+        key = get("id") or get("propertyId")
+        if key is not None:
+            return str(key)
+    return "content:" + json.dumps(row, sort_keys=True, default=str)
+
+
+def _refreshed(stored, row):
+    """``row`` with the fields it lacks (or has as None) filled in from ``stored``."""
+    if not isinstance(stored, dict) or not isinstance(row, dict):
+        return row
+    merged = None
+    for name, value in stored.items():
+        if value is not None and row.get(name) is None:
+            if merged is None:
+                merged = dict(row)
+            merged[name] = value
+    return row if merged is None else merged
+
+
+class PropertyStore:
+    """Rows keyed by property id, stored once with reference-counted slots."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Slots released but not yet dropped. A ResultSet's finalizer calls
+        # release(), and garbage collection can run it on a thread that is
+        # already inside the lock, so releases are queued and applied by
+        # whoever next holds the lock.
+        self._released = deque()
+        self._rows = []  # slot -> row
+        self._refs = array("q")  # slot -> number of result-set references
+        self._slots = {}  # key -> slot
+        self._keys = []  # slot -> key
+        self._free = []
+        self.generation = 0  # Bumped whenever stored rows change in place
+
+    def add_rows(self, rows):
+        """Stores ``rows`` and returns a ``ResultSet``.
+
+        Newer copies replace older ones, but keep the fields only the stored
+        copy has (such as details merged in by property_detail.hydrate).
+        """
+        return ResultSet(self, self._add(rows, replace=True))
+
+    def _add(self, rows, replace):
+        """References ``rows`` and returns their slots; ``replace=False`` keeps stored rows."""
+        slots = array("q")
+        with self._locked():
+            for row in rows:
+                key = record_key(row)
+                slot = self._slots.get(key)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                        self._rows[slot] = row
+                        self._keys[slot] = key
+                    else:
+                        slot = len(self._rows)
+                        self._rows.append(row)
+                        self._keys.append(key)
+                        self._refs.append(0)
+                    self._slots[key] = slot
+                elif replace and self._rows[slot] is not row:
+                    self._rows[slot] = _refreshed(self._rows[slot], row)
+                    self.generation += 1
+                self._refs[slot] += 1
+                slots.append(slot)
+        return slots
+
+    def get(self, slot):
+        return self._rows[slot]
+
+    def rows(self, slots):
+        """Returns the rows for ``slots``, in order."""
+        with self._locked():
+            return [self._rows[slot] for slot in slots]
+
+    def merge(self, key, fields):
+        """Adds the ``fields`` the stored row for ``key`` lacks (or has as None).
+
+        The row is replaced rather than mutated, since sessions share it.
+        Returns False if no result set refers to ``key`` any more.
+        """
+        with self._locked():
+            slot = self._slots.get(key)
+            if slot is None:
+                return False
+            merged = dict(self._rows[slot])
+            for name, value in fields.items():
+                if merged.get(name) is None:
+                    merged[name] = value
+            self._rows[slot] = merged
+            self.generation += 1
+            return True
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            self._drop_released()
+            yield
+
+    def _drop_released(self):
+        while self._released:
+            for slot in self._released.popleft():
+                self._refs[slot] -= 1
+                if self._refs[slot] == 0:
+                    del self._slots[self._keys[slot]]
+                    self._rows[slot] = None
+                    self._keys[slot] = None
+                    self._free.append(slot)
+
+    def release(self, slots):
+        """Drops one reference to each slot, evicting rows nobody refers to."""
+        self._released.append(slots)
+        # Never waits: if the lock is busy, its holder or the next caller drops them
+        if self._lock.acquire(blocking=False):
+            try:
+                self._drop_released()
+            finally:
+                self._lock.release()
+
+    def exclusive_count(self, slots):
+        """How many of ``slots`` no other result set refers to."""
+        with self._locked():
+            refs = self._refs
+            return sum(1 for slot in slots if refs[slot] == 1)
+
+    def stats(self):
+        with self._locked():
+            references = sum(self._refs)
+            stored = len(self._slots)
+        return {
+            "rows stored": stored,
+            "references": references,
+            "shared rows saved": references - stored,
+            "free slots": len(self._free),
+        }
+
+
+def _write_columns(path, rows):
+    """Writes ``rows`` column by column; rows that aren't dicts are written as a list."""
+    if all(isinstance(row, dict) for row in rows):
+        names = {}
+        for row in rows:
+            names.update(dict.fromkeys(row))
+        data = {"rows": len(rows), "columns": {
+            name: [row.get(name) for row in rows] for name in names
+        }}
+    else:
+        data = {"rows": len(rows), "values": list(rows)}
+    with gzip.open(path, "wb", compresslevel=1) as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read_columns(path):
+    with gzip.open(path, "rb") as f:
+        data = pickle.load(f)
+    if "values" in data:
+        return data["values"]
+    columns = data["columns"]
+    if not columns:
+        return [{} for _ in range(data["rows"])]
+    # Fields a row didn't have come back as None
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def estimate_row_bytes(rows, sample=50):
+    """Rough average size of a row and its values, from the first ``sample`` rows."""
+    rows = rows[:sample]
+    if not rows:
+        return 0
+    total = 0
+    for row in rows:
+        total += sys.getsizeof(row)
+        if isinstance(row, dict):
+            total += sum(sys.getsizeof(value) for value in row.values())
+    return total // len(rows)
+
+
+class ResultSet:
+    """A search result as an ordered array of slots into a ``PropertyStore``."""
+
+    def __init__(self, store, slots):
+        self.store = store
+        self.slots = slots
+        self.token = next(_result_tokens)
+        self._length = len(slots)
+        self._finalizer = weakref.finalize(self, store.release, slots)
+        self._lock = threading.RLock()
+        self._row_bytes = None
+        self.spill_path = None
+        self.spill_bytes = 0
+        self.spills = 0
+        self.reloads = 0
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def __getitem__(self, index):
+        with self._lock:
+            self._load()
+            if isinstance(index, slice):
+                return self.store.rows(self.slots[index])
+            return self.store.get(self.slots[index])
+
+    def rows(self):
+        """Materializes the rows as a list (of shared, read-only dicts)."""
+        with self._lock:
+            self._load()
+            return self.store.rows(self.slots)
+
+    @property
+    def version(self):
+        """Changes whenever the rows this result set sees may have changed."""
+        return f"{self.token}.{self.store.generation}"
+
+    @property
+    def spilled(self):
+        return self.spill_path is not None
+
+    def memory_bytes(self):
+        """Estimated size of the rows spilling would free: those no other result set shares.
+
+        0 once spilled.
+        """
+        with self._lock:
+            if self.spilled or not self._length:
+                return 0
+            if self._row_bytes is None:
+                self._row_bytes = estimate_row_bytes(self.store.rows(self.slots[:50]))
+            return self._row_bytes * self.store.exclusive_count(self.slots)
+
+    def spill(self, directory=None):
+        """Writes the rows to a file in ``directory`` and releases them; returns the bytes written.
+
+        Rows other result sets still refer to stay in the store.
+        """
+        with self._lock:
+            if self.spilled or not self._length or not self._finalizer.alive:
+                return 0
+            os.makedirs(directory or tempfile.gettempdir(), exist_ok=True)
+            fd, path = tempfile.mkstemp(suffix=".rows", dir=directory)
+            os.close(fd)
+            try:
+                _write_columns(path, self.store.rows(self.slots))
+            except BaseException:
+                _remove(path)
+                raise
+            self._finalizer()  # Releases the slots
+            self.slots = array("q")
+            self.spill_path = path
+            self.spill_bytes = os.path.getsize(path)
+            self._spill_finalizer = weakref.finalize(self, _remove, path)
+            self.spills += 1
+            return self.spill_bytes
+
+    def _load(self):
+        if not self.spilled:
+            return
+        rows = _read_columns(self.spill_path)
+        # Rows still in the store (e.g. since hydrated) win over the spilled copies
+        self.slots = self.store._add(rows, replace=False)
+        self._finalizer = weakref.finalize(self, self.store.release, self.slots)
+        self._spill_finalizer()
+        self.spill_path = None
+        self.spill_bytes = 0
+        self.reloads += 1
+
+    def release(self):
+        """Releases the rows now instead of when the result set is collected."""
+        with self._lock:
+            self._finalizer()
+            if self.spilled:
+                self._spill_finalizer()
+                self.spill_path = None
+
+
+_store = PropertyStore()
+
+
+def get_store():
+    """The store shared by all sessions in this process."""
+    return _store
+
+
+def render_store_stats():
+    """Displays how many rows the shared store holds and how many are shared."""
+    import streamlit as st
+
+    st.table([{"metric": name, "value": value} for name, value in _store.stats().items()])
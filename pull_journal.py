@@ -0,0 +1,157 @@
+"""On-disk journal of the pages a long pull has completed.
+
+``FetchBudget.pull`` appends every page it fetches to the journal for its
+search, so a pull that fails or is interrupted part way can be run again
+and resumes from the last completed ``resultIndex``: journaled pages are
+read back from disk (without spending credits) and only the missing pages
+are requested. The journal is removed once the pull completes.
+
+Journals live in ``REAPI_PULL_JOURNAL_DIR`` and are keyed by the user,
+the canonical search filters (see query_planner.py), the page size and the
+record decoding. Each page is appended as one JSON line under a file lock,
+so several processes can share a journal; typed records are stored as
+their fields and rebuilt when read back, and the columns of dict rows
+holding dates are listed so those come back as dates rather than strings. A line cut short by a crash is
+dropped when the journal is read. Journals older than
+``REAPI_PULL_JOURNAL_TTL`` seconds are discarded, as the matching records
+may have changed since.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+
+import property_model
+import query_planner
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; the journal is then per process
+    fcntl = None
+
+JOURNAL_DIR = os.environ.get("REAPI_PULL_JOURNAL_DIR", ".reapi_pulls")
+JOURNAL_TTL_SECONDS = int(os.environ.get("REAPI_PULL_JOURNAL_TTL", str(24 * 3600)))
+
+# Keys that select pages rather than the search itself
+PAGING_KEYS = ("count", "size", "resultIndex")
+
+
+def journal_key(user_id, filter_params, page_size, transform=None, typed=False):
+    """Identifies a pull by its user, search filters and how its pages are requested and decoded."""
+    search = {
+        key: value for key, value in query_planner.canonicalize(filter_params).items()
+        if key not in PAGING_KEYS
+    }
+    return hashlib.sha256(json.dumps(
+        [user_id, search, page_size, getattr(transform, "__qualname__", None), typed],
+        sort_keys=True,
+        default=str,
+    ).encode()).hexdigest()[:32]
+
+
+def _date_columns(records):
+    """Maps each column of the dict rows in ``records`` holding dates to how to read it back."""
+    columns = {}
+    for record in records:
+        if isinstance(record, dict):
+            for key, value in record.items():
+                if isinstance(value, date):
+                    columns[key] = "datetime" if isinstance(value, datetime) else "date"
+    return columns
+
+
+def _restore_dates(record, columns):
+    for key, kind in columns.items():
+        value = record.get(key)
+        if isinstance(value, str):
+            parse = datetime.fromisoformat if kind == "datetime" else date.fromisoformat
+            try:
+                record[key] = parse(value)
+            except ValueError:
+                pass  # Was a string when recorded
+    return record
+
+
+def _encode_page(result_index, records, result_count):
+    typed = any(isinstance(record, property_model.PropertyRecord) for record in records)
+    if typed:
+        records = [
+            property_model.to_dict(record) if isinstance(record, property_model.PropertyRecord)
+            else record
+            for record in records
+        ]
+    page = {"resultIndex": result_index, "resultCount": result_count, "typed": typed,
+            "dates": {} if typed else _date_columns(records), "records": records}
+    return (json.dumps(page, default=str) + "\n").encode()
+
+
+def _decode_page(line):
+    page = json.loads(line)
+    records = page["records"]
+    if page.get("typed"):
+        records = [property_model.decode_record(record) for record in records]
+    elif page.get("dates"):
+        records = [_restore_dates(record, page["dates"]) for record in records]
+    return page["resultIndex"], records, page["resultCount"]
+
+
+class PullJournal:
+    """Completed pages of one pull, appended to a file as they arrive."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_pull(cls, user_id, filter_params, page_size, transform=None, typed=False,
+                 directory=JOURNAL_DIR):
+        key = journal_key(user_id, filter_params, page_size, transform, typed)
+        return cls(os.path.join(directory, f"{key}.jsonl"))
+
+    def _open_locked(self, mode):
+        """Opens the journal under this process's lock and an exclusive file lock."""
+        f = open(self.path, mode)
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)  # Released when the file is closed
+        return f
+
+    def load(self):
+        """Returns ``{result_index: (records, result_count)}`` for every intact page."""
+        pages = {}
+        try:
+            if time.time() - os.path.getmtime(self.path) > JOURNAL_TTL_SECONDS:
+                self.discard()
+                return pages
+            with self._lock, self._open_locked("r+b") as f:
+                good_offset = 0
+                for line in iter(f.readline, b""):
+                    try:
+                        result_index, records, result_count = _decode_page(line)
+                    except (ValueError, KeyError, TypeError):
+                        # Cut short by a crash: keep the intact pages and drop the
+                        # rest, so pages appended from now on stay readable
+                        f.truncate(good_offset)
+                        break
+                    pages.setdefault(result_index, (records, result_count))
+                    good_offset = f.tell()
+        except OSError:
+            pass
+        return pages
+
+    def record(self, result_index, records, result_count):
+        """Appends one completed page and makes sure it is on disk."""
+        line = _encode_page(result_index, records, result_count)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._open_locked("ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
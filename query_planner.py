@@ -0,0 +1,464 @@
+"""Canonical search payloads, and answering narrower searches from wider ones.
+
+The filters built in ``main()`` carry a lot of noise: zero-valued ranges,
+empty radio strings, floats for whole numbers, ZIP lists in whatever order
+they were typed. ``canonicalize`` strips that noise so equivalent searches
+produce the same payload (and so the same response cache key):
+
+* empty values and API defaults (``"ids_only": false``, ...) are dropped,
+  as are ``*_min``/``*_max`` ranges left at 0, which the UI uses as "unset";
+* ZIP codes are split, de-duplicated and sorted;
+* dates become ``YYYY-MM-DD`` strings and whole floats become ints;
+* keys are sorted.
+
+``QueryPlanner`` remembers searches whose whole result set has been
+fetched. A later search that is a subset of one of them (the same filters
+with tighter ranges, fewer ZIPs or an extra flag, e.g. a higher
+``beds_min``) is answered by filtering those records locally instead of
+calling the API. Only filters the planner can check against a record are
+tightened this way; any other difference, or a record missing a field the
+check needs, sends the search to the API as before. Locally answered pages
+keep the order of the wider search.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+import api_metrics
+
+PLANNER_TTL_SECONDS = int(os.environ.get("REAPI_PLANNER_TTL", "900"))
+PLANNER_MAX_QUERIES = int(os.environ.get("REAPI_PLANNER_MAX_QUERIES", "32"))
+PLANNER_MAX_RECORDS = int(os.environ.get("REAPI_PLANNER_MAX_RECORDS", "50000"))
+
+# Keys that select pages rather than the search itself
+PAGING_KEYS = ("count", "size", "resultIndex")
+# Values the API assumes when a key is left out
+DEFAULTS = {"count": False, "ids_only": False, "obfuscate": False, "summary": False}
+
+# Range filter base name -> record field (``<base>_min``, ``<base>_max``,
+# or ``<base>`` with ``<base>_operator``)
+RANGE_FIELDS = {
+    "baths": "bathrooms",
+    "beds": "bedrooms",
+    "building_size": "squareFeet",
+    "equity_percent": "equityPercent",
+    "estimated_equity": "estimatedEquity",
+    "last_sale_price": "lastSaleAmount",
+    "lot_size": "lotSquareFeet",
+    "ltv": "ltv",
+    "median_income": "medianIncome",
+    "rooms": "rooms",
+    "stories": "stories",
+    "units": "unitsCount",
+    "value": "estimatedValue",
+    "year_built": "yearBuilt",
+    "years_owned": "yearsOwned",
+}
+DATE_RANGE_FIELDS = {
+    "auction_date": "auctionDate",
+    "foreclosure_date": "foreclosureDate",
+    "last_sale_date": "lastSaleDate",
+    "pre_foreclosure_date": "preForeclosureDate",
+}
+# Boolean filter -> record flag
+FLAG_FIELDS = {
+    "absentee_owner": "absenteeOwner",
+    "adjustable_rate": "adjustableRate",
+    "assumable": "assumable",
+    "auction": "auction",
+    "basement": "basement",
+    "cash_buyer": "cashBuyer",
+    "corporate_owned": "corporateOwned",
+    "death": "death",
+    "deck": "deck",
+    "equity": "equity",
+    "flood_zone": "floodZone",
+    "foreclosure": "foreclosure",
+    "free_clear": "freeClear",
+    "garage": "garage",
+    "high_equity": "highEquity",
+    "in_state_owner": "inStateAbsenteeOwner",
+    "inherited": "inherited",
+    "investor_buyer": "investorBuyer",
+    "judgment": "judgment",
+    "mfh_2to4": "MFH2to4",
+    "mfh_5plus": "MFH5plus",
+    "negative_equity": "negativeEquity",
+    "out_of_state_owner": "outOfStateAbsenteeOwner",
+    "patio": "patio",
+    "pool": "pool",
+    "pre_foreclosure": "preForeclosure",
+    "private_lender": "privateLender",
+    "quit_claim": "quitClaim",
+    "reo": "reo",
+    "rv_parking": "rvParking",
+    "tax_lien": "taxLien",
+    "trust_owned": "trustOwned",
+    "vacant": "vacant",
+}
+# Location filter -> address field; each may list several values
+LOCATION_FIELDS = {"state": "state", "city": "city", "county": "county", "zip": "zip"}
+OPERATORS = ("gt", "gte", "lt", "lte")
+
+
+# --- Canonical Payloads ---
+
+
+def _zip_codes(value):
+    if isinstance(value, str):
+        value = value.split(",")
+    return sorted({str(code).strip() for code in value if str(code).strip()})
+
+
+def _canonical_value(key, value):
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        value = value.strip()
+        if "date" in key and len(value) > 10 and value[10] in "T ":
+            return value[:10]
+    return value
+
+
+def canonicalize(params):
+    """Returns ``params`` without noise or defaults, in a canonical form."""
+    canonical = {}
+    for key, value in params.items():
+        if key == "zip" and value is not None:
+            codes = _zip_codes(value)
+            value = codes[0] if len(codes) == 1 else codes
+        value = _canonical_value(key, value)
+        if value is None or value == "" or value == []:
+            continue
+        if key in DEFAULTS and value == DEFAULTS[key] and type(value) is type(DEFAULTS[key]):
+            continue
+        if key.endswith(("_min", "_max")) and value == 0 and not isinstance(value, bool):
+            continue
+        canonical[key] = value
+    # An operator without its value (e.g. the value was left at 0) is noise too
+    for key in [key for key in canonical if key.endswith("_operator")]:
+        if key[:-len("_operator")] not in canonical:
+            del canonical[key]
+    return dict(sorted(canonical.items()))
+
+
+def query_key(params, transform=None, typed=False):
+    """Identifies the search in ``params`` (paging keys excluded) and how its records are decoded."""
+    search = {key: value for key, value in canonicalize(params).items() if key not in PAGING_KEYS}
+    return json.dumps(
+        [search, getattr(transform, "__qualname__", None), typed], sort_keys=True, default=str
+    )
+
+
+# --- Constraints ---
+
+
+class _Interval:
+    """A range of allowed values; ``None`` bounds are open."""
+
+    def __init__(self):
+        self.low = self.high = None
+        self.low_inclusive = self.high_inclusive = True
+
+    def restrict(self, operator, bound):
+        if operator in ("gt", "gte") and (
+            self.low is None or bound > self.low or bound == self.low and operator == "gt"
+        ):
+            self.low, self.low_inclusive = bound, operator == "gte"
+        if operator in ("lt", "lte") and (
+            self.high is None or bound < self.high or bound == self.high and operator == "lt"
+        ):
+            self.high, self.high_inclusive = bound, operator == "lte"
+
+    def within(self, other):
+        """Whether every value allowed here is allowed by ``other``."""
+        if other.low is not None:
+            if self.low is None or self.low < other.low:
+                return False
+            if self.low == other.low and self.low_inclusive and not other.low_inclusive:
+                return False
+        if other.high is not None:
+            if self.high is None or self.high > other.high:
+                return False
+            if self.high == other.high and self.high_inclusive and not other.high_inclusive:
+                return False
+        return True
+
+    def allows(self, value):
+        if self.low is not None and (value < self.low or value == self.low and not self.low_inclusive):
+            return False
+        if self.high is not None and (
+            value > self.high or value == self.high and not self.high_inclusive
+        ):
+            return False
+        return True
+
+    def __eq__(self, other):
+        return isinstance(other, _Interval) and vars(self) == vars(other)
+
+
+def _is_range(base):
+    return base in RANGE_FIELDS or base in DATE_RANGE_FIELDS
+
+
+def _range_base(key):
+    """Returns ``(base, operator)`` for a ``_min``/``_max`` range key, or ``(None, None)``."""
+    for suffix, operator in (("_min", "gte"), ("_max", "lte")):
+        if key.endswith(suffix) and _is_range(key[:-len(suffix)]):
+            return key[:-len(suffix)], operator
+    return None, None
+
+
+def _constraints(canonical):
+    """Splits a canonical search into what the planner can check per record and the rest.
+
+    Returns ``(intervals, flags, locations, exact)``: intervals and flags
+    keyed by record field, location value sets keyed by address field, and
+    the remaining keys, which must match exactly.
+    """
+    intervals, flags, locations, exact = {}, {}, {}, {}
+    for key, value in canonical.items():
+        if key in PAGING_KEYS:
+            continue
+        if key.endswith("_operator") and _is_range(key[:-len("_operator")]):
+            if value in OPERATORS and key[:-len("_operator")] in canonical:
+                continue  # Read along with its value
+        base, operator = _range_base(key)
+        if base is None and _is_range(key):
+            base, operator = key, canonical.get(f"{key}_operator")
+        if operator in OPERATORS:
+            if base in DATE_RANGE_FIELDS:
+                field, bound = DATE_RANGE_FIELDS[base], str(value)
+            else:
+                field, bound = RANGE_FIELDS[base], value
+            if isinstance(bound, (int, float)) and not isinstance(bound, bool) or (
+                base in DATE_RANGE_FIELDS
+            ):
+                intervals.setdefault(field, _Interval()).restrict(operator, bound)
+                continue
+        if key in FLAG_FIELDS and isinstance(value, bool):
+            flags[FLAG_FIELDS[key]] = value
+        elif key in LOCATION_FIELDS:
+            values = value if isinstance(value, list) else [value]
+            locations[LOCATION_FIELDS[key]] = {str(item).lower() for item in values}
+        else:
+            exact[key] = value
+    return intervals, flags, locations, exact
+
+
+def _record_value(record, field, nested_in=None):
+    """Reads ``field`` from a typed, raw or flattened record (``address_zip``)."""
+    if not hasattr(record, "get"):
+        return None
+    if nested_in is None:
+        return record.get(field)
+    value = record.get(f"{nested_in}_{field}")
+    if value is None:
+        parent = record.get(nested_in)
+        if isinstance(parent, dict):
+            value = parent.get(field)
+    return value
+
+
+def _date_string(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    return str(value)[:10]
+
+
+def plan_filter(narrow, wide):
+    """Returns a record predicate if search ``narrow`` is a subset of search ``wide``, else None.
+
+    Both are canonical payloads. The predicate only checks the filters
+    ``narrow`` tightens; it returns None for a record it can't check.
+    """
+    n_intervals, n_flags, n_locations, n_exact = _constraints(narrow)
+    w_intervals, w_flags, w_locations, w_exact = _constraints(wide)
+    if n_exact != w_exact:
+        return None
+    checks = []
+    for field, interval in w_intervals.items():
+        if field not in n_intervals or not n_intervals[field].within(interval):
+            return None
+    for field, interval in n_intervals.items():
+        if interval != w_intervals.get(field):
+            is_date = field in DATE_RANGE_FIELDS.values()
+            checks.append((field, None, "date" if is_date else "number", interval))
+    for field, value in w_flags.items():
+        if n_flags.get(field) != value:
+            return None
+    checks.extend(
+        (field, None, "flag", value) for field, value in n_flags.items() if field not in w_flags
+    )
+    for field, values in w_locations.items():
+        if field not in n_locations or not n_locations[field] <= values:
+            return None
+    checks.extend(
+        (field, "address", "location", values)
+        for field, values in n_locations.items()
+        if values != w_locations.get(field)
+    )
+
+    def predicate(record):
+        for field, nested_in, kind, wanted in checks:
+            value = _record_value(record, field, nested_in)
+            if value is None:
+                return None
+            if kind == "flag":
+                if bool(value) != wanted:
+                    return False
+            elif kind == "location":
+                if str(value).lower() not in wanted:
+                    return False
+            elif kind == "date":
+                if not wanted.allows(_date_string(value)):
+                    return False
+            else:
+                try:
+                    if not wanted.allows(float(value)):
+                        return False
+                except (TypeError, ValueError):
+                    return None
+        return True
+
+    return predicate
+
+
+# --- Planner ---
+
+
+class QueryPlanner:
+    """Complete result sets of recent searches, used to answer narrower searches locally."""
+
+    def __init__(self, ttl=PLANNER_TTL_SECONDS, max_queries=PLANNER_MAX_QUERIES,
+                 max_records=PLANNER_MAX_RECORDS):
+        self.ttl = ttl
+        self.max_queries = max_queries
+        self.max_records = max_records
+        # query key -> (time, canonical, decoding, records, owner)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"answered": 0, "declined": 0, "recorded": 0}
+
+    def record(self, params, records, result_count, transform=None, typed=False, owner=None):
+        """Remembers ``records`` as the whole result set of the search in ``params``.
+
+        Ignored unless ``records`` really is the whole result set and it fits
+        in ``max_records``. Only searches by the same ``owner`` (e.g. a
+        digest of the API key that paid for the records) are answered from it.
+        """
+        if result_count is None or len(records) < result_count or result_count > self.max_records:
+            return False
+        canonical = canonicalize(params)
+        if canonical.get("ids_only") or canonical.get("count"):
+            return False
+        key = (owner, query_key(params, transform, typed))
+        decoding = (getattr(transform, "__qualname__", None), typed)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), canonical, decoding, list(records), owner)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_queries:
+                self._entries.popitem(last=False)
+            self.stats["recorded"] += 1
+        return True
+
+    def evict_rows(self, row_ids):
+        """Forgets the searches holding any record whose ``id()`` is in ``row_ids``."""
+        with self._lock:
+            keys = [
+                key for key, entry in self._entries.items()
+                if any(id(record) in row_ids for record in entry[3])
+            ]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def _candidates(self, decoding=None, owner=None):
+        """``owner``'s remembered searches whose records were decoded as ``decoding`` (None: any)."""
+        now = time.monotonic()
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if now - entry[0] > self.ttl:
+                    del self._entries[key]
+            # Smallest result sets first: less to filter
+            return sorted(
+                (
+                    entry for entry in self._entries.values()
+                    if entry[4] == owner and (decoding is None or entry[2] == decoding)
+                ),
+                key=lambda entry: len(entry[3]),
+            )
+
+    def matching_records(self, params, transform=None, typed=False, any_decoding=False,
+                         owner=None):
+        """All records of the search in ``params`` if a remembered search covers it, else None.
+
+        With ``any_decoding`` the records may come from a search decoded
+        differently, which is enough to count them.
+        """
+        canonical = canonicalize(params)
+        decoding = None if any_decoding else (getattr(transform, "__qualname__", None), typed)
+        for _, wide, _, records, _ in self._candidates(decoding, owner):
+            predicate = plan_filter(canonical, wide)
+            if predicate is None:
+                continue
+            matches = []
+            for record in records:
+                keep = predicate(record)
+                if keep is None:
+                    break  # A record lacks a field the filter needs
+                if keep:
+                    matches.append(record)
+            else:
+                return matches
+        return None
+
+    def answer(self, payload, transform=None, typed=False, owner=None):
+        """Answers a PropertySearch payload locally, or returns None if it needs the API.
+
+        The response has the shape of an API response, marked ``fromPlanner``.
+        """
+        matches = self.matching_records(
+            payload, transform, typed, any_decoding=bool(payload.get("count")), owner=owner
+        )
+        api_metrics.observe_cache_lookup("planner", matches is not None)
+        with self._lock:
+            self.stats["answered" if matches is not None else "declined"] += 1
+        if matches is None:
+            return None
+        result_index = int(payload.get("resultIndex") or 0)
+        if payload.get("count"):
+            page = []
+        else:
+            size = int(payload.get("size") or 0)
+            page = matches[result_index:result_index + size]
+        return {
+            "data": page,
+            "resultCount": len(matches),
+            "resultIndex": result_index,
+            "recordCount": len(page),
+            "statusCode": 200,
+            "fromPlanner": True,
+        }
+
+    def summary(self):
+        with self._lock:
+            return {
+                **self.stats,
+                "queries held": len(self._entries),
+                "records held": sum(len(entry[3]) for entry in self._entries.values()),
+            }
+
+
+def render_planner_stats(planner):
+    """Displays how many searches the planner answered without the API."""
+    import streamlit as st
+
+    st.table([{"metric": name, "value": value} for name, value in planner.summary().items()])
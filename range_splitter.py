@@ -0,0 +1,358 @@
+"""Pulling oversized searches as parallel slices of a numeric range.
+
+Deep ``resultIndex`` offsets get slow (or capped) on very broad searches,
+so walking one huge result set page by page is slow and fragile. Instead,
+``split_pull`` bisects the search along a range filter the sidebar already
+supports (``value`` or ``year_built``, as ``<field>_min`` and
+``<field>_max``) until every slice matches at most
+``REAPI_SLICE_MAX_RECORDS`` records, using free count-only requests. The
+slices are then pulled in parallel threads over the shared connection pool
+and merged in range order, de-duplicated by property id.
+
+Bounds are inclusive and whole units (dollars, years), so adjacent slices
+don't overlap. The first split counts both halves to check that the API
+applies the range filter and that the counts add up; later splits count
+only the lower half. Records with no value for the split field can't fall
+in any slice; how many there are is reported as ``unreachable``. Each slice
+is pulled through the fetch budget and journaled, so running the same pull
+again after a failure resumes where it stopped.
+
+    python range_splitter.py --split-by value --filters '{"state": "FL"}' --api-key ...
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+
+import fetch_budget
+import property_store
+import pull_journal
+
+SLICE_MAX_RECORDS = int(os.environ.get("REAPI_SLICE_MAX_RECORDS", "5000"))
+SLICE_WORKERS = int(os.environ.get("REAPI_SLICE_WORKERS", "4"))
+MAX_SLICES = int(os.environ.get("REAPI_MAX_SLICES", "512"))
+PROGRESS_INTERVAL_SECONDS = 0.2
+
+# Field -> (label, default lowest value, default highest value)
+SPLIT_FIELDS = {
+    "value": ("Estimated value", 0, 1_000_000_000),
+    "year_built": ("Year built", 1700, date.today().year),
+}
+
+
+def _bounds(filter_params, field):
+    """The range to split: the search's own ``_min``/``_max`` for ``field``, else the defaults."""
+    _, low, high = SPLIT_FIELDS[field]
+    low = filter_params.get(f"{field}_min") or low
+    high = filter_params.get(f"{field}_max") or high
+    return int(low), int(high)
+
+
+class SliceReport:
+    """One slice of the range, with its progress and outcome."""
+
+    def __init__(self, field, low, high, count):
+        self.field = field
+        self.low = low
+        self.high = high
+        self.count = count
+        self.allowance = count
+        self.records = 0
+        self.pages = 0
+        self.seconds = None
+        self.truncated = False
+        self.reason = None
+        self.resumed_pages = 0
+        self.error = None
+
+    @property
+    def params(self):
+        return {f"{self.field}_min": self.low, f"{self.field}_max": self.high}
+
+    @property
+    def done(self):
+        return self.seconds is not None or self.error is not None
+
+    def as_row(self):
+        return {
+            "slice": f"{self.low} - {self.high}",
+            "matching": self.count,
+            "records": self.records,
+            "pages": self.pages,
+            "resumed pages": self.resumed_pages,
+            "seconds": None if self.seconds is None else round(self.seconds, 2),
+            "status": self.error or (
+                "skipped" if not self.allowance else
+                self.reason or "truncated" if self.truncated else
+                "done" if self.done else "pending"
+            ),
+        }
+
+
+class SplitPullResult:
+    """Merged records of a range-split pull, with a report per slice."""
+
+    def __init__(self, field):
+        self.field = field
+        self.slices = []
+        self.records = []
+        self.duplicates = 0
+        self.result_count = None  # Matches of the search before splitting
+        self.unreachable = 0  # Matches with no value in the split range
+        self.count_requests = 0
+        self.seconds = 0.0
+
+    @property
+    def records_per_second(self):
+        return len(self.records) / self.seconds if self.seconds else None
+
+    @property
+    def incomplete(self):
+        """Slices that stopped early and can be resumed by pulling again."""
+        return [piece for piece in self.slices if piece.truncated or piece.error is not None]
+
+
+def _count(budget, filter_params, user_id, api_key):
+    data, _ = budget.search({**filter_params, "count": True}, user_id, api_key)
+    return int(data.get("resultCount") or 0)
+
+
+def plan_slices(filter_params, field, user_id, api_key, max_slice=SLICE_MAX_RECORDS,
+                max_slices=MAX_SLICES, budget=None, max_workers=SLICE_WORKERS):
+    """Bisects the range of ``field`` until each slice matches at most ``max_slice`` records.
+
+    Only the lower half of each split is counted; the upper half is the
+    parent's count minus it. Empty slices are dropped. A slice that can't be
+    split further (a single value) is kept however large it is.
+
+    Raises ValueError if the halves of the first split don't add up to the
+    whole, i.e. the API doesn't apply the ``_min``/``_max`` filters.
+    """
+    if field not in SPLIT_FIELDS:
+        raise ValueError(f"Can't split by {field!r}; expected one of {', '.join(SPLIT_FIELDS)}")
+    budget = budget if budget is not None else fetch_budget.default_budget()
+    result = SplitPullResult(field)
+    base = {key: value for key, value in filter_params.items()
+            if key not in (f"{field}_min", f"{field}_max", "size", "resultIndex", "count")}
+    low, high = _bounds(filter_params, field)
+    root = SliceReport(field, low, high, None)
+    result.result_count = _count(budget, filter_params, user_id, api_key)
+    root.count = _count(budget, {**base, **root.params}, user_id, api_key)
+    result.count_requests += 2
+    result.unreachable = max(0, result.result_count - root.count)
+
+    final, pending = [], [root]
+    first_split = True
+    with ThreadPoolExecutor(max(1, max_workers)) as pool:
+        while pending:
+            # Each split adds one slice; stop splitting at max_slices
+            splits_left = max(0, max_slices - len(final) - len(pending))
+            splittable = [
+                piece for piece in pending if piece.count > max_slice and piece.low < piece.high
+            ][:splits_left]
+            final.extend(piece for piece in pending if piece not in splittable and piece.count)
+            halves = []
+            for piece in splittable:
+                middle = (piece.low + piece.high) // 2
+                halves.append((
+                    piece,
+                    SliceReport(field, piece.low, middle, None),
+                    SliceReport(field, middle + 1, piece.high, None),
+                ))
+            counted = [lower for _, lower, _ in halves]
+            if first_split and halves:
+                counted.append(halves[0][2])  # Also count the upper half, once
+            counts = list(pool.map(
+                lambda half: _count(budget, {**base, **half.params}, user_id, api_key),
+                counted,
+            ))
+            result.count_requests += len(counts)
+            if first_split and halves:
+                first_split = False
+                piece = halves[0][0]
+                if counts[0] + counts[-1] != piece.count:
+                    raise ValueError(
+                        f"Can't split by {field!r}: the halves of {piece.low}-{piece.high} "
+                        f"match {counts[0]:,} + {counts[-1]:,} records, not {piece.count:,}"
+                    )
+            pending = []
+            for (piece, lower, upper), count in zip(halves, counts):
+                lower.count = count
+                upper.count = max(0, piece.count - count)
+                pending.extend((lower, upper))
+    result.slices = sorted(final, key=lambda piece: piece.low)
+    return result, base
+
+
+def _pull_slice(budget, piece, base, user_id, api_key, page_size, transform, typed,
+                resumable):
+    started = time.perf_counter()
+    params = {**base, **piece.params}
+    journal = (
+        pull_journal.PullJournal.for_pull(user_id, params, page_size, transform, typed)
+        if resumable else None
+    )
+
+    def on_page(pulled):
+        piece.records, piece.pages = len(pulled.records), pulled.pages
+
+    pulled = budget.pull(
+        params, user_id, api_key, piece.allowance, page_size=page_size,
+        transform=transform, typed=typed, on_page=on_page, journal=journal,
+    )
+    piece.seconds = time.perf_counter() - started
+    return pulled
+
+
+def split_pull(filter_params, field, user_id, api_key, max_records, max_slice=SLICE_MAX_RECORDS,
+               page_size=250, transform=None, typed=True, max_workers=SLICE_WORKERS,
+               on_progress=None, resumable=True, budget=None):
+    """Splits a search into slices of ``field`` and pulls them in parallel, up to ``max_records``.
+
+    ``on_progress(result)`` is called from the calling thread as slices
+    progress. Slices are given records in range order until
+    ``max_records`` is used up; the rest are skipped. A slice that fails
+    keeps its error in its report and the others' records are still returned.
+    """
+    budget = budget if budget is not None else fetch_budget.default_budget()
+    started = time.perf_counter()
+    result, base = plan_slices(
+        filter_params, field, user_id, api_key, max_slice=max_slice, budget=budget,
+        max_workers=max_workers,
+    )
+    remaining = max_records
+    for piece in result.slices:
+        piece.allowance = min(piece.count, remaining)
+        remaining -= piece.allowance
+    if on_progress is not None:
+        on_progress(result)
+
+    outputs = {}
+    with ThreadPoolExecutor(max(1, max_workers), thread_name_prefix="reapi-slice") as pool:
+        futures = {
+            pool.submit(
+                _pull_slice, budget, piece, base, user_id, api_key, page_size, transform,
+                typed, resumable,
+            ): index
+            for index, piece in enumerate(result.slices) if piece.allowance
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, PROGRESS_INTERVAL_SECONDS, FIRST_COMPLETED)
+            for future in done:
+                piece = result.slices[futures[future]]
+                try:
+                    pulled = future.result()
+                except Exception as e:
+                    piece.error = f"{type(e).__name__}: {e}"
+                    continue
+                outputs[futures[future]] = pulled.records
+                piece.records = len(pulled.records)
+                piece.pages = pulled.pages
+                piece.truncated = pulled.truncated
+                piece.reason = pulled.reason
+                piece.resumed_pages = pulled.resumed_pages
+            if on_progress is not None:
+                on_progress(result)
+
+    seen = set()
+    for index in sorted(outputs):
+        for record in outputs[index]:
+            key = property_store.record_key(record)
+            if key in seen:
+                result.duplicates += 1
+                continue
+            seen.add(key)
+            result.records.append(record)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def render_range_split_panel(filter_params, user_id, api_key):
+    """Sidebar controls for a range-split pull; returns the merged result once one has run."""
+    import streamlit as st
+
+    from property_data import flatten_property
+
+    field = st.selectbox("Split by", list(SPLIT_FIELDS),
+                         format_func=lambda name: SPLIT_FIELDS[name][0])
+    max_slice = st.number_input("Max records per slice", min_value=100, max_value=50000,
+                                value=SLICE_MAX_RECORDS, step=500)
+    max_records = st.number_input("Max records in total", min_value=1, max_value=1_000_000,
+                                  value=20000, step=5000)
+    if not st.button("Run range-split pull"):
+        return None
+
+    status = st.empty()
+    table = st.empty()
+
+    def on_progress(result):
+        finished = sum(piece.done for piece in result.slices)
+        status.caption(
+            f"{len(result.slices)} slices from {result.count_requests} count requests; "
+            f"{finished} pulled"
+        )
+        table.dataframe([piece.as_row() for piece in result.slices])
+
+    with st.spinner("Splitting the search..."):
+        try:
+            result = split_pull(
+                filter_params, field, user_id, api_key, int(max_records),
+                max_slice=int(max_slice), transform=flatten_property, on_progress=on_progress,
+            )
+        except ValueError as e:
+            st.error(str(e))
+            return None
+    st.success(
+        f"{len(result.records):,} of {result.result_count:,} records from "
+        f"{len(result.slices)} slices in {result.seconds:.1f}s "
+        f"({result.records_per_second or 0:,.0f} records/s)"
+    )
+    if result.unreachable:
+        st.info(f"{result.unreachable:,} matches have no {SPLIT_FIELDS[field][0].lower()} "
+                "in range and can't be reached by splitting on it.")
+    if result.incomplete:
+        st.warning(
+            f"{len(result.incomplete)} slices stopped early. Run the pull again to resume "
+            "them; completed pages are not requested again."
+        )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pull a large search as parallel range slices.")
+    parser.add_argument("--split-by", choices=list(SPLIT_FIELDS), default="value")
+    parser.add_argument("--filters", default="{}", help="Other search filters, as JSON")
+    parser.add_argument("--max-records", type=int, default=20000, help="In total")
+    parser.add_argument("--max-slice", type=int, default=SLICE_MAX_RECORDS)
+    parser.add_argument("--page-size", type=int, default=250)
+    parser.add_argument("--workers", type=int, default=SLICE_WORKERS)
+    parser.add_argument("--user-id", default=os.environ.get("REAPI_USER_ID", "UniqueUserIdentifier"))
+    parser.add_argument("--api-key", default=os.environ.get("REAPI_API_KEY"))
+    args = parser.parse_args()
+
+    def on_progress(result):
+        finished = sum(piece.done for piece in result.slices)
+        records = sum(piece.records for piece in result.slices)
+        print(f"\r{finished}/{len(result.slices)} slices, {records:,} records", end="", flush=True)
+
+    result = split_pull(
+        json.loads(args.filters), args.split_by, args.user_id, args.api_key, args.max_records,
+        max_slice=args.max_slice, page_size=args.page_size, max_workers=args.workers,
+        on_progress=on_progress,
+    )
+    print()
+    for piece in result.slices:
+        print(piece.as_row())
+    print(
+        f"{len(result.records):,} records ({result.duplicates} duplicates dropped, "
+        f"{result.unreachable:,} unreachable) in {result.seconds:.2f}s from "
+        f"{result.count_requests} count requests, "
+        f"{result.records_per_second or 0:,.0f} records/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
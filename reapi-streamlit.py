@@ -2,29 +2,45 @@ import streamlit as st
 import pandas as pd
 import requests
 import json
-from st_aggrid import GridOptionsBuilder, AgGrid, DataReturnMode, GridUpdateMode
-import plotly.express as px
-import pydeck as pdk
 import re
 
+import api_metrics
+import chart_modes
+import fetch_budget
+import lead_scoring
+from property_data import flatten_property
+import property_detail
+import property_store
+import query_planner
+import range_splitter
+import result_export
+import result_pager
+import rerun_profiler
+import session_memory
+import sharded_pull
+import traffic_journal
+# Plotly, pydeck and st_aggrid are loaded on first use (see viz_backends.py)
+import viz_backends
+
 # --- Constants ---
 API_KEY_STORAGE_KEY = "real_estate_api_key"
 USER_ID_STORAGE_KEY = "real_estate_user_id"
 DEFAULT_USER_ID = "UniqueUserIdentifier"
 PAGE_SIZE = 50  # Number of results per page
+ESTIMATE_THRESHOLD = 500  # Larger requests are counted and costed before fetching
 
 # --- Helper Functions ---
 
 
-def get_page_of_properties(filter_params, result_index=0, page_size=PAGE_SIZE):
-    """Retrieves a single page of properties from the API."""
-    url = "https://api.realestateapi.com/v2/PropertySearch"
-    headers = {
-        "accept": "application/json",
-        "content-type": "application/json",
-        "x-user-id": st.session_state.user_id,
-        "x-api-key": st.session_state.api_key,
-    }
+def get_page_of_properties(filter_params, result_index=0, page_size=PAGE_SIZE,
+                           transform=None):
+    """Retrieves a single page of properties from the API.
+
+    Records are decoded into typed ``PropertyRecord`` objects as the
+    response streams in; ``transform`` (e.g. ``flatten_property``) is applied
+    to each record as soon as it is decoded. The request is served from the
+    response cache when possible and is capped to the user's credit budget.
+    """
     payload = {
         "count": False,
         "size": page_size,
@@ -33,15 +49,19 @@ def get_page_of_properties(filter_params, result_index=0, page_size=PAGE_SIZE):
     }
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-<<<<<<< Updated upstream
-        data = response.json()
+        with rerun_profiler.phase("network"):
+            data, _ = fetch_budget.default_budget().search(
+                payload, st.session_state.user_id, st.session_state.api_key,
+                transform=transform, typed=True,
+            )
+        if data.get("budgetTruncated"):
+            st.warning(
+                f"Your daily record budget limited this page to {len(data['data'])} records."
+            )
         return data
-=======
-        print("API Response:", response.json())
-        return response.json()
->>>>>>> Stashed changes
+    except fetch_budget.BudgetExceeded as e:
+        st.warning(str(e))
+        return None
     except requests.RequestException as e:
         st.error(f"API call failed: {str(e)}")
         if hasattr(e, "response") and e.response is not None:
@@ -49,20 +69,71 @@ def get_page_of_properties(filter_params, result_index=0, page_size=PAGE_SIZE):
         return None
 
 
-def flatten_property_data(properties):
-    """Flattens the nested JSON structure of the property data."""
-    display_data = []
-    for prop in properties:
-        flattened_prop = {}
-        for key, value in prop.items():
-            if isinstance(value, dict):
-                flattened_prop.update(
-                    {f"{key}_{sub_key}": sub_value for sub_key, sub_value in value.items()}
-                )
-            else:
-                flattened_prop[key] = value
-        display_data.append(flattened_prop)
-    return display_data
+def show_page(pager, page):
+    """Makes ``page`` of the current search the displayed results and prefetches its neighbours."""
+    try:
+        with rerun_profiler.phase("network"):
+            data = pager.get(page)
+    except fetch_budget.BudgetExceeded as e:
+        st.warning(str(e))
+        return False
+    except requests.RequestException as e:
+        st.error(f"API call failed: {str(e)}")
+        if hasattr(e, "response") and e.response is not None:
+            st.error(f"Response content: {e.response.text}")
+        return False
+    if data.get("budgetTruncated"):
+        st.warning(
+            f"Your daily record budget limited this page to {len(data['data'])} records."
+        )
+    # Rows live once in the process-wide store; the session keeps slots
+    st.session_state.results = property_store.get_store().add_rows(data.get("data", []))
+    st.session_state.total_pages = pager.total_pages
+    st.session_state.current_page = page
+    update_lead_ranking(data.get("data", []))
+    pager.prefetch_around(page)
+    return True
+
+
+def update_lead_ranking(rows, reset=False):
+    """Adds ``rows`` to the search's top leads, starting over if the weights changed."""
+    weights, k = st.session_state.lead_settings
+    ranking = st.session_state.lead_ranking
+    if reset or ranking is None or ranking.weights != weights or ranking.k != k:
+        ranking = st.session_state.lead_ranking = lead_scoring.LeadRanking(k, weights)
+    with rerun_profiler.phase("lead scores"):
+        ranking.add(rows)
+    return ranking
+
+
+def hydrate_selected_rows(selected_rows):
+    """Fetches full details for the selected rows and merges them into the results."""
+    property_ids = [row["id"] for row in selected_rows if row.get("id")]
+    if not property_ids:
+        st.warning("The selected rows have no property ids to look up.")
+        return None
+
+    progress = st.progress(0.0, text="Fetching property details...")
+
+    def on_batch(result, total):
+        progress.progress(result.done / total, text=f"Fetched {result.done} of {total}")
+
+    with rerun_profiler.phase("hydrate"):
+        result = property_detail.hydrate(
+            property_ids, st.session_state.user_id, st.session_state.api_key,
+            budget=fetch_budget.default_budget(), on_batch=on_batch,
+        )
+        property_detail.merge_into_store(result.details)
+    progress.empty()
+    st.success(
+        f"Hydrated {len(result.details)} properties "
+        f"({result.cache_hits} from cache, {result.fetched} fetched)."
+    )
+    if result.skipped:
+        st.warning(f"Skipped {len(result.skipped)} properties: daily record budget reached.")
+    if result.failed:
+        st.error(f"Could not fetch details for {len(result.failed)} properties.")
+    return result
 
 
 def is_valid_zip_code(zip_code):
@@ -76,12 +147,6 @@ def is_valid_zip_code(zip_code):
 def main():
     # --- Sidebar --- #
     st.sidebar.header("Search Parameters")
-<<<<<<< Updated upstream
-=======
-
-    # Move the Search button to the top
-    search_clicked = st.sidebar.button("Search")
->>>>>>> Stashed changes
 
     # Initialize zip_codes_input in session state if it doesn't exist
     if 'zip_codes_input' not in st.session_state:
@@ -111,6 +176,12 @@ def main():
         st.session_state.total_pages = 1
     if "current_page" not in st.session_state:
         st.session_state.current_page = 1
+    if "pager" not in st.session_state:
+        st.session_state.pager = None
+    if "lead_ranking" not in st.session_state:
+        st.session_state.lead_ranking = None
+    if "params" not in st.session_state:
+        st.session_state.params = {}
 
     # --- Sidebar ---
     st.sidebar.header("API Configuration")
@@ -141,16 +212,6 @@ def main():
     address = st.sidebar.text_input("Address")
     city = st.sidebar.text_input("City")
     state = st.sidebar.text_input("State")
-<<<<<<< Updated upstream
-=======
-
-    # Zip Code Input with Multiple Values
-    zip_codes_input = st.sidebar.text_input("ZIP Codes (comma-separated)", value=st.session_state.zip_codes_input)
-    if zip_codes_input:
-        zip_code_list = [z.strip() for z in zip_codes_input.split(",") if is_valid_zip_code(z.strip())]
-        if zip_code_list:
-            st.session_state.search_filter["zip"] = zip_code_list
->>>>>>> Stashed changes
 
     # Zip Code Input with Multiple Values and Validation
     zip_codes_input = st.sidebar.text_input("ZIP Codes (comma-separated)")
@@ -164,6 +225,14 @@ def main():
     summary = st.sidebar.radio("Summary", ("", "True", "False"))
     size = st.sidebar.number_input("Size", min_value=1, value=50)
     result_index = st.sidebar.number_input("Result Index", min_value=0, value=0)
+    prefetch_paid = st.sidebar.checkbox(
+        "Prefetch the next page even when it costs credits",
+        value=result_pager.PREFETCH_PAID,
+        help="Free pages (cached or answered locally) are always prefetched.",
+    )
+
+    with st.sidebar.expander("Lead Scoring"):
+        st.session_state.lead_settings = lead_scoring.render_weights_panel()
 
     # --- Advanced Filtering ---
     st.sidebar.header("Advanced Filters")
@@ -607,56 +676,142 @@ def main():
 
         # ... (Add other MLS-related input fields) ...
 
+    # --- Main Content ---
+    st.title("Real Estate Property Search")
+
+    if st.sidebar.button("Search"):
+        # Access params from session state
+        params = st.session_state.params
+
+        # Add parameters to `params` based on user input
+        if count != "":
+            params["count"] = count == "True"  # Convert string to boolean
+        if ids_only != "":
+            params["ids_only"] = ids_only == "True"
+        if obfuscate != "":
+            params["obfuscate"] = obfuscate == "True"
+        if summary != "":
+            params["summary"] = summary == "True"
+        params["size"] = size
+        params["resultIndex"] = result_index
 
-# --- Main Content ---
-st.title("Real Estate Property Search")
-
-<<<<<<< Updated upstream
-if st.sidebar.button("Search"):
-    # Access params from session state
-    params = st.session_state.params
-
-    # Add parameters to `params` based on user input
-    if count != "":
-        params["count"] = count == "True"  # Convert string to boolean
-    if ids_only != "":
-        params["ids_only"] = ids_only == "True"
-    if obfuscate != "":
-        params["obfuscate"] = obfuscate == "True"
-    if summary != "":
-        params["summary"] = summary == "True"
-    params["size"] = size
-    params["resultIndex"] = result_index
-
-    if address:
-        params["address"] = address
-    if city:
-        params["city"] = city
-    if state:
-        params["state"] = state
-    if property_type:
-        params["property_type"] = property_type
-    # ... (Add other parameters to params based on user input) ...
-
-    st.session_state.search_filter = params.copy()  # Store filter for later use
-
-    # Fetch initial page of results
-    data = get_page_of_properties(params)
-    if data:
-        st.session_state.results = flatten_property_data(data.get("data", []))
-        st.session_state.total_pages = (
-            data.get("resultCount", 0) // PAGE_SIZE
-            + (data.get("resultCount", 0) % PAGE_SIZE > 0)
+        if address:
+            params["address"] = address
+        if city:
+            params["city"] = city
+        if state:
+            params["state"] = state
+        if property_type:
+            params["property_type"] = property_type
+        zip_codes = [code.strip() for code in zip_codes_input.split(",") if code.strip()]
+        invalid_zip_codes = [code for code in zip_codes if not is_valid_zip_code(code)]
+        if invalid_zip_codes:
+            st.warning(f"Ignoring invalid ZIP codes: {', '.join(invalid_zip_codes)}")
+        params["zip"] = [code for code in zip_codes if is_valid_zip_code(code)]
+        # ... (Add other parameters to params based on user input) ...
+
+        # Drop defaults and empty values so equivalent searches look the same
+        params = query_planner.canonicalize(params)
+        st.session_state.search_filter = params.copy()  # Store filter for later use
+        st.session_state.lead_ranking = None
+        if st.session_state.pager is not None:
+            st.session_state.pager.close()  # Free the previous search's cached pages
+            st.session_state.pager = None
+
+        # Count and cost large requests before spending credits on them
+        if not params.get("count") and size > ESTIMATE_THRESHOLD:
+            try:
+                estimate = fetch_budget.default_budget().estimate(
+                    params, st.session_state.user_id, st.session_state.api_key,
+                    max_records=size,
+                )
+                st.info(
+                    f"{estimate['result_count']:,} matching records; fetching "
+                    f"{estimate['records']:,} costs ~{estimate['credits']:,.0f} credits, "
+                    f"{estimate['allowed_records']:,} allowed by your remaining budget."
+                )
+            except requests.RequestException as e:
+                st.warning(f"Could not estimate the cost of this search: {e}")
+
+        if params.get("count"):
+            data = get_page_of_properties(params, transform=flatten_property)
+            if data:
+                st.session_state.results = []
+                st.write(f"Total Results Found: {data.get('resultCount', 0):,}")
+        else:
+            # Page through the results from the requested index, flattening
+            # records as they arrive
+            st.session_state.pager = result_pager.Pager(
+                params, st.session_state.user_id, st.session_state.api_key,
+                page_size=size, first_index=result_index,
+                transform=flatten_property, typed=True, prefetch_paid=prefetch_paid,
+            )
+            show_page(st.session_state.pager, 1)
+
+    # --- Pager ---
+    pager = st.session_state.pager
+    if pager is not None:
+        pager.prefetch_paid = prefetch_paid
+    if pager is not None and st.session_state.results:
+        previous_column, position_column, next_column = st.columns([1, 2, 1])
+        current_page = st.session_state.current_page
+        if previous_column.button("Previous Page", disabled=current_page <= 1):
+            show_page(pager, current_page - 1)
+        if next_column.button("Next Page", disabled=current_page >= pager.total_pages):
+            show_page(pager, current_page + 1)
+        first = pager.offset(st.session_state.current_page)
+        position_column.caption(
+            f"Page {st.session_state.current_page:,} of {pager.total_pages:,} "
+            f"(results {first + 1:,}-{first + len(st.session_state.results):,} "
+            f"of {pager.result_count or 0:,})"
         )
 
+    # --- Sharded Pull ---
+    with st.sidebar.expander("Sharded Pull"):
+        st.caption("Pulls the last search split by location, in parallel worker processes.")
+        pulled = sharded_pull.render_sharded_pull_panel(
+            st.session_state.search_filter,
+            st.session_state.user_id, st.session_state.api_key,
+        )
+    with st.sidebar.expander("Range Split Pull"):
+        st.caption("Pulls the last search as parallel slices of a value or date range.")
+        split = range_splitter.render_range_split_panel(
+            st.session_state.search_filter,
+            st.session_state.user_id, st.session_state.api_key,
+        )
+    if split is not None:
+        pulled = split
+    if pulled is not None and pulled.records:
+        if st.session_state.pager is not None:
+            st.session_state.pager.close()
+            st.session_state.pager = None
+        st.session_state.results = property_store.get_store().add_rows(pulled.records)
+        st.session_state.total_pages = (
+            len(pulled.records) // PAGE_SIZE + (len(pulled.records) % PAGE_SIZE > 0)
+        )
+        st.session_state.current_page = 1
+        update_lead_ranking(pulled.records, reset=True)
+
+    # Display the current page of results (kept in session state so that
+    # switching display modes does not require another search)
+    if st.session_state.results:
+        current_page_results = st.session_state.results.rows()
+        lead_weights = st.session_state.lead_settings[0]
+        # Rescores the shown results when the weights change
+        lead_ranking = update_lead_ranking(current_page_results)
+
+        with st.expander(f"Top Leads ({len(lead_ranking.ranked())})"):
+            st.caption(
+                f"Best {lead_ranking.k} of the {lead_ranking.scored:,} properties "
+                "scored so far in this search."
+            )
+            st.dataframe(lead_ranking.rows())
 
-    # Fetch and display current page of results
-    data = get_page_of_properties(
-        st.session_state.search_filter,
-        (st.session_state.current_page - 1) * PAGE_SIZE,
-    )
-    if data:
-        current_page_results = flatten_property_data(data.get("data", []))
+        with st.expander("Export"):
+            export_rows = st.session_state.results
+            if st.checkbox("Top leads only", key="export_top_leads"):
+                export_rows = lead_ranking.rows()
+            result_export.render_export_panel(export_rows)
 
         # --- Data Display Options ---
         display_option = st.selectbox(
@@ -666,73 +821,79 @@ if st.sidebar.button("Search"):
 
         if display_option == "Table":
             # --- AgGrid Table ---
-            gb = GridOptionsBuilder.from_dataframe(
-                pd.DataFrame(current_page_results))
-            gb.configure_pagination(
-                paginationAutoPageSize=True, paginationPageSize=10
-            )
-=======
-        # Add all other parameters similarly based on user input
-        if address:
-            params["address"] = address
-        if city:
-            params["city"] = city
-        if state:
-            params["state"] = state
-        if property_type:
-            params["propertyType"] = property_type
-
-        # FETCH THE DATA HERE!
-        results = fetch_all_properties(params)
-        if results:
-            st.session_state.results = flatten_property_data(results)
-
-            # Display results in a responsive table with filtering options using AgGrid
-            df = pd.DataFrame(st.session_state.results)
-            gb = GridOptionsBuilder.from_dataframe(df)
-            gb.configure_pagination(paginationAutoPageSize=True)
->>>>>>> Stashed changes
-            gb.configure_side_bar()
-            gb.configure_selection(
-                selection_mode="single",
-                use_checkbox=True,
-                groupSelectsChildren="Group checkbox select children",
-            )
-            gridOptions = gb.build()
-
-            grid_response = AgGrid(
-                pd.DataFrame(current_page_results),
-                gridOptions=gridOptions,
-                data_return_mode="AS_INPUT",
-                update_mode="MODEL_CHANGED",
-                fit_columns_on_grid_load=False,
-                theme="dark",  # Enable dark mode
-                enable_enterprise_modules=True,
-<<<<<<< Updated upstream
-                height=350,
-                width="100%",
-                reload_data=True,
-=======
-                height=400,
-                width='100%',
-                reload_data=True
->>>>>>> Stashed changes
-            )
+            st_aggrid = viz_backends.aggrid()
+            with rerun_profiler.phase("dataframe"):
+                df = pd.DataFrame(current_page_results)
+            with rerun_profiler.phase("lead scores"):
+                df.insert(0, lead_scoring.SCORE_COLUMN,
+                          lead_scoring.score(df, lead_weights).round(1))
+            if st.checkbox("Sort by lead score"):
+                df = df.sort_values(lead_scoring.SCORE_COLUMN, ascending=False)
+            with rerun_profiler.phase("grid options"):
+                gb = st_aggrid.GridOptionsBuilder.from_dataframe(df)
+                gb.configure_pagination(
+                    paginationAutoPageSize=True, paginationPageSize=10
+                )
+                gb.configure_side_bar()
+                gb.configure_selection(
+                    selection_mode="multiple",
+                    use_checkbox=True,
+                    groupSelectsChildren="Group checkbox select children",
+                )
+                gridOptions = gb.build()
+
+            with rerun_profiler.phase("grid render"):
+                grid_response = st_aggrid.AgGrid(
+                    df,
+                    gridOptions=gridOptions,
+                    data_return_mode="AS_INPUT",
+                    update_mode="MODEL_CHANGED",
+                    fit_columns_on_grid_load=False,
+                    theme="dark",  # Enable dark mode
+                    enable_enterprise_modules=True,
+                    height=350,
+                    width="100%",
+                    reload_data=True,
+                )
             data = grid_response["data"]
             selected = grid_response["selected_rows"]
+            # Older st_aggrid versions return a list of dicts, newer ones a DataFrame
+            if hasattr(selected, "to_dict"):
+                selected = selected.to_dict("records")
             if selected:
-                st.write("Selected Row:")
+                st.write(f"Selected Rows: {len(selected)}")
                 st.dataframe(selected)
+                if st.button(f"Hydrate {len(selected)} selected"):
+                    result = hydrate_selected_rows(selected)
+                    if result and result.details:
+                        # The grid picks up the new columns on the next rerun
+                        hydrated_ids = set(result.details)
+                        st.dataframe(pd.DataFrame([
+                            row for row in st.session_state.results.rows()
+                            if str(row.get("id")) in hydrated_ids
+                        ]))
 
         elif display_option == "Map":
             # --- Map Display ---
-            # Filter out properties without latitude/longitude
+            if st.checkbox("Top leads only"):
+                map_rows = [row for _, row in lead_ranking.ranked()]
+            else:
+                map_rows = current_page_results
+            # Filter out properties without latitude/longitude; redder is a better lead
             map_data = [
-                prop
-                for prop in current_page_results
+                {
+                    "latitude": prop["latitude"],
+                    "longitude": prop["longitude"],
+                    "address": prop.get("address_address"),
+                    "leadScore": round(float(lead_score), 1),
+                    "color": [255, int(200 * (1 - lead_score / 100)), 0],
+                }
+                for prop, lead_score in zip(
+                    map_rows, lead_scoring.score(map_rows, lead_weights))
                 if prop.get("latitude") and prop.get("longitude")
             ]
             if map_data:
+                pdk = viz_backends.pydeck()
                 view_state = pdk.ViewState(
                     latitude=map_data[0]["latitude"],
                     longitude=map_data[0]["longitude"],
@@ -744,11 +905,12 @@ if st.sidebar.button("Search"):
                     data=map_data,
                     get_position=["longitude", "latitude"],
                     get_radius=100,
-                    get_color=[255, 0, 0],
+                    get_color="color",
                     pickable=True,
                 )
-                st.pydeck_chart(
-                    pdk.Deck(layers=[layer], initial_view_state=view_state))
+                with rerun_profiler.phase("map render"):
+                    st.pydeck_chart(
+                        pdk.Deck(layers=[layer], initial_view_state=view_state))
             else:
                 st.warning(
                     "No properties with latitude and longitude to display on the map."
@@ -765,13 +927,79 @@ if st.sidebar.button("Search"):
                     "X-axis", list(current_page_results[0].keys()))
                 y_axis = st.selectbox(
                     "Y-axis", list(current_page_results[0].keys()))
-                fig = px.scatter(
-                    current_page_results, x=x_axis, y=y_axis, title="Scatter Plot"
-                )
-                st.plotly_chart(fig)
-            # ... (Add options for other chart types: Bar Chart, Histogram, etc.) ...
+                px = viz_backends.plotly_express()
+                with rerun_profiler.phase("chart render"):
+                    # WebGL or a binned density image once there are many points
+                    fig, mode = chart_modes.scatter_figure(
+                        px, current_page_results, x_axis, y_axis, title="Scatter Plot"
+                    )
+                    st.plotly_chart(fig)
+                st.caption(chart_modes.describe_mode(mode, len(current_page_results)))
+            elif chart_type == "Histogram":
+                column = st.selectbox(
+                    "Column", list(current_page_results[0].keys()))
+                bins = st.slider("Bins", min_value=5, max_value=200,
+                                 value=chart_modes.HISTOGRAM_BINS)
+                px = viz_backends.plotly_express()
+                with rerun_profiler.phase("chart render"):
+                    # Binned here; only edges and counts are sent to the browser
+                    fig = chart_modes.histogram_figure(
+                        px, current_page_results, column, bins,
+                        cache_key=st.session_state.results.version,
+                    )
+                    st.plotly_chart(fig)
+            elif chart_type == "Bar Chart":
+                columns = list(current_page_results[0].keys())
+                category = st.selectbox("Category", columns)
+                value = st.selectbox("Value", ["(count)"] + columns)
+                aggregate = "count"
+                if value != "(count)":
+                    aggregate = st.selectbox("Aggregate", ("mean", "median", "sum", "max", "min"))
+                px = viz_backends.plotly_express()
+                with rerun_profiler.phase("chart render"):
+                    fig = chart_modes.bar_figure(
+                        px, current_page_results, category,
+                        None if value == "(count)" else value, aggregate,
+                        cache_key=st.session_state.results.version,
+                    )
+                    st.plotly_chart(fig)
+
+    elif st.session_state.api_key and st.session_state.user_id:
+        st.info("Enter search criteria in the sidebar and click 'Search'.")
+    else:
+        st.warning("Please configure your API key and User ID in the sidebar.")
+
+    # --- Diagnostics ---
+    with st.sidebar.expander("Startup Timing"):
+        viz_backends.render_timing_report()
+    with st.sidebar.expander("Credit Budget"):
+        fetch_budget.render_budget_panel(st.session_state.user_id)
+    with st.sidebar.expander("Page Cache"):
+        result_pager.render_pager_stats(st.session_state.pager)
+    with st.sidebar.expander("Query Planner"):
+        query_planner.render_planner_stats(fetch_budget.default_budget().planner)
+    with st.sidebar.expander("Property Store"):
+        property_store.render_store_stats()
+    traffic_journal.render_traffic_status()
+    with st.sidebar.expander("API Diagnostics"):
+        api_metrics.render_diagnostics_panel()
+    with st.sidebar.expander("Profiler"):
+        rerun_profiler.render_profiler_panel()
+    with st.sidebar.expander("Server Memory"):
+        session_memory.render_memory_dashboard()
+
+    # Record what this session holds; sessions over their memory budget are
+    # spilled once they go quiet, so reruns never read spilled rows back
+    results = st.session_state.results
+    session_memory.end_rerun(
+        [results] if isinstance(results, property_store.ResultSet) else [],
+        [st.session_state.pager],
+    )
+
 
-elif st.session_state.api_key and st.session_state.user_id:
-    st.info("Enter search criteria in the sidebar and click 'Search'.")
-else:
-    st.warning("Please configure your API key and User ID in the sidebar.")
\ No newline at end of file
+if __name__ == "__main__":
+    rerun_started = viz_backends.begin_rerun()
+    api_metrics.start_metrics_server()
+    with rerun_profiler.profile_rerun():
+        main()
+    viz_backends.end_rerun(rerun_started)
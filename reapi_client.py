@@ -0,0 +1,471 @@
+"""HTTP client for the RealEstateAPI PropertySearch and PropertyDetail endpoints.
+
+The Streamlit apps call ``search_properties`` instead of posting with
+``requests`` directly so that every request is retried consistently and
+recorded in api_metrics. Credentials are passed explicitly so the client
+can also be used from background threads and tools without a session.
+
+Response bodies are parsed incrementally with ijson when it is installed,
+so records can be consumed while the page is still downloading and the
+full decoded payload is never held in memory. With ``typed=True`` records
+are returned as ``property_model.PropertyRecord`` objects, each built as
+soon as it has been parsed (without ijson, the body is read whole and
+decoded by msgspec when it is available).
+
+Requests share one connection pool per process and negotiate gzip (and
+brotli, when a brotli decoder is installed). If httpx and h2 are installed
+requests go over HTTP/2, so concurrent page requests are multiplexed over
+a single connection; set ``REAPI_HTTP2=0`` to force the requests/HTTP/1.1
+path.
+
+With ``REAPI_GATEWAY_URL`` set, requests go to a shared ``reapi_gateway``
+sidecar instead, which pools, rate limits, caches and coalesces upstream
+calls for every Streamlit process on the host.
+
+Requests can also be recorded to, or replayed from, a traffic journal
+(see traffic_journal.py).
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import api_metrics
+import property_model
+
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:  # Optional: fall back to decoding the whole body at once
+    ijson = None
+
+try:
+    import httpx
+    import h2  # noqa: F401  (required by httpx for HTTP/2)
+except ImportError:  # Optional: fall back to pooled HTTP/1.1 via requests
+    httpx = None
+
+try:
+    import brotli  # noqa: F401
+except ImportError:
+    try:
+        import brotlicffi as brotli  # noqa: F401
+    except ImportError:
+        brotli = None
+
+# A local reapi_gateway, when configured, takes the place of the API itself
+GATEWAY_URL = os.environ.get("REAPI_GATEWAY_URL")
+API_BASE_URL = GATEWAY_URL or os.environ.get("REAPI_BASE_URL", "https://api.realestateapi.com")
+PROPERTY_SEARCH_PATH = "/v2/PropertySearch"
+PROPERTY_SEARCH_ENDPOINT = "PropertySearch"
+PROPERTY_DETAIL_PATH = "/v2/PropertyDetail"
+PROPERTY_DETAIL_ENDPOINT = "PropertyDetail"
+
+REQUEST_TIMEOUT_SECONDS = 60
+MAX_RETRIES = 2  # Extra attempts after the first one
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+RETRY_BACKOFF_SECONDS = 0.5
+MAX_RETRY_DELAY_SECONDS = 10  # Longest wait, whatever Retry-After asks for
+
+POOL_SIZE = int(os.environ.get("REAPI_POOL_SIZE", "16"))
+CONCURRENT_REQUESTS = int(os.environ.get("REAPI_CONCURRENT_REQUESTS", "8"))
+HTTP2_ENABLED = httpx is not None and os.environ.get("REAPI_HTTP2", "1") != "0"
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+
+
+def build_headers(user_id, api_key):
+    """Returns the request headers expected by the RealEstateAPI."""
+    return {
+        "accept": "application/json",
+        "accept-encoding": ACCEPT_ENCODING,
+        "content-type": "application/json",
+        "x-user-id": user_id,
+        "x-api-key": api_key,
+    }
+
+
+# --- Connection Pool ---
+
+_pool_lock = threading.Lock()
+_requests_session = None
+_http2_client = None
+
+
+def _get_requests_session():
+    global _requests_session
+    with _pool_lock:
+        if _requests_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _requests_session = session
+        return _requests_session
+
+
+def _get_http2_client():
+    global _http2_client
+    with _pool_lock:
+        if _http2_client is None:
+            _http2_client = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=POOL_SIZE),
+            )
+        return _http2_client
+
+
+@contextlib.contextmanager
+def _translate_httpx_errors():
+    """Re-raises httpx failures as the requests exceptions callers handle."""
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise requests.Timeout(str(e)) from e
+    except httpx.TransportError as e:
+        raise requests.ConnectionError(str(e)) from e
+
+
+class _Http2Response:
+    """Presents a streamed httpx response as the parts of ``requests.Response`` used here."""
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = response.iter_bytes()
+        self._buffer = b""
+        self._content = None
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.reason = response.reason_phrase
+        self.url = str(response.url)
+        self.raw = self
+        self.decode_content = True
+
+    def read(self, size=-1):
+        with _translate_httpx_errors():
+            while size < 0 or len(self._buffer) < size:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def tell(self):
+        """Bytes received on the wire so far, before decompression."""
+        return self._response.num_bytes_downloaded
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = self.read()
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode(errors="replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(
+                f"{self.status_code} Error: {self.reason} for url: {self.url}", response=self
+            )
+
+    def close(self):
+        self._response.close()
+
+
+# --- Transport ---
+
+# Replaces the network when set, e.g. by a traffic_journal recorder or replayer
+_transport = None
+_transport_configured = False
+
+
+def set_transport(transport):
+    """Routes requests through ``transport.send`` instead of the network (None restores it)."""
+    global _transport, _transport_configured
+    with _pool_lock:
+        _transport, _transport_configured = transport, True
+
+
+def _configured_transport():
+    """The active transport; ``REAPI_RECORD_TRAFFIC``/``REAPI_REPLAY_TRAFFIC`` install one."""
+    global _transport, _transport_configured
+    if not _transport_configured:
+        import traffic_journal
+
+        transport = traffic_journal.transport_from_env()
+        with _pool_lock:
+            if not _transport_configured:
+                _transport, _transport_configured = transport, True
+    return _transport
+
+
+def offline():
+    """True when the active transport answers without reaching the API (e.g. a replay)."""
+    return getattr(_configured_transport(), "offline", False)
+
+
+def _send(url, payload, headers, timeout, stream):
+    """Posts through the active transport, or over the network."""
+    transport = _configured_transport()
+    if transport is not None:
+        return transport.send(url, payload, headers, timeout, stream)
+    return send_over_network(url, payload, headers, timeout, stream)
+
+
+def send_over_network(url, payload, headers, timeout, stream):
+    """Posts over the shared pool, using HTTP/2 when it is available."""
+    if not HTTP2_ENABLED:
+        return _get_requests_session().post(
+            url, json=payload, headers=headers, timeout=timeout, stream=stream
+        )
+    client = _get_http2_client()
+    with _translate_httpx_errors():
+        request = client.build_request(
+            "POST", url, json=payload, headers=headers, timeout=timeout
+        )
+        return _Http2Response(client.send(request, stream=True))
+
+
+def _retry_delay(response, attempt):
+    """Seconds to wait before retrying, honouring a numeric Retry-After header up to a cap."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_RETRY_DELAY_SECONDS)
+    return min(RETRY_BACKOFF_SECONDS * (2 ** attempt), MAX_RETRY_DELAY_SECONDS)
+
+
+def post_json(path, payload, user_id, api_key, endpoint,
+              timeout=REQUEST_TIMEOUT_SECONDS, stream=False):
+    """Posts ``payload`` to ``path``, retrying transient failures.
+
+    Returns the final ``requests.Response`` after ``raise_for_status``; with
+    ``stream=True`` its body has not been read yet.
+    Raises ``requests.RequestException`` when the request ultimately fails.
+    """
+    url = API_BASE_URL + path
+    headers = build_headers(user_id, api_key)
+    started = time.perf_counter()
+    for attempt in range(MAX_RETRIES + 1):
+        response = None
+        try:
+            response = _send(url, payload, headers, timeout, stream)
+            if response.status_code in RETRY_STATUS_CODES and attempt < MAX_RETRIES:
+                response.close()
+                api_metrics.observe_retry(endpoint)
+                time.sleep(_retry_delay(response, attempt))
+                continue
+            response.raise_for_status()
+            return response
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt < MAX_RETRIES:
+                api_metrics.observe_retry(endpoint)
+                time.sleep(_retry_delay(None, attempt))
+                continue
+            api_metrics.observe_request(endpoint, "error", time.perf_counter() - started)
+            raise
+        except requests.RequestException:
+            status = response.status_code if response is not None else "error"
+            size = len(response.content) if response is not None else None
+            api_metrics.observe_request(
+                endpoint, status, time.perf_counter() - started, response_bytes=size
+            )
+            raise
+
+
+class _CountingReader:
+    """File-like wrapper that counts the bytes read from a response body."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def _wire_bytes(response):
+    """Compressed size of the body read so far, if the transport reports it."""
+    recorded = getattr(response, "wire_bytes", None)
+    if recorded is not None:
+        return recorded  # A journalled response knows its size on the wire
+    tell = getattr(response.raw, "tell", None)
+    try:
+        return tell() if tell is not None else None
+    except (OSError, ValueError):
+        return None
+
+
+class PropertyStream:
+    """Iterates the records of one PropertySearch page as it is downloaded.
+
+    Top-level response fields other than ``data`` (``resultCount``,
+    ``resultIndex``, ...) are collected in ``meta`` and are complete once
+    iteration has finished. A stream can only be iterated once.
+    """
+
+    def __init__(self, response, endpoint, started, typed=False):
+        self.response = response
+        self.endpoint = endpoint
+        self.started = started
+        self.typed = typed
+        self.meta = {}
+        self.records = 0
+
+    def __iter__(self):
+        self.response.raw.decode_content = True
+        reader = _CountingReader(self.response.raw)
+        try:
+            if ijson is not None:
+                parsed = self._parse_incrementally(reader)
+                if self.typed:
+                    # Typed records are built one at a time as they arrive
+                    parsed = map(property_model.decode_record, parsed)
+            elif self.typed:
+                parsed = self._parse_typed(reader)
+            else:
+                parsed = self._parse_whole(reader)
+            for record in parsed:
+                self.records += 1
+                yield record
+        finally:
+            wire_bytes = _wire_bytes(self.response)
+            self.response.close()
+            api_metrics.observe_request(
+                self.endpoint,
+                self.response.status_code,
+                time.perf_counter() - self.started,
+                response_bytes=reader.bytes_read,
+                records=self.records,
+                wire_bytes=wire_bytes,
+            )
+
+    def _parse_typed(self, reader):
+        records, self.meta = property_model.decode_page(reader.read())
+        yield from records
+
+    def _parse_whole(self, reader):
+        data = json.loads(reader.read())
+        if not isinstance(data, dict):
+            return
+        records = data.pop("data", None) or []
+        self.meta = data
+        yield from records
+
+    def _parse_incrementally(self, reader):
+        builder = None
+        for prefix, event, value in ijson.parse(reader, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == "data.item" and event in ("end_map", "end_array"):
+                    yield builder.value
+                    builder = None
+            elif prefix == "data.item":
+                if event in ("start_map", "start_array"):
+                    builder = ObjectBuilder()
+                    builder.event(event, value)
+                else:
+                    yield value  # Scalar records, e.g. with ids_only
+            elif prefix and "." not in prefix and event not in (
+                "start_map", "end_map", "start_array", "end_array", "map_key"
+            ):
+                self.meta[prefix] = value
+
+
+def stream_search_properties(payload, user_id, api_key, timeout=REQUEST_TIMEOUT_SECONDS,
+                             typed=False):
+    """Runs a PropertySearch request and returns a ``PropertyStream`` over its records."""
+    started = time.perf_counter()
+    response = post_json(
+        PROPERTY_SEARCH_PATH, payload, user_id, api_key, PROPERTY_SEARCH_ENDPOINT,
+        timeout, stream=True,
+    )
+    return PropertyStream(response, PROPERTY_SEARCH_ENDPOINT, started, typed=typed)
+
+
+def search_properties(payload, user_id, api_key, timeout=REQUEST_TIMEOUT_SECONDS,
+                      transform=None, typed=False):
+    """Runs a PropertySearch request and returns the decoded JSON response.
+
+    ``transform``, if given, is applied to each record as soon as it has been
+    parsed, so only the transformed records are kept in ``data``.
+    """
+    stream = stream_search_properties(payload, user_id, api_key, timeout, typed=typed)
+    if transform is None:
+        records = list(stream)
+    else:
+        records = [transform(record) for record in stream]
+    return {**stream.meta, "data": records}
+
+
+def search_properties_concurrently(payloads, user_id, api_key,
+                                   max_workers=CONCURRENT_REQUESTS, **kwargs):
+    """Runs several PropertySearch requests at once over the shared pool.
+
+    With HTTP/2 the requests are multiplexed over a single connection.
+    Returns one entry per payload, in order: the response dict, or the
+    ``requests.RequestException`` that request failed with.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(search_properties, payload, user_id, api_key, **kwargs)
+            for payload in payloads
+        ]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except requests.RequestException as e:
+            results.append(e)
+    return results
+
+
+def get_property_detail(property_id, user_id, api_key, timeout=REQUEST_TIMEOUT_SECONDS):
+    """Fetches the full PropertyDetail record for one property id."""
+    started = time.perf_counter()
+    response = post_json(
+        PROPERTY_DETAIL_PATH, {"id": property_id}, user_id, api_key, PROPERTY_DETAIL_ENDPOINT,
+        timeout,
+    )
+    body = response.content
+    api_metrics.observe_request(
+        PROPERTY_DETAIL_ENDPOINT,
+        response.status_code,
+        time.perf_counter() - started,
+        response_bytes=len(body),
+        records=1,
+        wire_bytes=_wire_bytes(response),
+    )
+    return json.loads(body).get("data") or {}
+
+
+def get_property_details_concurrently(property_ids, user_id, api_key,
+                                      max_workers=CONCURRENT_REQUESTS, **kwargs):
+    """Fetches several PropertyDetail records at once over the shared pool.
+
+    Returns one entry per id, in order: the detail dict, or the
+    ``requests.RequestException`` that request failed with.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(get_property_detail, property_id, user_id, api_key, **kwargs)
+            for property_id in property_ids
+        ]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except requests.RequestException as e:
+            results.append(e)
+    return results
@@ -0,0 +1,435 @@
+"""Optional local gateway between the Streamlit workers and the RealEstateAPI.
+
+Run one gateway per host and point every Streamlit process at it with
+``REAPI_GATEWAY_URL``; the workers then share, in one place:
+
+* a pool of upstream connections (HTTP/2 when httpx and h2 are installed);
+* a global token-bucket rate limit, which also backs off for everyone when
+  the upstream answers 429 with ``Retry-After``;
+* a TTL cache of successful responses;
+* request coalescing: identical requests that arrive while one is already
+  in flight wait for its response instead of going upstream again.
+
+Requests are identified by path, canonical JSON body and a digest of the
+caller's credentials: a cached or in-flight response is only shared with
+callers that sent the same API key and user id, so nobody is served data
+the upstream never checked their key for.
+
+    python reapi_gateway.py --port 8788
+    python reapi_gateway.py --mock-upstream   # stand-in upstream from bench.mock_server
+
+``GET /metrics`` serves the gateway's metrics in Prometheus format and
+``GET /stats`` a JSON summary.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import api_metrics
+
+try:
+    import httpx
+except ImportError:  # Optional: fall back to a pooled requests session on worker threads
+    httpx = None
+
+try:
+    import h2  # noqa: F401
+except ImportError:
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_URL = os.environ.get("REAPI_UPSTREAM_URL") or os.environ.get(
+    "REAPI_BASE_URL", "https://api.realestateapi.com"
+)
+GATEWAY_HOST = os.environ.get("REAPI_GATEWAY_HOST", "127.0.0.1")
+GATEWAY_PORT = int(os.environ.get("REAPI_GATEWAY_PORT", "8788"))
+
+RATE_LIMIT_PER_SECOND = float(os.environ.get("REAPI_GATEWAY_RATE", "10"))  # 0 disables
+RATE_LIMIT_BURST = int(os.environ.get("REAPI_GATEWAY_BURST", "20"))
+UPSTREAM_CONCURRENCY = int(os.environ.get("REAPI_GATEWAY_CONCURRENCY", "16"))
+UPSTREAM_TIMEOUT_SECONDS = 60
+CACHE_TTL_SECONDS = int(os.environ.get("REAPI_GATEWAY_CACHE_TTL", "900"))
+CACHE_MAX_ENTRIES = 1024
+
+ENDPOINTS = {
+    "/v2/PropertySearch": "PropertySearch",
+    "/v2/PropertyDetail": "PropertyDetail",
+}
+FORWARDED_HEADERS = ("x-user-id", "x-api-key")
+
+
+class GatewayResponse:
+    """Status, headers worth passing on, and decoded body of an upstream response."""
+
+    def __init__(self, status, body, headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+
+def _error_response(status, message):
+    return GatewayResponse(status, json.dumps({"statusCode": status, "message": message}).encode())
+
+
+# --- Rate Limiting ---
+
+
+class TokenBucket:
+    """Global rate limit shared by every request through the gateway."""
+
+    def __init__(self, rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self.waited_seconds = 0.0
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        started = time.monotonic()
+        async with self._lock:  # Waiters are served in arrival order
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+        self.waited_seconds += time.monotonic() - started
+
+    def back_off(self, seconds):
+        """Holds every request for ``seconds``, e.g. after an upstream 429."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+# --- Cache ---
+
+
+class ResponseCache:
+    """TTL + LRU cache of successful upstream responses."""
+
+    def __init__(self, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        api_metrics.observe_cache_lookup("gateway", entry is not None)
+        return None if entry is None else entry[1]
+
+    def put(self, key, response):
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic(), response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# --- Upstream ---
+
+
+class Upstream:
+    """Pooled connections to the RealEstateAPI, at most ``concurrency`` requests at a time."""
+
+    def __init__(self, base_url=UPSTREAM_URL, concurrency=UPSTREAM_CONCURRENCY,
+                 timeout=UPSTREAM_TIMEOUT_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        if httpx is not None:
+            self._client = httpx.AsyncClient(
+                http2=h2 is not None,
+                limits=httpx.Limits(max_connections=concurrency),
+                timeout=timeout,
+            )
+        else:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self._client = None
+            self._requests = requests
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+            self._executor = ThreadPoolExecutor(concurrency, thread_name_prefix="reapi-gateway")
+
+    async def post(self, path, body, headers):
+        headers = {**headers, "content-type": "application/json", "accept-encoding": "gzip"}
+        url = self.base_url + path
+        async with self._semaphore:
+            if self._client is not None:
+                try:
+                    response = await self._client.post(url, content=body, headers=headers)
+                except httpx.TimeoutException as e:
+                    return _error_response(504, f"Upstream timed out: {e}")
+                except httpx.HTTPError as e:
+                    return _error_response(502, f"Upstream request failed: {e}")
+                return GatewayResponse(response.status_code, response.content,
+                                       _passed_on_headers(response.headers))
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._post_blocking, url, body, headers)
+
+    def _post_blocking(self, url, body, headers):
+        try:
+            response = self._session.post(url, data=body, headers=headers, timeout=self.timeout)
+        except self._requests.Timeout as e:
+            return _error_response(504, f"Upstream timed out: {e}")
+        except self._requests.RequestException as e:
+            return _error_response(502, f"Upstream request failed: {e}")
+        return GatewayResponse(response.status_code, response.content,
+                               _passed_on_headers(response.headers))
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+        else:
+            self._session.close()
+            self._executor.shutdown(wait=False)
+
+
+def _passed_on_headers(headers):
+    retry_after = headers.get("Retry-After")
+    return {"Retry-After": retry_after} if retry_after else {}
+
+
+# --- Gateway ---
+
+
+def request_key(path, body, credentials=""):
+    """Identifies a request by credentials digest, path and canonical JSON body.
+
+    Raises ValueError for bad JSON.
+    """
+    payload = json.loads(body or b"{}")
+    return f"{credentials} {path} " + json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+
+def _reason(status):
+    """The reason phrase for ``status``; upstreams may send codes HTTPStatus doesn't know."""
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return "Unknown"
+
+
+def _credentials(headers):
+    return hashlib.sha256(
+        "\0".join(headers.get(name, "") for name in FORWARDED_HEADERS).encode()
+    ).hexdigest()
+
+
+class Gateway:
+    """Forwards API requests through the shared cache, coalescing and rate limit."""
+
+    def __init__(self, upstream, rate_limiter=None, cache=None):
+        self.upstream = upstream
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.cache = cache if cache is not None else ResponseCache()
+        self._inflight = {}  # request key -> future of the leader's response
+        self.stats = {
+            "requests": 0,
+            "cache hits": 0,
+            "coalesced": 0,
+            "upstream requests": 0,
+            "upstream errors": 0,
+        }
+
+    async def forward(self, path, body, headers):
+        endpoint = ENDPOINTS[path]
+        self.stats["requests"] += 1
+        try:
+            key = request_key(path, body, _credentials(headers))
+        except ValueError:
+            return _error_response(400, "Invalid JSON")
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["cache hits"] += 1
+            return cached
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            api_metrics.observe_coalesced(endpoint)
+            try:
+                return await asyncio.shield(future)
+            except Exception:
+                # The request we joined never got a response; send our own
+                return await self._fetch(endpoint, path, body, headers)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._fetch(endpoint, path, body, headers)
+            if response.status == 200:
+                self.cache.put(key, response)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Followers are optional; don't warn if there are none
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _fetch(self, endpoint, path, body, headers):
+        await self.rate_limiter.acquire()
+        self.stats["upstream requests"] += 1
+        started = time.perf_counter()
+        response = await self.upstream.post(
+            path, body, {name: headers[name] for name in FORWARDED_HEADERS if name in headers}
+        )
+        api_metrics.observe_request(
+            endpoint, response.status, time.perf_counter() - started,
+            response_bytes=len(response.body),
+        )
+        if response.status >= 500 or response.status == 429:
+            self.stats["upstream errors"] += 1
+        retry_after = response.headers.get("Retry-After", "")
+        if response.status == 429 and retry_after.isdigit():
+            self.rate_limiter.back_off(float(retry_after))
+        return response
+
+    def summary(self):
+        return {
+            **self.stats,
+            "cached responses": len(self.cache),
+            "in flight": len(self._inflight),
+            "rate limit wait seconds": round(self.rate_limiter.waited_seconds, 3),
+        }
+
+    # --- HTTP Server ---
+
+    async def dispatch(self, method, path, headers, body):
+        if method == "GET" and path == "/healthz":
+            return GatewayResponse(200, b'{"status": "ok"}')
+        if method == "GET" and path == "/stats":
+            return GatewayResponse(200, json.dumps(self.summary()).encode())
+        if method == "GET" and path == "/metrics":
+            return GatewayResponse(
+                200, api_metrics.render_prometheus().encode(),
+                {"Content-Type": "text/plain; version=0.0.4"},
+            )
+        if method == "POST" and path in ENDPOINTS:
+            if not headers.get("x-api-key"):
+                return _error_response(401, "Missing API key")
+            return await self.forward(path, body, headers)
+        return _error_response(404, "Not Found")
+
+    async def handle_connection(self, reader, writer):
+        """Serves HTTP/1.1 requests on one keep-alive connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length") or 0))
+                response = await self.dispatch(method, target.split("?")[0], headers, body)
+                response_headers = {
+                    "Content-Type": "application/json",
+                    **response.headers,
+                    "Content-Length": str(len(response.body)),
+                }
+                head = f"HTTP/1.1 {response.status} {_reason(response.status)}\r\n"
+                head += "".join(f"{name}: {value}\r\n" for name, value in response_headers.items())
+                writer.write(head.encode("latin-1") + b"\r\n" + response.body)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host=GATEWAY_HOST, port=GATEWAY_PORT, upstream_url=UPSTREAM_URL,
+                rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST,
+                concurrency=UPSTREAM_CONCURRENCY, cache_ttl=CACHE_TTL_SECONDS, ready=None):
+    """Runs the gateway until cancelled; ``ready(server)`` is called once it is listening."""
+    upstream = Upstream(upstream_url, concurrency)
+    gateway = Gateway(upstream, TokenBucket(rate, burst), ResponseCache(cache_ttl))
+    server = await asyncio.start_server(gateway.handle_connection, host, port)
+    if ready is not None:
+        ready(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await upstream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=GATEWAY_HOST)
+    parser.add_argument("--port", type=int, default=GATEWAY_PORT)
+    parser.add_argument("--upstream", default=UPSTREAM_URL)
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT_PER_SECOND,
+                        help="Upstream requests per second for all workers (0 disables)")
+    parser.add_argument("--burst", type=int, default=RATE_LIMIT_BURST)
+    parser.add_argument("--concurrency", type=int, default=UPSTREAM_CONCURRENCY)
+    parser.add_argument("--cache-ttl", type=int, default=CACHE_TTL_SECONDS)
+    parser.add_argument("--mock-upstream", action="store_true",
+                        help="Serve from an in-process bench.mock_server instead of --upstream")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    mock = None
+    upstream_url = args.upstream
+    if args.mock_upstream:
+        from bench.mock_server import MockServer
+
+        mock = MockServer().__enter__()
+        upstream_url = mock.url
+
+    def ready(server):
+        host, port = server.sockets[0].getsockname()[:2]
+        logger.info("Gateway on http://%s:%s forwarding to %s", host, port, upstream_url)
+
+    try:
+        asyncio.run(serve(
+            args.host, args.port, upstream_url, args.rate, args.burst,
+            args.concurrency, args.cache_ttl, ready,
+        ))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if mock is not None:
+            mock.__exit__(None, None, None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Per-rerun phase timing with optional cProfile capture.
+
+Code marks the interesting parts of a rerun with ``with phase("network"):``.
+When profiling is off for the current rerun, ``phase`` returns a shared
+no-op context manager, so the instrumentation costs one context variable
+lookup per phase.
+
+A cProfile capture writes a standard ``.prof`` stats file that can be
+opened with pstats, snakeviz, tuna or converted to a flamegraph with
+flameprof.
+"""
+import contextlib
+import contextvars
+import cProfile
+import os
+import tempfile
+import time
+
+import streamlit as st
+
+ENABLED_KEY = "profile_reruns"
+CAPTURE_KEY = "capture_cprofile"
+REPORT_KEY = "profiler_last_report"
+DUMP_KEY = "profiler_last_dump"
+
+_NULL_PHASE = contextlib.nullcontext()
+_active = contextvars.ContextVar("rerun_profiler", default=None)
+
+
+class PhaseProfiler:
+    """Accumulates wall-clock time per named phase of a single rerun."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.counts = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def report(self):
+        """Returns the phase breakdown, including unattributed time as "other"."""
+        total = time.perf_counter() - self.started
+        rows = [
+            {"phase": name, "calls": self.counts[name], "ms": round(seconds * 1000, 1)}
+            for name, seconds in self.phases.items()
+        ]
+        other = total - sum(self.phases.values())
+        rows.append({"phase": "other", "calls": 1, "ms": round(max(other, 0.0) * 1000, 1)})
+        for row in rows:
+            row["share"] = f"{row['ms'] / (total * 1000):.0%}" if total else ""
+        return {"total_ms": round(total * 1000, 1), "phases": rows}
+
+
+def phase(name):
+    """Times a block as ``name`` if the current rerun is being profiled."""
+    profiler = _active.get()
+    if profiler is None:
+        return _NULL_PHASE
+    return profiler.phase(name)
+
+
+@contextlib.contextmanager
+def profile_rerun():
+    """Profiles the enclosed rerun according to the sidebar toggles.
+
+    Must be entered before the profiler widgets are created, since a
+    requested cProfile capture is consumed by clearing its checkbox.
+    """
+    enabled = st.session_state.get(ENABLED_KEY, False)
+    capture = st.session_state.get(CAPTURE_KEY, False)
+    if capture:
+        st.session_state[CAPTURE_KEY] = False
+    if not enabled and not capture:
+        yield
+        return
+
+    profiler = PhaseProfiler()
+    token = _active.set(profiler)
+    cprofile = cProfile.Profile() if capture else None
+    try:
+        if cprofile is not None:
+            cprofile.enable()
+        yield
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+            st.session_state[DUMP_KEY] = _dump_stats(cprofile)
+        _active.reset(token)
+        st.session_state[REPORT_KEY] = profiler.report()
+
+
+def _dump_stats(cprofile):
+    """Returns the collected stats in the binary ``.prof`` format."""
+    fd, path = tempfile.mkstemp(suffix=".prof")
+    os.close(fd)
+    try:
+        cprofile.dump_stats(path)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def render_profiler_panel():
+    """Displays the profiler toggles and the breakdown of the last profiled rerun."""
+    st.checkbox("Profile reruns", key=ENABLED_KEY)
+    st.checkbox("Capture cProfile of next rerun", key=CAPTURE_KEY)
+    report = st.session_state.get(REPORT_KEY)
+    if report:
+        st.write(f"Last profiled rerun: {report['total_ms']} ms")
+        st.table(report["phases"])
+    dump = st.session_state.get(DUMP_KEY)
+    if dump:
+        st.download_button(
+            "Download cProfile dump (.prof)",
+            data=dump,
+            file_name="rerun.prof",
+            mime="application/octet-stream",
+        )
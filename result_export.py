@@ -0,0 +1,368 @@
+"""Streaming CSV, Excel and Parquet exports of a stored result set.
+
+An export is written to a file in chunks of ``REAPI_EXPORT_CHUNK_ROWS``
+rows taken straight from the shared property store, keeping only the
+chosen columns, so exporting a large territory never builds a DataFrame
+or an in-memory copy of the whole file. Exports run on a small shared
+thread pool (``REAPI_EXPORT_WORKERS``): a session waiting for a large
+export doesn't hold up the others, and concurrent exports queue instead of
+all competing at once.
+
+When Streamlit's static file serving is enabled
+(``server.enableStaticServing``), finished files are written under
+``static/exports`` next to the app and downloaded from there, streamed
+from disk by the web server. Otherwise ``st.download_button`` is used,
+which reads the finished file into memory while it is offered.
+
+Excel needs xlsxwriter (or openpyxl) and Parquet needs pyarrow; formats
+whose library isn't installed are not offered. Export files older than
+``REAPI_EXPORT_TTL`` seconds are deleted.
+"""
+import csv
+import json
+import math
+import os
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+try:
+    import xlsxwriter
+except ImportError:  # Optional: fall back to openpyxl for Excel
+    xlsxwriter = None
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional: Parquet exports are not offered
+    pyarrow = None
+
+import property_model
+
+EXPORT_CHUNK_ROWS = int(os.environ.get("REAPI_EXPORT_CHUNK_ROWS", "5000"))
+EXPORT_WORKERS = int(os.environ.get("REAPI_EXPORT_WORKERS", "2"))
+EXPORT_TTL_SECONDS = int(os.environ.get("REAPI_EXPORT_TTL", "3600"))
+STATIC_EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "exports")
+EXPORT_DIR = os.environ.get("REAPI_EXPORT_DIR") or os.path.join(
+    tempfile.gettempdir(), "reapi_exports"
+)
+EXCEL_MAX_ROWS = 1_048_575  # Excel's sheet limit, less the header row
+
+# Format -> (file extension, MIME type)
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def available_formats():
+    """The formats whose writer library is installed."""
+    formats = ["CSV"]
+    if xlsxwriter is not None or openpyxl is not None:
+        formats.append("Excel")
+    if pyarrow is not None:
+        formats.append("Parquet")
+    return formats
+
+
+def export_columns(rows, sample=1000):
+    """Column names of ``rows`` in first-seen order, from the first ``sample`` rows."""
+    columns = {}
+    for row in rows[:sample]:
+        if hasattr(row, "keys"):
+            columns.update(dict.fromkeys(row.keys()))
+    return list(columns)
+
+
+def iter_chunks(rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields ``rows`` (a list or ``ResultSet``) in slices of ``chunk_rows`` rows."""
+    for start in range(0, len(rows), chunk_rows):
+        yield rows[start:start + chunk_rows]
+
+
+def _cell(value):
+    """A value a CSV or Excel cell can hold: nested values as JSON, NaN as empty."""
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, default=str)
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _values(row, columns):
+    getter = getattr(row, "get", None)
+    if getter is None:
+        return [row] + [None] * (len(columns) - 1)  # IDs-only results are bare strings
+    return [_cell(getter(column)) for column in columns]
+
+
+# --- Writers ---
+
+
+def _write_csv(path, chunks, columns, on_chunk):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for chunk in chunks:
+            writer.writerows(_values(row, columns) for row in chunk)
+            on_chunk(len(chunk))
+
+
+def _write_excel(path, chunks, columns, on_chunk):
+    if xlsxwriter is not None:
+        # constant_memory flushes each row to disk as soon as it is written
+        workbook = xlsxwriter.Workbook(path, {
+            "constant_memory": True,
+            "default_date_format": "yyyy-mm-dd",
+            "strings_to_formulas": False,
+            "strings_to_urls": False,
+        })
+        sheet = workbook.add_worksheet("Properties")
+        sheet.write_row(0, 0, columns)
+        row_number = 1
+        for chunk in chunks:
+            for row in chunk[:EXCEL_MAX_ROWS - row_number + 1]:
+                sheet.write_row(row_number, 0, _values(row, columns))
+                row_number += 1
+            on_chunk(len(chunk))
+        workbook.close()
+        return
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Properties")
+    sheet.append(columns)
+    written = 0
+    for chunk in chunks:
+        for row in chunk[:EXCEL_MAX_ROWS - written]:
+            sheet.append(_values(row, columns))
+            written += 1
+        on_chunk(len(chunk))
+    workbook.save(path)
+
+
+def _arrow_type(column, first_chunk):
+    """The Parquet type of ``column``: the model's type if known, else guessed from values."""
+    kind = property_model.FIELD_TYPES.get(column)
+    if kind is None:
+        values = [row.get(column) for row in first_chunk if hasattr(row, "get")]
+        values = [value for value in values if value is not None]
+        if values and all(isinstance(value, bool) for value in values):
+            kind = bool
+        elif values and all(
+            isinstance(value, (int, float)) and not isinstance(value, bool) for value in values
+        ):
+            kind = float
+        elif values and all(isinstance(value, date) for value in values):
+            kind = date
+        else:
+            kind = str
+    return {
+        bool: pyarrow.bool_(),
+        int: pyarrow.int64(),
+        float: pyarrow.float64(),
+        date: pyarrow.date32(),
+    }.get(kind, pyarrow.string())
+
+
+def _arrow_value(value, arrow_type):
+    """Converts ``value`` to ``arrow_type``; values that don't convert become null."""
+    if value is None or isinstance(value, float) and math.isnan(value):
+        return None
+    try:
+        if arrow_type == pyarrow.string():
+            return value if isinstance(value, str) else str(_cell(value))
+        if arrow_type == pyarrow.date32():
+            if isinstance(value, datetime):
+                return value.date()
+            return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+        if arrow_type == pyarrow.bool_():
+            return bool(value)
+        if arrow_type == pyarrow.int64():
+            return int(value)
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _write_parquet(path, chunks, columns, on_chunk):
+    writer = schema = None
+    try:
+        for chunk in chunks:
+            rows = [row for row in chunk if hasattr(row, "get")]
+            if schema is None:
+                schema = pyarrow.schema(
+                    [(column, _arrow_type(column, rows)) for column in columns]
+                )
+                writer = pyarrow.parquet.ParquetWriter(path, schema)
+            table = pyarrow.Table.from_arrays(
+                [
+                    pyarrow.array(
+                        [_arrow_value(row.get(field.name), field.type) for row in rows],
+                        type=field.type,
+                    )
+                    for field in schema
+                ],
+                schema=schema,
+            )
+            writer.write_table(table)  # One row group per chunk
+            on_chunk(len(chunk))
+        if writer is None:
+            schema = pyarrow.schema([(column, pyarrow.string()) for column in columns])
+            writer = pyarrow.parquet.ParquetWriter(path, schema)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+WRITERS = {"CSV": _write_csv, "Excel": _write_excel, "Parquet": _write_parquet}
+
+
+# --- Export Jobs ---
+
+
+class ExportJob:
+    """One export being written in the background."""
+
+    def __init__(self, rows, columns, file_format, filename, directory):
+        extension, self.mime = FORMATS[file_format]
+        self.rows = rows  # Keeps a ResultSet's rows in the store until the export is done
+        self.columns = list(columns)
+        self.format = file_format
+        self.filename = f"{filename}.{extension}"
+        self.path = os.path.join(
+            directory, f"{secrets.token_urlsafe(16)}-{self.filename}"
+        )
+        self.total = len(rows)
+        self.written = 0
+        self.started = time.monotonic()
+        self.seconds = None
+        self.future = None
+
+    @property
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    @property
+    def cancelled(self):
+        return self.future is not None and self.future.cancelled()
+
+    @property
+    def error(self):
+        if not self.done or self.cancelled:
+            return None
+        return self.future.exception()
+
+    def _run(self):
+        def on_chunk(rows):
+            self.written += rows
+
+        try:
+            WRITERS[self.format](self.path, iter_chunks(self.rows), self.columns, on_chunk)
+        except BaseException:
+            _remove(self.path)
+            raise
+        finally:
+            self.rows = None
+            self.seconds = time.monotonic() - self.started
+        return self.path
+
+    def discard(self):
+        if self.future is not None:
+            self.future.cancel()
+        _remove(self.path)
+
+
+_pool_lock = threading.Lock()
+_pool = None
+
+
+def _export_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(EXPORT_WORKERS, thread_name_prefix="reapi-export")
+        return _pool
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def remove_expired(directory, ttl=EXPORT_TTL_SECONDS):
+    """Deletes export files older than ``ttl`` seconds."""
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+    cutoff = time.time() - ttl
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def start_export(rows, columns, file_format, filename="properties", directory=EXPORT_DIR):
+    """Starts writing ``rows`` (only ``columns``) as ``file_format`` and returns the job."""
+    os.makedirs(directory, exist_ok=True)
+    remove_expired(directory)
+    job = ExportJob(rows, columns, file_format, filename, directory)
+    job.future = _export_pool().submit(job._run)
+    return job
+
+
+def render_export_panel(rows, key="export"):
+    """Download controls for ``rows``: format and column choice, then a streamed file."""
+    import streamlit as st
+
+    static_serving = bool(st.get_option("server.enableStaticServing"))
+    job_key = f"{key}_job"
+    all_columns = export_columns(rows)
+    columns = st.multiselect("Columns", all_columns, default=all_columns, key=f"{key}_columns")
+    file_format = st.radio("Format", available_formats(), horizontal=True, key=f"{key}_format")
+    if file_format == "Excel" and len(rows) > EXCEL_MAX_ROWS:
+        st.warning(f"Excel sheets hold {EXCEL_MAX_ROWS:,} rows; the rest will be left out.")
+    if st.button(f"Prepare {len(rows):,} rows", disabled=not columns, key=f"{key}_start"):
+        previous = st.session_state.get(job_key)
+        if previous is not None:
+            previous.discard()
+        st.session_state[job_key] = start_export(
+            rows, columns, file_format,
+            directory=STATIC_EXPORT_DIR if static_serving else EXPORT_DIR,
+        )
+
+    job = st.session_state.get(job_key)
+    if job is None:
+        return
+    if not job.done:
+        st.progress(job.written / job.total if job.total else 0.0,
+                    text=f"Writing {job.filename}: {job.written:,} of {job.total:,} rows")
+        if st.button("Refresh", key=f"{key}_refresh"):
+            st.rerun()
+        return
+    if job.cancelled:
+        st.info("Export cancelled.")
+        return
+    if job.error is not None:
+        st.error(f"Export failed: {job.error}")
+        return
+    st.caption(f"{job.total:,} rows, {os.path.getsize(job.path) / 1e6:,.1f} MB "
+               f"in {job.seconds:.1f}s")
+    if static_serving:
+        url = f"app/static/exports/{os.path.basename(job.path)}"
+        st.markdown(f'<a href="{url}" download="{job.filename}">Download {job.filename}</a>',
+                    unsafe_allow_html=True)
+    else:
+        with open(job.path, "rb") as f:
+            st.download_button(f"Download {job.filename}", f, file_name=job.filename,
+                               mime=job.mime, key=f"{key}_download")
@@ -0,0 +1,306 @@
+"""Paging through a PropertySearch result set with background prefetch.
+
+A ``Pager`` owns the offset math for one search: page ``n`` (1-based)
+starts at ``first_index + (n - 1) * page_size``. After a page is shown,
+``prefetch_around`` requests the next page (and, optionally, the previous
+one) on a shared thread pool, so a "next page" click is answered from
+memory instead of waiting on the network.
+
+Pages are fetched through the fetch budget. Speculative prefetches only
+use pages that are free (cached, answered by the query planner, or
+replayed) unless paid prefetch is turned on with ``REAPI_PREFETCH_PAID=1``
+or ``Pager.prefetch_paid``; even then a page is only prefetched while the
+user's remaining budget covers ``PREFETCH_MIN_PAGES_LEFT`` more pages.
+Prefetch threads never touch Streamlit; credentials are captured when the
+pager is created.
+
+Memory per search is bounded by a ``PageWindow``: only ``REAPI_PAGE_WINDOW``
+pages around the current one are kept in memory. Pages leaving the window
+are spilled to local disk (up to ``REAPI_PAGE_SPILL_MAX`` per search, 0
+disables spilling), so paging back to them costs a file read rather than a
+request.
+"""
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import fetch_budget
+import property_store
+import reapi_client
+
+PREFETCH_WORKERS = int(os.environ.get("REAPI_PREFETCH_WORKERS", "4"))
+PREFETCH_PREVIOUS = os.environ.get("REAPI_PREFETCH_PREVIOUS", "0") == "1"
+PREFETCH_PAID = os.environ.get("REAPI_PREFETCH_PAID", "0") == "1"
+PREFETCH_MIN_PAGES_LEFT = 2  # Budget kept for pages the user actually opens
+PAGE_WINDOW = int(os.environ.get("REAPI_PAGE_WINDOW", "5"))
+SPILL_MAX_PAGES = int(os.environ.get("REAPI_PAGE_SPILL_MAX", "200"))
+SPILL_DIR = os.environ.get("REAPI_PAGE_SPILL_DIR") or os.path.join(
+    tempfile.gettempdir(), "reapi_pages"
+)
+
+# Keys owned by the pager rather than the search filter
+PAGING_KEYS = ("count", "size", "resultIndex")
+
+
+def page_offset(page, page_size, first_index=0):
+    """The ``resultIndex`` of 1-based ``page``."""
+    return first_index + (page - 1) * page_size
+
+
+def page_count(result_count, page_size, first_index=0):
+    """Number of pages in a result set, starting at ``first_index``."""
+    remaining = max(0, result_count - first_index)
+    return max(1, -(-remaining // page_size))
+
+
+_pool_lock = threading.Lock()
+_pool = None
+
+
+def _prefetch_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(PREFETCH_WORKERS, thread_name_prefix="reapi-prefetch")
+        return _pool
+
+
+class PageWindow:
+    """Pages of one search: a window in memory around the current page, the rest on disk."""
+
+    def __init__(self, window=PAGE_WINDOW, spill_max=SPILL_MAX_PAGES, spill_dir=SPILL_DIR):
+        self.window = max(1, window)
+        self.spill_max = spill_max
+        self.spill_dir = spill_dir
+        self._pages = {}  # page -> response dict
+        self._spilled = OrderedDict()  # page -> file, least recently spilled first
+        self._directory = None
+        self._finalizer = None
+        self.spilled_pages = 0
+        self.evicted_pages = 0
+        self._lock = threading.RLock()  # The session reaper may spill pages too
+
+    def __contains__(self, page):
+        return page in self._pages or page in self._spilled
+
+    def __len__(self):
+        return len(self._pages)
+
+    def lookup(self, page):
+        """Returns ``(data, "memory" | "spill")`` for a cached page, or ``(None, None)``."""
+        with self._lock:
+            data = self._pages.get(page)
+            if data is not None:
+                return data, "memory"
+            path = self._spilled.pop(page, None)
+            if path is None:
+                return None, None
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None, None
+        finally:
+            _remove(path)
+        return data, "spill"
+
+    def put(self, page, data, current):
+        """Stores ``page`` and moves pages outside the window around ``current`` out of memory."""
+        with self._lock:
+            self._pages[page] = data
+            for other in [other for other in self._pages if not self.in_window(other, current)]:
+                self._spill(other, self._pages.pop(other))
+
+    def in_window(self, page, current):
+        return abs(page - current) <= self.window // 2
+
+    def _spill(self, page, data):
+        if self.spill_max <= 0:
+            self.evicted_pages += 1
+            return
+        try:
+            if self._directory is None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                self._directory = tempfile.mkdtemp(dir=self.spill_dir)
+                self._finalizer = weakref.finalize(
+                    self, shutil.rmtree, self._directory, ignore_errors=True
+                )
+            path = os.path.join(self._directory, f"{page}.pickle")
+            with open(path, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            self.evicted_pages += 1
+            return
+        self._spilled[page] = path
+        self.spilled_pages += 1
+        while len(self._spilled) > self.spill_max:
+            _remove(self._spilled.popitem(last=False)[1])
+            self.evicted_pages += 1
+
+    def spill_all(self):
+        """Moves every page in memory to disk, e.g. when the session has gone idle."""
+        with self._lock:
+            for page in list(self._pages):
+                self._spill(page, self._pages.pop(page))
+
+    def rows_in_memory(self):
+        """The rows of the pages held in memory."""
+        with self._lock:
+            pages = list(self._pages.values())
+        return [row for data in pages for row in data.get("data", [])]
+
+    def memory_bytes(self):
+        """Rough size of the pages held in memory."""
+        with self._lock:
+            pages = list(self._pages.values())
+        return sum(
+            property_store.estimate_row_bytes(data.get("data", [])) * len(data.get("data", []))
+            for data in pages
+        )
+
+    def close(self):
+        """Deletes the spilled pages now rather than when the window is collected."""
+        with self._lock:
+            self._pages.clear()
+            self._spilled.clear()
+        if self._finalizer is not None:
+            self._finalizer()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class Pager:
+    """Pages of one search, with the neighbours of the current page fetched ahead."""
+
+    def __init__(self, filter_params, user_id, api_key, page_size, first_index=0,
+                 transform=None, typed=False, prefetch_previous=PREFETCH_PREVIOUS,
+                 budget=None, window=None, prefetch_paid=PREFETCH_PAID):
+        self.filter_params = {
+            key: value for key, value in filter_params.items() if key not in PAGING_KEYS
+        }
+        self.user_id = user_id
+        self.api_key = api_key
+        self.page_size = page_size
+        self.first_index = first_index
+        self.transform = transform
+        self.typed = typed
+        self.prefetch_previous = prefetch_previous
+        self.prefetch_paid = prefetch_paid
+        self.budget = budget or fetch_budget.default_budget()
+        self.result_count = None
+        self.window = window if window is not None else PageWindow()
+        self.stats = {"memory hits": 0, "spill hits": 0, "prefetch hits": 0, "misses": 0,
+                      "prefetches skipped": 0}
+        self._pending = {}  # page -> Future of a prefetch
+
+    @property
+    def total_pages(self):
+        if self.result_count is None:
+            return 1
+        return page_count(self.result_count, self.page_size, self.first_index)
+
+    def offset(self, page):
+        return page_offset(page, self.page_size, self.first_index)
+
+    def _payload(self, page):
+        return {
+            **self.filter_params,
+            "count": False,
+            "size": self.page_size,
+            "resultIndex": self.offset(page),
+        }
+
+    def _fetch(self, page):
+        data, _ = self.budget.search(
+            self._payload(page), self.user_id, self.api_key, transform=self.transform,
+            typed=self.typed,
+        )
+        return data
+
+    def _prefetch(self, page):
+        """Fetches ``page`` ahead of time if that is free or allowed; None if skipped."""
+        data = self.budget.lookup(self._payload(page), self.api_key, self.transform, self.typed)
+        if data is not None or reapi_client.offline():
+            return data or self._fetch(page)
+        if not self.prefetch_paid:
+            return None
+        if self.budget.remaining(self.user_id) < PREFETCH_MIN_PAGES_LEFT * self.page_size:
+            self.stats["prefetches skipped"] += 1
+            return None
+        return self._fetch(page)
+
+    def get(self, page):
+        """Returns the response for ``page``, from the window or a prefetch when possible.
+
+        Raises ``requests.RequestException`` or ``fetch_budget.BudgetExceeded``
+        if the page has to be fetched and that fails.
+        """
+        data, source = self.window.lookup(page)
+        future = self._pending.pop(page, None)
+        if data is None and future is not None:
+            try:
+                data, source = future.result(), "prefetch"
+            except Exception:
+                data = None  # The prefetch failed; fetch the page now
+        if data is None:
+            self.stats["misses"] += 1
+            data = self._fetch(page)
+        else:
+            self.stats[f"{source} hits"] += 1
+        self.result_count = data.get("resultCount", self.result_count)
+        self.window.put(page, data, page)
+        return data
+
+    def prefetch_around(self, page):
+        """Starts fetching the pages next to ``page`` in the background."""
+        neighbours = [page + 1] + ([page - 1] if self.prefetch_previous else [])
+        for neighbour in neighbours:
+            if not 1 <= neighbour <= self.total_pages:
+                continue
+            if neighbour in self.window or neighbour in self._pending:
+                continue
+            self._pending[neighbour] = _prefetch_pool().submit(self._prefetch, neighbour)
+        reach = max(1, self.window.window // 2)
+        for stale in [stale for stale in self._pending if abs(stale - page) > reach]:
+            self._pending.pop(stale).cancel()
+
+    def close(self):
+        """Drops the cached pages, e.g. when the search is replaced."""
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self.window.close()
+
+    def hit_rate(self):
+        lookups = sum(self.stats.values()) - self.stats["prefetches skipped"]
+        return (lookups - self.stats["misses"]) / lookups if lookups else None
+
+    def summary(self):
+        hit_rate = self.hit_rate()
+        return {
+            **self.stats,
+            "hit rate": "-" if hit_rate is None else f"{hit_rate:.0%}",
+            "pages in memory": len(self.window),
+            "pages spilled": self.window.spilled_pages,
+            "pages evicted": self.window.evicted_pages,
+        }
+
+
+def render_pager_stats(pager):
+    """Displays the page cache statistics of the current search."""
+    import streamlit as st
+
+    if pager is None:
+        st.write("No paged search yet.")
+        return
+    st.table([{"metric": name, "value": value} for name, value in pager.summary().items()])
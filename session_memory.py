@@ -0,0 +1,260 @@
+"""Per-session memory budgets, spilling idle sessions to disk, and a memory dashboard.
+
+Every Streamlit session pins its results (a ``ResultSet`` over the shared
+property store) and its pager's page window for as long as the session
+lives, idle browser tabs included. After each rerun ``end_rerun`` records
+what the session holds, and two limits are applied to sessions that have
+been quiet for ``REAPI_SESSION_QUIET_SECONDS``:
+
+* ``REAPI_SESSION_MEMORY_MB`` per session: result sets beyond it are
+  spilled, largest first, and read back when the session next reruns;
+* ``REAPI_SERVER_MEMORY_MB`` for all sessions together: the least recently
+  active sessions are spilled first.
+
+The session being used is never spilled: each rerun reads all of its rows,
+so spilling it would cost a full write and read per widget interaction.
+A background thread applies the limits as sessions go quiet and spills
+every session idle for more than ``REAPI_SESSION_IDLE_SECONDS``. Spilled
+result sets are written column by column to ``REAPI_SESSION_SPILL_DIR``
+and reload transparently when they are next read; pager pages go to the
+pager's own spill directory.
+
+Before rows are spilled, the fetch budget's response cache and query
+planner forget the entries holding them, since those would otherwise keep
+the rows in memory. Sizes are estimates from a sample of each result
+set's rows and count only rows no other result set shares: shared rows
+stay in memory until nobody refers to them.
+"""
+import os
+import tempfile
+import threading
+import time
+import weakref
+
+import fetch_budget
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+SESSION_MEMORY_MB = float(os.environ.get("REAPI_SESSION_MEMORY_MB", "256"))
+SERVER_MEMORY_MB = float(os.environ.get("REAPI_SERVER_MEMORY_MB", "2048"))
+QUIET_SECONDS = int(os.environ.get("REAPI_SESSION_QUIET_SECONDS", "60"))
+IDLE_SECONDS = int(os.environ.get("REAPI_SESSION_IDLE_SECONDS", "600"))
+REAPER_INTERVAL_SECONDS = 30
+SPILL_DIR = os.environ.get("REAPI_SESSION_SPILL_DIR") or os.path.join(
+    tempfile.gettempdir(), "reapi_sessions"
+)
+
+MB = 1024 * 1024
+
+
+def current_session_id():
+    """The id of the Streamlit session running this thread, or None outside Streamlit."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def process_rss_bytes():
+    """Resident memory of this process (peak RSS where the current value isn't available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+class SessionMemory:
+    """What one session holds: weak references, so a closed session's data can be collected."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.last_active = time.monotonic()
+        self.result_sets = weakref.WeakSet()
+        self.pagers = weakref.WeakSet()
+
+    @property
+    def alive(self):
+        return len(self.result_sets) > 0 or len(self.pagers) > 0
+
+    def memory_bytes(self):
+        return (
+            sum(result_set.memory_bytes() for result_set in list(self.result_sets))
+            + sum(pager.window.memory_bytes() for pager in list(self.pagers))
+        )
+
+    def spill(self, keep_bytes=0):
+        """Spills result sets, largest first, until at most ``keep_bytes`` remain in memory."""
+        spilled = 0
+        result_sets = sorted(
+            list(self.result_sets), key=lambda result_set: result_set.memory_bytes(),
+            reverse=True,
+        )
+        held = self.memory_bytes()
+        budget = fetch_budget.default_budget()
+        for result_set in result_sets:
+            if held <= keep_bytes:
+                break
+            if result_set.spilled or not len(result_set):
+                continue
+            budget.release_rows(result_set.rows())
+            size = result_set.memory_bytes()
+            if size and result_set.spill(SPILL_DIR):
+                held -= size
+                spilled += size
+        if held > keep_bytes:
+            for pager in list(self.pagers):
+                budget.release_rows(pager.window.rows_in_memory())
+                pager.window.spill_all()
+        return spilled
+
+    def as_row(self, now):
+        result_sets = list(self.result_sets)
+        return {
+            "session": (self.session_id or "-")[:8],
+            "idle (s)": round(now - self.last_active),
+            "rows": sum(len(result_set) for result_set in result_sets),
+            "in memory (MB)": round(self.memory_bytes() / MB, 1),
+            "spilled (MB)": round(sum(result_set.spill_bytes for result_set in result_sets) / MB, 1),
+            "spills": sum(result_set.spills for result_set in result_sets),
+            "reloads": sum(result_set.reloads for result_set in result_sets),
+        }
+
+
+class SessionRegistry:
+    """The sessions of this process and the memory limits applied to them."""
+
+    def __init__(self, session_budget_mb=SESSION_MEMORY_MB, server_budget_mb=SERVER_MEMORY_MB,
+                 quiet_seconds=QUIET_SECONDS, idle_seconds=IDLE_SECONDS):
+        self.session_budget = session_budget_mb * MB
+        self.server_budget = server_budget_mb * MB
+        self.quiet_seconds = quiet_seconds
+        self.idle_seconds = idle_seconds
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+        self.spilled_bytes = 0
+
+    def touch(self, session_id, result_sets=(), pagers=()):
+        """Records that ``session_id`` is active and now holds ``result_sets`` and ``pagers``."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = SessionMemory(session_id)
+            session.last_active = time.monotonic()
+            session.result_sets = weakref.WeakSet(
+                result_set for result_set in result_sets if result_set is not None
+            )
+            session.pagers = weakref.WeakSet(pager for pager in pagers if pager is not None)
+        self._start_reaper()
+        return session
+
+    def sessions(self):
+        with self._lock:
+            for session_id in [key for key, session in self._sessions.items() if not session.alive]:
+                del self._sessions[session_id]
+            return list(self._sessions.values())
+
+    def enforce(self, active=None):
+        """Applies both budgets to the sessions quiet for ``quiet_seconds``, never to ``active``."""
+        now = time.monotonic()
+        sessions = self.sessions()
+        quiet = sorted(
+            (
+                other for other in sessions
+                if other is not active and now - other.last_active > self.quiet_seconds
+            ),
+            key=lambda other: other.last_active,
+        )
+        for other in quiet:
+            if other.memory_bytes() > self.session_budget:
+                self.spilled_bytes += other.spill(keep_bytes=self.session_budget)
+        total = sum(other.memory_bytes() for other in sessions)
+        for other in quiet:
+            if total <= self.server_budget:
+                break
+            before = other.memory_bytes()
+            self.spilled_bytes += other.spill()
+            total -= before - other.memory_bytes()
+
+    def reap(self):
+        """Spills every session idle longer than ``idle_seconds``, then applies the budgets."""
+        now = time.monotonic()
+        for session in self.sessions():
+            if now - session.last_active > self.idle_seconds:
+                self.spilled_bytes += session.spill()
+        self.enforce()
+
+    def _start_reaper(self):
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(
+                target=self._reap_forever, name="reapi-session-reaper", daemon=True
+            )
+        self._reaper.start()
+
+    def _reap_forever(self):
+        while True:
+            time.sleep(REAPER_INTERVAL_SECONDS)
+            try:
+                self.reap()
+            except Exception:
+                pass  # Keep reaping; a failed spill leaves the rows in memory
+
+    def summary(self):
+        now = time.monotonic()
+        rows = [session.as_row(now) for session in self.sessions()]
+        return rows, {
+            "sessions": len(rows),
+            "sessions in memory (MB)": round(sum(row["in memory (MB)"] for row in rows), 1),
+            "spilled to disk (MB)": round(sum(row["spilled (MB)"] for row in rows), 1),
+            "spilled since start (MB)": round(self.spilled_bytes / MB, 1),
+            "session budget (MB)": round(self.session_budget / MB),
+            "server budget (MB)": round(self.server_budget / MB),
+        }
+
+
+_registry = SessionRegistry()
+
+
+def get_registry():
+    """The registry shared by all sessions in this process."""
+    return _registry
+
+
+def end_rerun(result_sets=(), pagers=()):
+    """Called at the end of each rerun with what the session holds.
+
+    Applies the budgets to the other, quiet sessions; this one stays in
+    memory until it goes quiet itself.
+    """
+    registry = get_registry()
+    session = registry.touch(current_session_id(), result_sets, pagers)
+    registry.enforce(active=session)
+
+
+def render_memory_dashboard():
+    """Displays process memory, the shared store and every session's footprint."""
+    import streamlit as st
+
+    import property_store
+
+    rss = process_rss_bytes()
+    rows, totals = get_registry().summary()
+    st.metric("Process memory", "-" if rss is None else f"{rss / MB:,.0f} MB")
+    st.table([
+        {"metric": name, "value": value}
+        for name, value in {**totals, **property_store.get_store().stats()}.items()
+    ])
+    if rows:
+        st.dataframe(rows)
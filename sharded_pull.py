@@ -0,0 +1,305 @@
+"""Sharded pulls of large searches over a pool of worker processes.
+
+Instead of walking one huge ``resultIndex`` sequence, a search is split
+into independent shards by a location field (``state``, ``county``,
+``city`` or ``zip``), one shard per value. The shards are derived from the
+search itself when one of its location filters holds several values (e.g.
+a list of ZIP codes); the API offers no list of a state's counties or ZIP
+codes, so splitting a single state means entering those values by hand
+(range_splitter.py splits it by value instead). Shards are pulled in parallel
+by worker processes, each with its own connection pool, and their records
+are merged (in shard order, de-duplicated by property id) once they finish.
+
+Every page is still checked against the shared fetch budget: its ledger is
+file-locked, so worker processes draw from the same daily allowance. Each
+shard journals its pages (see pull_journal), so running a pull again after
+a failure resumes every shard where it stopped.
+
+    python sharded_pull.py --shard-by zip --values 10007 10014 10021 --api-key ...
+    python sharded_pull.py --filters '{"zip": ["10007", "10014"]}' --api-key ...
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from queue import Empty
+
+import fetch_budget
+import pull_journal
+
+SHARD_FIELDS = ("state", "county", "city", "zip")
+SHARD_WORKERS = int(os.environ.get("REAPI_SHARD_WORKERS", str(os.cpu_count() or 4)))
+PROGRESS_INTERVAL_SECONDS = 0.2
+
+
+class ShardReport:
+    """Progress and outcome of one shard."""
+
+    def __init__(self, field, value):
+        self.field = field
+        self.value = value
+        self.records = 0
+        self.result_count = None
+        self.pages = 0
+        self.seconds = None
+        self.truncated = False
+        self.reason = None
+        self.resumed_pages = 0
+        self.error = None
+
+    @property
+    def done(self):
+        return self.seconds is not None or self.error is not None
+
+    @property
+    def records_per_second(self):
+        return self.records / self.seconds if self.seconds else None
+
+    def as_row(self):
+        return {
+            "shard": f"{self.field}={self.value}",
+            "records": self.records,
+            "matching": self.result_count,
+            "pages": self.pages,
+            "resumed pages": self.resumed_pages,
+            "seconds": None if self.seconds is None else round(self.seconds, 2),
+            "records/s": (
+                None if self.records_per_second is None else round(self.records_per_second, 1)
+            ),
+            "status": self.error or (self.reason or "truncated" if self.truncated else
+                                     "done" if self.done else "running"),
+        }
+
+
+class ShardedPullResult:
+    """Merged records of a sharded pull, with a report per shard."""
+
+    def __init__(self, shards):
+        self.shards = shards
+        self.records = []
+        self.duplicates = 0
+        self.seconds = 0.0
+
+    @property
+    def records_per_second(self):
+        return len(self.records) / self.seconds if self.seconds else None
+
+    @property
+    def failed(self):
+        return [shard for shard in self.shards if shard.error is not None]
+
+    @property
+    def incomplete(self):
+        """Shards that stopped early and can be resumed by pulling again."""
+        return [shard for shard in self.shards if shard.truncated or shard.error is not None]
+
+
+def derive_shards(filter_params):
+    """The ``(field, values)`` a search splits into by its own filters, or ``(None, [])``.
+
+    The finest location filter holding several values wins, e.g. a list of
+    ZIP codes gives one shard per code.
+    """
+    for field in reversed(SHARD_FIELDS):
+        values = filter_params.get(field)
+        if isinstance(values, (list, tuple)) and len(set(values)) > 1:
+            return field, list(dict.fromkeys(values))
+    return None, []
+
+
+def plan_shards(filter_params, field, values):
+    """Returns one filter dict per shard value; ``field`` replaces any existing location filter."""
+    if field not in SHARD_FIELDS:
+        raise ValueError(f"Can't shard by {field!r}; expected one of {', '.join(SHARD_FIELDS)}")
+    base = {key: value for key, value in filter_params.items() if key != field}
+    return [{**base, field: value} for value in dict.fromkeys(values)]
+
+
+def _pull_shard(index, shard_params, user_id, api_key, max_records, page_size,
+                transform, typed, progress_queue, resumable):
+    """Runs in a worker process: pulls one shard through the fetch budget."""
+    started = time.perf_counter()
+    journal = (
+        pull_journal.PullJournal.for_pull(user_id, shard_params, page_size, transform, typed)
+        if resumable else None
+    )
+
+    def on_page(result):
+        progress_queue.put((index, len(result.records), result.result_count, result.pages))
+
+    result = fetch_budget.default_budget().pull(
+        shard_params, user_id, api_key, max_records, page_size=page_size,
+        transform=transform, typed=typed, on_page=on_page, journal=journal,
+    )
+    return result, time.perf_counter() - started
+
+
+def _record_id(record):
+    return record.get("id") if hasattr(record, "get") else record
+
+
+def sharded_pull(filter_params, field, values, user_id, api_key, max_records_per_shard,
+                 page_size=250, transform=None, typed=True, max_workers=SHARD_WORKERS,
+                 on_progress=None, resumable=True):
+    """Pulls every shard of a search in parallel and merges the records.
+
+    Without ``values`` the shards are derived from ``filter_params`` (see
+    ``derive_shards``); ValueError is raised if it can't be split.
+    ``on_progress(result)`` is called in the calling process whenever shard
+    progress arrives, with the per-shard ``ShardReport`` objects updated.
+    A shard that fails keeps its error in its report; the other shards'
+    records are still returned. With ``resumable`` each shard is journaled
+    and a repeated pull only requests the pages that are still missing.
+    """
+    if not values:
+        field, values = derive_shards(filter_params)
+        if not values:
+            raise ValueError(
+                "The search has no location filter with several values to shard by; "
+                "give the shard values"
+            )
+    shard_params = plan_shards(filter_params, field, values)
+    result = ShardedPullResult([ShardReport(field, params[field]) for params in shard_params])
+    started = time.perf_counter()
+    outputs = [None] * len(shard_params)
+    # Worker processes are spawned rather than forked: the Streamlit server is threaded
+    context = multiprocessing.get_context("spawn")
+    workers = max(1, min(max_workers, len(shard_params)))
+    with context.Manager() as manager, ProcessPoolExecutor(workers, mp_context=context) as pool:
+        progress_queue = manager.Queue()
+        futures = {
+            pool.submit(
+                _pull_shard, index, params, user_id, api_key, max_records_per_shard,
+                page_size, transform, typed, progress_queue, resumable,
+            ): index
+            for index, params in enumerate(shard_params)
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, PROGRESS_INTERVAL_SECONDS, FIRST_COMPLETED)
+            while True:
+                try:
+                    index, records, result_count, pages = progress_queue.get_nowait()
+                except Empty:
+                    break
+                shard = result.shards[index]
+                shard.records, shard.result_count, shard.pages = records, result_count, pages
+            for future in done:
+                shard = result.shards[futures[future]]
+                try:
+                    pulled, shard.seconds = future.result()
+                except Exception as e:
+                    shard.error = f"{type(e).__name__}: {e}"
+                    continue
+                outputs[futures[future]] = pulled.records
+                shard.records = len(pulled.records)
+                shard.result_count = pulled.result_count
+                shard.pages = pulled.pages
+                shard.truncated = pulled.truncated
+                shard.reason = pulled.reason
+                shard.resumed_pages = pulled.resumed_pages
+            if on_progress is not None:
+                on_progress(result)
+
+    seen = set()
+    for records in outputs:
+        for record in records or ():
+            key = _record_id(record)
+            if key is not None and key in seen:
+                result.duplicates += 1
+                continue
+            seen.add(key)
+            result.records.append(record)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def render_sharded_pull_panel(filter_params, user_id, api_key):
+    """Sidebar controls for a sharded pull; returns the merged result once one has run."""
+    import streamlit as st
+
+    from property_data import flatten_property
+
+    derived_field, derived_values = derive_shards(filter_params or {})
+    field = st.selectbox("Shard by", SHARD_FIELDS,
+                         index=SHARD_FIELDS.index(derived_field or "zip"))
+    values = [
+        value.strip()
+        for value in st.text_area(
+            f"{field} values (comma or line separated)",
+            value=", ".join(map(str, derived_values)) if field == derived_field else "",
+        ).replace("\n", ",").split(",")
+        if value.strip()
+    ]
+    max_records = st.number_input(
+        "Max records per shard", min_value=1, max_value=100000, value=1000, step=250
+    )
+    if not st.button("Run sharded pull", disabled=not values):
+        return None
+
+    progress = st.progress(0.0, text=f"Pulling {len(values)} shards...")
+    table = st.empty()
+
+    def on_progress(result):
+        finished = sum(shard.done for shard in result.shards)
+        progress.progress(finished / len(result.shards),
+                          text=f"{finished} of {len(result.shards)} shards done")
+        table.dataframe([shard.as_row() for shard in result.shards])
+
+    result = sharded_pull(
+        filter_params, field, values, user_id, api_key, max_records,
+        transform=flatten_property, on_progress=on_progress,
+    )
+    progress.empty()
+    st.success(
+        f"{len(result.records):,} records from {len(result.shards)} shards in "
+        f"{result.seconds:.1f}s ({result.records_per_second or 0:,.0f} records/s)"
+    )
+    if result.incomplete:
+        st.warning(
+            f"{len(result.incomplete)} shards stopped early. Run the pull again to resume "
+            "them; completed pages are not requested again."
+        )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pull a large search as parallel shards.")
+    parser.add_argument("--shard-by", choices=SHARD_FIELDS, default="zip")
+    parser.add_argument("--values", nargs="+",
+                        help="Shard values; derived from --filters when omitted")
+    parser.add_argument("--filters", default="{}", help="Other search filters, as JSON")
+    parser.add_argument("--max-records", type=int, default=1000, help="Per shard")
+    parser.add_argument("--page-size", type=int, default=250)
+    parser.add_argument("--workers", type=int, default=SHARD_WORKERS)
+    parser.add_argument("--user-id", default=os.environ.get("REAPI_USER_ID", "UniqueUserIdentifier"))
+    parser.add_argument("--api-key", default=os.environ.get("REAPI_API_KEY"))
+    args = parser.parse_args()
+
+    def on_progress(result):
+        finished = sum(shard.done for shard in result.shards)
+        records = sum(shard.records for shard in result.shards)
+        print(f"\r{finished}/{len(result.shards)} shards, {records:,} records", end="", flush=True)
+
+    filters = json.loads(args.filters)
+    if not args.values and not derive_shards(filters)[1]:
+        parser.error("--values is required unless --filters has several values for a location")
+
+    result = sharded_pull(
+        filters, args.shard_by, args.values, args.user_id, args.api_key,
+        args.max_records, page_size=args.page_size, max_workers=args.workers,
+        on_progress=on_progress,
+    )
+    print()
+    for shard in result.shards:
+        print(shard.as_row())
+    print(
+        f"{len(result.records):,} records ({result.duplicates} duplicates dropped) in "
+        f"{result.seconds:.2f}s, {result.records_per_second or 0:,.0f} records/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""Tests, run against the local stand-in API in ``bench.mock_server``.
+
+    python -m pytest tests
+"""
@@ -0,0 +1,29 @@
+import pytest
+
+import fetch_budget
+import query_planner
+import reapi_client
+from bench.mock_server import MockConfig, MockServer
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    """A stand-in API serving 2,000 synthetic properties; reapi_client points at it."""
+    with MockServer(MockConfig(result_count=2000)) as server:
+        monkeypatch.setattr(reapi_client, "API_BASE_URL", server.url)
+        reapi_client.set_transport(None)
+        yield server
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return fetch_budget.BudgetLedger(str(tmp_path / "ledger.json"))
+
+
+@pytest.fixture
+def budget(ledger):
+    """A budget with its own ledger, response cache and query planner."""
+    return fetch_budget.FetchBudget(
+        ledger=ledger, cache=fetch_budget.ResponseCache(), user_cap=100_000,
+        daily_cap=1_000_000, planner=query_planner.QueryPlanner(),
+    )
@@ -0,0 +1,61 @@
+import pytest
+
+import fetch_budget
+
+
+def test_ledger_reserve_is_capped_per_user_and_per_day(ledger):
+    assert ledger.reserve("alice", 60, user_cap=100, daily_cap=150) == 60
+    assert ledger.reserve("alice", 60, user_cap=100, daily_cap=150) == 40
+    assert ledger.reserve("bob", 80, user_cap=100, daily_cap=150) == 50
+    assert ledger.reserve("bob", 10, user_cap=100, daily_cap=150) == 0
+    assert ledger.usage("alice") == (100, 150)
+
+
+def test_ledger_refund_returns_unused_records(ledger):
+    ledger.reserve("alice", 100, user_cap=100, daily_cap=1000)
+    ledger.refund("alice", 30)
+    assert ledger.usage("alice") == (70, 70)
+    ledger.refund("alice", 500)  # Never below zero
+    assert ledger.usage("alice") == (0, 0)
+
+
+def test_ledger_is_shared_through_its_file(ledger):
+    other_process = fetch_budget.BudgetLedger(ledger.path)
+    ledger.reserve("alice", 40, user_cap=100, daily_cap=1000)
+    assert other_process.reserve("alice", 100, user_cap=100, daily_cap=1000) == 60
+
+
+def test_search_without_size_reserves_the_default_page(mock_api, budget):
+    data, charged = budget.search({"state": "FL"}, "analyst", "key")
+    assert len(data["data"]) == charged == fetch_budget.DEFAULT_PAGE_SIZE
+    assert budget.ledger.usage("analyst")[0] == fetch_budget.DEFAULT_PAGE_SIZE
+
+
+def test_search_is_charged_only_for_returned_records(mock_api, budget):
+    data, charged = budget.search({"state": "FL", "size": 250, "resultIndex": 300}, "analyst", "key")
+    assert charged == len(data["data"]) == 100
+    assert budget.ledger.usage("analyst")[0] == 100
+
+
+def test_exhausted_budget_raises(mock_api, budget):
+    budget.user_cap = 0
+    with pytest.raises(fetch_budget.BudgetExceeded):
+        budget.search({"state": "FL", "size": 10}, "analyst", "key")
+
+
+def test_cached_responses_are_not_shared_across_api_keys(mock_api, budget):
+    payload = {"state": "FL", "size": 10}
+    budget.search(payload, "alice", "alice-key")
+    _, charged = budget.search(payload, "alice", "alice-key")
+    assert charged == 0
+    data, charged = budget.search(payload, "mallory", "mallory-key")
+    assert charged == 10 and not data.get("fromCache")
+
+
+def test_planner_answers_only_for_the_same_api_key(mock_api, budget):
+    budget.pull({"state": "GA"}, "alice", "alice-key", max_records=1000)
+    narrower = {"state": "GA", "beds_min": 3, "size": 50}
+    data, _ = budget.search(narrower, "alice", "alice-key")
+    assert data.get("fromPlanner")
+    data, _ = budget.search(narrower, "mallory", "mallory-key")
+    assert not data.get("fromPlanner")
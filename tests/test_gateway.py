@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+import reapi_gateway
+
+
+class FakeUpstream:
+    """Answers with the API key it was sent, after a short delay."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def post(self, path, body, headers):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        body = json.dumps({"key": headers.get("x-api-key")}).encode()
+        return reapi_gateway.GatewayResponse(200, body)
+
+
+def _gateway():
+    upstream = FakeUpstream()
+    return reapi_gateway.Gateway(upstream, reapi_gateway.TokenBucket(rate=0)), upstream
+
+
+def _forward(gateway, api_key, body=b'{"state": "FL"}'):
+    return gateway.forward("/v2/PropertySearch", body, {"x-api-key": api_key})
+
+
+def test_cache_is_not_shared_across_api_keys():
+    gateway, upstream = _gateway()
+
+    async def run():
+        first = await _forward(gateway, "alice")
+        again = await _forward(gateway, "alice", b'{ "state":"FL" }')
+        other = await _forward(gateway, "mallory")
+        return first, again, other
+
+    first, again, other = asyncio.run(run())
+    assert again is first
+    assert json.loads(other.body) == {"key": "mallory"}
+    assert upstream.calls == 2
+
+
+def test_coalescing_only_joins_requests_with_the_same_credentials():
+    gateway, upstream = _gateway()
+
+    async def run():
+        return await asyncio.gather(
+            _forward(gateway, "alice"), _forward(gateway, "alice"), _forward(gateway, "mallory")
+        )
+
+    alice, alice_again, mallory = asyncio.run(run())
+    assert alice_again is alice
+    assert json.loads(mallory.body) == {"key": "mallory"}
+    assert upstream.calls == 2
+    assert gateway.stats["coalesced"] == 1
+
+
+def test_reason_for_non_standard_status():
+    assert reapi_gateway._reason(404) == "Not Found"
+    assert reapi_gateway._reason(599) == "Unknown"
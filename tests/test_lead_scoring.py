@@ -0,0 +1,33 @@
+import lead_scoring
+
+
+def _rows(*equities):
+    return [{"id": f"p{equity}", "equityPercent": equity} for equity in equities]
+
+
+def _ranked_equities(ranking):
+    return [row["equityPercent"] for _, row in ranking.ranked()]
+
+
+def test_ranking_fills_partway_through_a_batch():
+    ranking = lead_scoring.LeadRanking(k=4, weights={"equity": 1})
+    ranking.add(_rows(90))
+    ranking.add(_rows(80, 70, 60, 50, 10))
+    assert _ranked_equities(ranking) == [90, 80, 70, 60]
+
+
+def test_ranking_keeps_best_across_batches():
+    ranking = lead_scoring.LeadRanking(k=3, weights={"equity": 1})
+    ranking.add(_rows(10, 20, 30))
+    ranking.add(_rows(5, 25, 95))
+    ranking.add(_rows(30, 40))  # p30 was already scored
+    assert _ranked_equities(ranking) == [95, 40, 30]
+    assert ranking.scored == 7
+
+
+def test_top_k_orders_best_first():
+    import numpy as np
+
+    scores = np.array([3.0, 9.0, 1.0, 7.0])
+    assert list(lead_scoring.top_k(scores, 2)) == [1, 3]
+    assert list(lead_scoring.top_k(scores, 10)) == [1, 3, 0, 2]
@@ -0,0 +1,65 @@
+import pytest
+
+import fetch_budget
+
+import property_detail
+import reapi_client
+import traffic_journal
+
+
+def test_hydrate_reports_progress_when_everything_is_cached(mock_api, budget):
+    cache = property_detail.DetailCache()
+    ids = ["1", "2"]
+    for property_id in ids:
+        cache.put(property_id, {"id": property_id}, fetch_budget.key_digest("key"))
+    calls = []
+    result = property_detail.hydrate(ids, "analyst", "key", budget=budget, cache=cache,
+                                     on_batch=lambda result, total: calls.append(result.done))
+    assert result.cache_hits == 2
+    assert calls == [2]
+
+
+def test_hydrate_refunds_lookups_never_made(mock_api, budget, monkeypatch):
+    ids = [str(100000000 + n) for n in range(30)]
+    fetch = reapi_client.get_property_details_concurrently
+    batches = []
+
+    def fail_second_batch(batch, *args, **kwargs):
+        batches.append(batch)
+        if len(batches) == 2:
+            raise RuntimeError("connection pool closed")
+        return fetch(batch, *args, **kwargs)
+
+    monkeypatch.setattr(reapi_client, "get_property_details_concurrently", fail_second_batch)
+    with pytest.raises(RuntimeError):
+        property_detail.hydrate(ids, "analyst", "key", budget=budget, batch_size=10,
+                                cache=property_detail.DetailCache())
+    assert budget.ledger.usage("analyst")[0] == 10  # Only the first batch was fetched
+
+
+def test_cached_details_are_scoped_by_api_key(mock_api, budget):
+    cache = property_detail.DetailCache()
+    mine = property_detail.hydrate(["100000001"], "analyst", "key", budget=budget, cache=cache)
+    assert mine.fetched == 1
+    theirs = property_detail.hydrate(["100000001"], "other", "other-key", budget=budget,
+                                     cache=cache)
+    assert theirs.cache_hits == 0 and theirs.fetched == 1
+    again = property_detail.hydrate(["100000001"], "analyst", "key", budget=budget, cache=cache)
+    assert again.cache_hits == 1
+
+
+def test_replayed_lookups_are_not_charged(mock_api, budget, tmp_path):
+    ids = ["100000001", "100000002"]
+    path = str(tmp_path / "traffic.jsonl.gz")
+    try:
+        reapi_client.set_transport(traffic_journal.Recorder(path))
+        property_detail.hydrate(ids, "analyst", "key", budget=budget,
+                                cache=property_detail.DetailCache())
+        used = budget.ledger.usage("analyst")
+        reapi_client.set_transport(traffic_journal.Replayer(path, time_scale=0))
+        replayed = property_detail.hydrate(ids, "analyst", "key", budget=budget,
+                                           cache=property_detail.DetailCache())
+    finally:
+        reapi_client.set_transport(None)
+    assert replayed.fetched == 2
+    assert budget.ledger.usage("analyst") == used
@@ -0,0 +1,40 @@
+import json
+from datetime import date
+
+import property_model
+
+
+def _page(records, **meta):
+    return json.dumps({"data": records, "resultCount": len(records or []), **meta}).encode()
+
+
+def test_decode_page_types_known_fields_and_keeps_unknown_ones():
+    body = _page([{
+        "id": "1", "bedrooms": "3", "vacant": "true", "lastSaleDate": "2020-05-01",
+        "estimatedValue": 250000, "someNewField": {"a": 1},
+    }])
+    records, meta = property_model.decode_page(body)
+    record = records[0]
+    assert (record.id, record.bedrooms, record.vacant) == ("1", 3, True)
+    assert record.lastSaleDate == date(2020, 5, 1)
+    assert record.estimatedValue == 250000.0
+    assert record.extra == {"someNewField": {"a": 1}}
+    assert meta["resultCount"] == 1
+
+
+def test_decode_page_coerces_datetimes_field_by_field():
+    records, _ = property_model.decode_page(_page([{"id": "1", "lastSaleDate": "2020-05-01T10:00:00"}]))
+    assert records[0].lastSaleDate == date(2020, 5, 1)
+
+
+def test_decode_page_accepts_null_data_and_ids_only():
+    assert property_model.decode_page(_page(None))[0] == []
+    assert property_model.decode_page(_page(["1", "2"]))[0] == ["1", "2"]
+
+
+def test_both_decoders_keep_fractional_values():
+    prop = {"id": "1", "ltv": 62.5, "equityPercent": "37.5", "bedrooms": 2.5, "rooms": 6.0}
+    for record in (property_model.decode_record(prop), property_model.record_from_dict(prop)):
+        assert (record.ltv, record.equityPercent) == (62.5, 37.5)
+        assert (record.bedrooms, record.rooms) == (None, 6)
+        assert record.extra == {"bedrooms": 2.5}  # Not truncated to 2
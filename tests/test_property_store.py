@@ -0,0 +1,29 @@
+import property_store
+
+
+def test_rows_are_shared_and_evicted_with_their_last_result_set():
+    store = property_store.PropertyStore()
+    first = store.add_rows([{"id": 1, "city": "Miami"}, {"id": 2, "city": "Tampa"}])
+    second = store.add_rows([{"id": 2, "city": "Tampa"}])
+    assert store.stats()["rows stored"] == 2
+    first.release()
+    assert store.stats()["rows stored"] == 1
+    assert second.rows() == [{"id": 2, "city": "Tampa"}]
+
+
+def test_new_search_keeps_hydrated_fields():
+    store = property_store.PropertyStore()
+    held = store.add_rows([{"id": 1, "equityPercent": 40, "ownerName": None}])
+    store.merge("1", {"ownerName": "Smith", "lotSquareFeet": 5000})
+    again = store.add_rows([{"id": 1, "equityPercent": 45, "ownerName": None}])
+    assert again.rows() == [{"id": 1, "equityPercent": 45, "ownerName": "Smith",
+                             "lotSquareFeet": 5000}]
+    assert held.rows() == again.rows()
+
+
+def test_release_while_holding_the_lock_does_not_deadlock():
+    store = property_store.PropertyStore()
+    result_set = store.add_rows([{"id": 1}])
+    with store._lock:  # As when garbage collection finalizes a result set mid-add
+        result_set.release()
+    assert store.stats()["rows stored"] == 0
@@ -0,0 +1,78 @@
+from datetime import date
+
+import property_data
+import property_model
+import pull_journal
+
+
+def _journal(tmp_path, user_id="analyst", filters=None):
+    return pull_journal.PullJournal.for_pull(
+        user_id, filters or {"state": "FL"}, 100, directory=str(tmp_path)
+    )
+
+
+def test_pages_round_trip(tmp_path):
+    journal = _journal(tmp_path)
+    journal.record(0, [{"id": "1", "city": "Miami", "equityPercent": 40.5}], 2)
+    typed = property_model.record_from_dict(
+        {"id": "2", "lastSaleDate": "2020-05-01", "someNewField": [1, 2]}
+    )
+    journal.record(1, [typed], 2)
+    pages = journal.load()
+    assert pages[0] == ([{"id": "1", "city": "Miami", "equityPercent": 40.5}], 2)
+    record = pages[1][0][0]
+    assert record.lastSaleDate == date(2020, 5, 1)
+    assert record.extra == {"someNewField": [1, 2]}
+
+
+def test_torn_tail_is_dropped_and_appends_stay_readable(tmp_path):
+    journal = _journal(tmp_path)
+    journal.record(0, [{"id": "1"}], 3)
+    with open(journal.path, "ab") as f:
+        f.write(b'{"resultIndex": 1, "records": [{"id"')  # A crash mid-write
+    assert list(journal.load()) == [0]
+    journal.record(1, [{"id": "2"}], 3)
+    assert sorted(journal.load()) == [0, 1]
+
+
+def test_journals_are_keyed_by_user_and_canonical_filters(tmp_path):
+    mine = _journal(tmp_path, filters={"state": "FL", "zip": ["33101", "33100"], "beds_min": 0})
+    same = _journal(tmp_path, filters={"zip": ["33100", "33101"], "state": "FL", "size": 50})
+    theirs = _journal(tmp_path, "someone-else", filters={"state": "FL", "zip": ["33100", "33101"]})
+    assert mine.path == same.path
+    assert mine.path != theirs.path
+
+
+def test_pull_resumes_from_the_journal(mock_api, budget, tmp_path):
+    filters = {"state": "FL"}
+    journal = pull_journal.PullJournal.for_pull("analyst", filters, 100, directory=str(tmp_path))
+    first = budget.pull(filters, "analyst", "key", max_records=100, page_size=100)
+    journal.record(0, first.records, first.result_count)
+    budget.cache = type(budget.cache)()
+    budget.planner = type(budget.planner)()
+
+    resumed = budget.pull(filters, "analyst", "key", max_records=300, page_size=100,
+                          journal=journal)
+    assert resumed.resumed_pages == 1
+    assert resumed.records_charged == 200  # Only the two missing pages were requested
+    assert resumed.records[:100] == first.records
+    assert len({record["id"] for record in resumed.records}) == 300
+    assert journal.load() == {}  # Removed once the pull completed
+
+
+def test_resumed_flattened_rows_keep_their_dates(mock_api, budget, tmp_path):
+    filters = {"state": "FL"}
+    options = {"transform": property_data.flatten_property, "typed": True}
+    journal = pull_journal.PullJournal.for_pull(
+        "analyst", filters, 100, directory=str(tmp_path), **options
+    )
+    first = budget.pull(filters, "analyst", "key", max_records=100, page_size=100, **options)
+    journal.record(0, first.records, first.result_count)
+    budget.cache = type(budget.cache)()
+    budget.planner = type(budget.planner)()
+
+    resumed = budget.pull(filters, "analyst", "key", max_records=200, page_size=100,
+                          journal=journal, **options)
+    assert resumed.resumed_pages == 1
+    assert resumed.records[:100] == first.records
+    assert {type(row["lastSaleDate"]) for row in resumed.records} == {date}
@@ -0,0 +1,88 @@
+from datetime import date
+
+import query_planner
+import reapi_client
+
+
+def test_canonicalize_strips_noise():
+    params = {
+        "state": " FL ", "city": "", "zip": "33102, 33101,33102", "beds_min": 0,
+        "beds_max": 4.0, "ids_only": False, "count": False, "value": 0,
+        "value_operator": "gte", "auction_date_min": date(2024, 1, 2),
+        "last_sale_date": "2023-05-01T00:00:00", "last_sale_date_operator": "lt",
+    }
+    assert query_planner.canonicalize(params) == {
+        "auction_date_min": "2024-01-02",
+        "beds_max": 4,
+        "last_sale_date": "2023-05-01",
+        "last_sale_date_operator": "lt",
+        "state": "FL",
+        "value": 0,
+        "value_operator": "gte",
+        "zip": ["33101", "33102"],
+    }
+
+
+def test_canonicalize_single_zip_and_key_order():
+    first = query_planner.canonicalize({"zip": ["33101"], "state": "FL", "summary": False})
+    second = query_planner.canonicalize({"state": "FL", "zip": "33101"})
+    assert first == second == {"state": "FL", "zip": "33101"}
+    assert list(first) == ["state", "zip"]
+
+
+def test_plan_filter_accepts_only_subsets():
+    wide = query_planner.canonicalize({"state": "FL", "beds_min": 2})
+    narrow = query_planner.canonicalize({"state": "FL", "beds_min": 3, "vacant": True})
+    predicate = query_planner.plan_filter(narrow, wide)
+    assert predicate({"bedrooms": 3, "vacant": True}) is True
+    assert predicate({"bedrooms": 2, "vacant": True}) is False
+    assert predicate({"bedrooms": 4, "vacant": False}) is False
+    assert predicate({"bedrooms": 4}) is None  # Can't tell without the flag
+
+    assert query_planner.plan_filter(wide, narrow) is None
+    assert query_planner.plan_filter(
+        query_planner.canonicalize({"state": "TX", "beds_min": 3}), wide
+    ) is None
+    assert query_planner.plan_filter(
+        query_planner.canonicalize({"state": "FL", "beds_min": 3, "property_type": "SFR"}), wide
+    ) is None
+
+
+def test_strict_bound_is_narrower_than_inclusive_one():
+    wide = query_planner.canonicalize({"value": 100000, "value_operator": "gte"})
+    narrow = query_planner.canonicalize({"value": 100000, "value_operator": "gt"})
+    assert query_planner.plan_filter(narrow, wide)({"estimatedValue": 100000}) is False
+    assert query_planner.plan_filter(wide, narrow) is None
+
+
+def test_answer_matches_the_api(mock_api):
+    planner = query_planner.QueryPlanner()
+    wide = {"state": "GA"}
+    records = []
+    while True:
+        page = reapi_client.search_properties(
+            {**wide, "size": 250, "resultIndex": len(records)}, "analyst", "key"
+        )
+        records.extend(page["data"])
+        if not page["data"] or len(records) >= page["resultCount"]:
+            break
+    assert planner.record(wide, records, page["resultCount"])
+
+    narrow = {"state": "GA", "beds_min": 3, "value_max": 400000, "size": 250}
+    answered = planner.answer(query_planner.canonicalize(narrow))
+    from_api = reapi_client.search_properties(narrow, "analyst", "key")
+    assert answered["fromPlanner"]
+    assert answered["resultCount"] == from_api["resultCount"]
+    assert [record["id"] for record in answered["data"]] == [
+        record["id"] for record in from_api["data"]
+    ]
+
+    counted = planner.answer(query_planner.canonicalize({**narrow, "count": True}))
+    assert counted["resultCount"] == from_api["resultCount"] and counted["data"] == []
+    assert planner.answer(query_planner.canonicalize({"state": "TX", "size": 10})) is None
+
+
+def test_incomplete_result_sets_are_not_recorded():
+    planner = query_planner.QueryPlanner()
+    assert not planner.record({"state": "FL"}, [{"id": "1"}], result_count=2)
+    assert planner.answer({"state": "FL", "beds_min": 3}) is None
@@ -0,0 +1,73 @@
+import pytest
+
+import range_splitter
+from bench import mock_server
+
+
+def _count(budget, params):
+    data, _ = budget.search({**params, "count": True}, "analyst", "key")
+    return data["resultCount"]
+
+
+def test_slices_cover_the_range_exactly(mock_api, budget):
+    result, base = range_splitter.plan_slices(
+        {"state": "FL"}, "value", "analyst", "key", max_slice=60, budget=budget
+    )
+    slices = result.slices
+    assert len(slices) > 4
+    assert slices[0].low == 0
+    assert slices[-1].high <= 1_000_000_000
+    for previous, piece in zip(slices, slices[1:]):
+        assert piece.low > previous.high  # No overlap
+    for piece in slices:
+        assert 0 < piece.count <= 60
+        assert _count(budget, {**base, **piece.params}) == piece.count
+    assert sum(piece.count for piece in slices) == result.result_count
+    assert result.unreachable == 0
+
+
+def test_matches_outside_the_split_range_are_unreachable(mock_api, budget, monkeypatch):
+    monkeypatch.setitem(range_splitter.SPLIT_FIELDS, "year_built", ("Year built", 1950, 2030))
+    result, _ = range_splitter.plan_slices(
+        {"state": "TX"}, "year_built", "analyst", "key", max_slice=100, budget=budget
+    )
+    before_1950 = _count(budget, {"state": "TX", "year_built_max": 1949})
+    assert before_1950 > 0
+    assert result.unreachable == before_1950
+    assert sum(piece.count for piece in result.slices) == result.result_count - before_1950
+
+
+def test_split_refused_when_the_api_ignores_the_range(mock_api, budget, monkeypatch):
+    monkeypatch.delitem(mock_server.RANGE_FILTERS, "value_min")
+    monkeypatch.delitem(mock_server.RANGE_FILTERS, "value_max")
+    with pytest.raises(ValueError, match="halves"):
+        range_splitter.plan_slices({"state": "FL"}, "value", "analyst", "key", max_slice=60,
+                                   budget=budget)
+
+
+def test_split_pull_merges_slices_without_duplicates(mock_api, budget, monkeypatch):
+    pull_slice = range_splitter._pull_slice
+
+    def pull_slice_with_a_repeat(*args, **kwargs):
+        pulled = pull_slice(*args, **kwargs)
+        pulled.records.append({"id": "seen-in-every-slice"})
+        return pulled
+
+    monkeypatch.setattr(range_splitter, "_pull_slice", pull_slice_with_a_repeat)
+    result = range_splitter.split_pull(
+        {"state": "GA"}, "value", "analyst", "key", max_records=10_000, max_slice=100,
+        page_size=50, typed=False, resumable=False, budget=budget,
+    )
+    ids = [record["id"] for record in result.records]
+    assert len(ids) == len(set(ids)) == result.result_count + 1
+    assert result.duplicates == len(result.slices) - 1
+    assert not result.incomplete
+
+
+def test_typed_slices_are_deduplicated_by_id(mock_api, budget):
+    result = range_splitter.split_pull(
+        {"state": "OH"}, "year_built", "analyst", "key", max_records=10_000, max_slice=150,
+        resumable=False, budget=budget,
+    )
+    assert len({record.id for record in result.records}) == len(result.records)
+    assert len(result.records) == result.result_count
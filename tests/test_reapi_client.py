@@ -0,0 +1,42 @@
+import property_model
+import reapi_client
+
+
+def test_typed_search_streams_records(mock_api, monkeypatch):
+    decoded = []
+    real_decode = property_model.decode_record
+
+    def decode_record(prop):
+        decoded.append(prop)
+        return real_decode(prop)
+
+    monkeypatch.setattr(property_model, "decode_record", decode_record)
+    stream = reapi_client.stream_search_properties(
+        {"state": "FL", "size": 50}, "analyst", "key", typed=True
+    )
+    iterator = iter(stream)
+    first = next(iterator)
+    if reapi_client.ijson is not None:
+        assert len(decoded) == 1  # Built before the rest of the page was parsed
+    records = [first, *iterator]
+    assert len(records) == 50
+    assert all(isinstance(record, property_model.PropertyRecord) for record in records)
+    assert stream.meta["resultCount"] == 400
+
+
+def test_typed_and_plain_searches_agree(mock_api):
+    payload = {"state": "TX", "size": 20}
+    plain = reapi_client.search_properties(payload, "analyst", "key")
+    typed = reapi_client.search_properties(payload, "analyst", "key", typed=True)
+    assert [record["id"] for record in plain["data"]] == [record.id for record in typed["data"]]
+    assert plain["resultCount"] == typed["resultCount"]
+
+
+def test_retry_after_is_capped():
+    class Throttled:
+        def __init__(self, retry_after):
+            self.headers = {"Retry-After": retry_after}
+
+    assert reapi_client._retry_delay(Throttled("3"), 0) == 3
+    assert reapi_client._retry_delay(Throttled("86400"), 0) == reapi_client.MAX_RETRY_DELAY_SECONDS
+    assert reapi_client._retry_delay(None, 1) == reapi_client.RETRY_BACKOFF_SECONDS * 2
@@ -0,0 +1,32 @@
+import csv
+import threading
+
+import result_export
+
+
+def test_csv_export_streams_all_rows(tmp_path):
+    rows = [{"id": str(n), "city": "Miami", "tags": ["a", "b"]} for n in range(12)]
+    job = result_export.start_export(rows, ["id", "tags"], "CSV", directory=str(tmp_path))
+    job.future.result(timeout=10)
+    with open(job.path, newline="") as f:
+        written = list(csv.reader(f))
+    assert written[0] == ["id", "tags"]
+    assert written[1] == ["0", '["a", "b"]']
+    assert len(written) == 13
+    assert job.written == 12 and job.error is None
+
+
+def test_cancelled_export_has_no_error(tmp_path, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(result_export, "_pool", None)
+    monkeypatch.setattr(result_export, "EXPORT_WORKERS", 1)
+    blocker = result_export._export_pool().submit(release.wait)
+    try:
+        job = result_export.start_export([{"id": "1"}], ["id"], "CSV", directory=str(tmp_path))
+        job.discard()
+        assert job.done and job.cancelled
+        assert job.error is None
+    finally:
+        release.set()
+        blocker.result(timeout=10)
+        result_export._export_pool().shutdown()
@@ -0,0 +1,33 @@
+import result_pager
+
+
+def _pager(budget, **options):
+    return result_pager.Pager({"state": "FL"}, "analyst", "key", page_size=50,
+                              budget=budget, window=result_pager.PageWindow(spill_max=0),
+                              **options)
+
+
+def _prefetch_next(pager):
+    pager.get(1)
+    pager.prefetch_around(1)
+    return pager._pending[2].result()
+
+
+def test_paid_pages_are_not_prefetched_by_default(mock_api, budget):
+    pager = _pager(budget)
+    assert _prefetch_next(pager) is None
+    assert budget.ledger.usage("analyst")[0] == 50
+    pager.get(2)
+    assert pager.stats["misses"] == 2
+
+
+def test_paid_prefetch_is_opt_in_and_keeps_a_reserve(mock_api, budget):
+    pager = _pager(budget, prefetch_paid=True)
+    assert len(_prefetch_next(pager)["data"]) == 50
+    pager.get(2)
+    assert pager.stats["prefetch hits"] == 1
+
+    budget.user_cap = budget.ledger.usage("analyst")[0] + 99  # Less than two pages left
+    pager.prefetch_around(2)
+    assert pager._pending[3].result() is None
+    assert pager.stats["prefetches skipped"] == 1
@@ -0,0 +1,68 @@
+import gc
+
+import fetch_budget
+import property_store
+import session_memory
+
+
+def _first_page_cached(budget):
+    key = fetch_budget.cache_key(
+        {"state": "FL", "count": False, "size": 250, "resultIndex": 0}, api_key="key"
+    )
+    return budget.cache.get(key) is not None
+
+
+def test_spilling_frees_rows_held_by_the_response_cache(mock_api, budget, monkeypatch,
+                                                        tmp_path):
+    monkeypatch.setattr(fetch_budget, "default_budget", lambda: budget)
+    monkeypatch.setattr(session_memory, "SPILL_DIR", str(tmp_path))
+    store = property_store.PropertyStore()
+    pulled = budget.pull({"state": "FL"}, "analyst", "key", max_records=500, page_size=250)
+    result_set = store.add_rows(pulled.records)
+    pulled_rows = len(pulled.records)
+    del pulled
+    assert _first_page_cached(budget)
+
+    session = session_memory.SessionMemory("s1")
+    session.result_sets.add(result_set)
+    held = session.memory_bytes()
+    assert held > 0
+    assert session.spill() == held
+    assert result_set.spilled
+    assert not _first_page_cached(budget)
+
+    gc.collect()
+    assert store.stats()["rows stored"] == 0
+    assert len(result_set.rows()) == pulled_rows  # Read back from disk
+
+
+def test_shared_rows_are_not_counted_as_freed():
+    store = property_store.PropertyStore()
+    rows = [{"id": n, "city": "Miami"} for n in range(10)]
+    mine = store.add_rows(rows)
+    theirs = store.add_rows(rows[:4])
+    assert mine.memory_bytes() == property_store.estimate_row_bytes(rows) * 6
+    assert theirs.memory_bytes() == 0
+
+
+def test_only_quiet_sessions_are_spilled(budget, monkeypatch, tmp_path):
+    monkeypatch.setattr(fetch_budget, "default_budget", lambda: budget)
+    monkeypatch.setattr(session_memory, "SPILL_DIR", str(tmp_path))
+    store = property_store.PropertyStore()
+    busy_rows = store.add_rows([{"id": n, "city": "Miami"} for n in range(100)])
+    quiet_rows = store.add_rows([{"id": n, "city": "Tampa"} for n in range(100, 200)])
+    registry = session_memory.SessionRegistry(
+        session_budget_mb=0, server_budget_mb=0, quiet_seconds=60
+    )
+    monkeypatch.setattr(registry, "_start_reaper", lambda: None)
+    quiet = registry.touch("quiet", [quiet_rows])
+    quiet.last_active -= 61
+    busy = registry.touch("busy", [busy_rows])
+
+    registry.enforce(active=busy)
+    assert quiet_rows.spilled
+    assert not busy_rows.spilled  # Its next rerun would only read it all back
+
+    busy.last_active -= 61
+    registry.reap()
+    assert busy_rows.spilled
@@ -0,0 +1,18 @@
+import pytest
+
+import sharded_pull
+
+
+def test_shards_are_derived_from_multi_valued_locations():
+    filters = {"state": "NY", "zip": ["10007", "10014", "10007"], "beds_min": 2}
+    assert sharded_pull.derive_shards(filters) == ("zip", ["10007", "10014"])
+    assert sharded_pull.plan_shards(filters, "zip", ["10007", "10014"]) == [
+        {"state": "NY", "zip": "10007", "beds_min": 2},
+        {"state": "NY", "zip": "10014", "beds_min": 2},
+    ]
+    assert sharded_pull.derive_shards({"state": "NY", "zip": "10007"}) == (None, [])
+
+
+def test_a_search_without_shard_values_is_refused():
+    with pytest.raises(ValueError):
+        sharded_pull.sharded_pull({"state": "NY"}, "zip", None, "analyst", "key", 100)
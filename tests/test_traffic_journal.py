@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+import api_metrics
+import reapi_client
+import traffic_journal
+
+
+@pytest.fixture
+def restore_transport():
+    yield
+    reapi_client.set_transport(None)
+
+
+def test_journal_names_stay_in_the_traffic_directory(tmp_path):
+    assert traffic_journal.journal_path("a.jsonl.gz", str(tmp_path)) == str(tmp_path / "a.jsonl.gz")
+    for name in ("../a.jsonl.gz", "/etc/passwd", "..", ""):
+        with pytest.raises(ValueError):
+            traffic_journal.journal_path(name, str(tmp_path))
+
+
+def test_replay_matches_recording_and_is_not_charged(mock_api, budget, tmp_path,
+                                                    restore_transport):
+    path = str(tmp_path / "traffic.jsonl.gz")
+    payload = {"state": "FL", "size": 50}
+    reapi_client.set_transport(traffic_journal.Recorder(path))
+    recorded, charged = budget.search(payload, "analyst", "secret-key")
+    assert charged == 50
+    for entry in traffic_journal.read_entries(path):
+        assert "secret-key" not in json.dumps([entry["payload"], entry["request_headers"]])
+
+    budget.cache = type(budget.cache)()
+    budget.planner = type(budget.planner)()
+    used_before = budget.ledger.usage("analyst")
+    reapi_client.set_transport(traffic_journal.Replayer(path, time_scale=0))
+    replayed, charged = budget.search(payload, "analyst", "secret-key")
+    assert charged == 0
+    assert budget.ledger.usage("analyst") == used_before
+    assert replayed["data"] == recorded["data"]
+
+    with pytest.raises(traffic_journal.ReplayMiss):
+        budget.search({"state": "TX", "size": 50}, "analyst", "secret-key")
+
+
+def test_recorded_responses_report_their_wire_size(mock_api, budget, tmp_path, monkeypatch,
+                                                   restore_transport):
+    observed = []
+    monkeypatch.setattr(
+        api_metrics, "observe_request", lambda *args, **kwargs: observed.append(kwargs)
+    )
+    path = str(tmp_path / "traffic.jsonl.gz")
+    reapi_client.set_transport(traffic_journal.Recorder(path))
+    budget.search({"state": "FL", "size": 250}, "analyst", "secret-key")
+
+    [entry] = traffic_journal.read_entries(path)
+    [metrics] = observed
+    assert metrics["wire_bytes"] == entry["wire_bytes"]
+    assert metrics["wire_bytes"] < metrics["response_bytes"]  # The mock gzips bodies
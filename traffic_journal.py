@@ -0,0 +1,282 @@
+"""Recording API traffic to a journal and replaying it offline.
+
+``Recorder`` is a reapi_client transport that sends requests as usual and
+appends each exchange to a gzip-compressed JSONL journal: the endpoint,
+the request payload, the response status, headers and raw body, and how
+long the response took to start and to finish. Credentials never reach
+the journal: API keys and user ids are replaced by ``REDACTED``.
+
+``Replayer`` is a transport that answers requests from a journal instead
+of the network, matching on endpoint and payload. Responses are paced
+like the originals, scaled by ``time_scale`` (0 replays as fast as
+possible), so a slow production session can be reproduced and profiled
+offline without spending credits. Repeated requests get their recorded
+responses in order, retries included.
+
+Recording and replay apply to the whole server, so they are chosen at
+startup only: set ``REAPI_RECORD_TRAFFIC`` or ``REAPI_REPLAY_TRAFFIC`` to a
+journal file name (``REAPI_REPLAY_TIME_SCALE`` scales replayed timings).
+Journals always live in ``REAPI_TRAFFIC_DIR``. Replayed searches are not
+charged to the fetch budget. Each entry is written as its own gzip member
+under a file lock, so several processes can record into one journal.
+"""
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; appends are then per process only
+    fcntl = None
+
+TRAFFIC_DIR = os.environ.get("REAPI_TRAFFIC_DIR") or os.path.join(
+    tempfile.gettempdir(), "reapi_traffic"
+)
+RECORD_NAME = os.environ.get("REAPI_RECORD_TRAFFIC")
+REPLAY_NAME = os.environ.get("REAPI_REPLAY_TRAFFIC")
+REPLAY_TIME_SCALE = float(os.environ.get("REAPI_REPLAY_TIME_SCALE", "1"))
+
+REDACTED = "REDACTED"
+SECRET_HEADERS = ("x-api-key", "x-user-id", "authorization")
+SECRET_PAYLOAD_KEYS = ("api_key", "apiKey", "x-api-key")
+# Response headers worth keeping (the rest describe the original connection)
+KEPT_HEADERS = ("content-type", "retry-after", "x-ratelimit-remaining", "x-request-id")
+
+
+def redact_headers(headers):
+    """A copy of ``headers`` with credentials replaced by ``REDACTED``."""
+    return {
+        name: REDACTED if name.lower() in SECRET_HEADERS else value
+        for name, value in headers.items()
+    }
+
+
+def redact_payload(payload):
+    if not isinstance(payload, dict):
+        return payload
+    return {
+        key: REDACTED if key in SECRET_PAYLOAD_KEYS else value for key, value in payload.items()
+    }
+
+
+def request_key(path, payload):
+    """Matches a replayed request to its recording."""
+    return json.dumps([path, redact_payload(payload)], sort_keys=True, default=str)
+
+
+# --- Journal Files ---
+
+
+def journal_path(name, directory=TRAFFIC_DIR):
+    """The path of journal ``name`` inside ``directory``; names can't point elsewhere."""
+    if not name or os.path.basename(name) != name or name in (".", ".."):
+        raise ValueError(f"Journal name must be a plain file name, not {name!r}")
+    return os.path.join(directory, name)
+
+
+def append_entry(path, entry):
+    """Appends one exchange to the journal as a separate gzip member."""
+    line = (json.dumps(entry, default=str) + "\n").encode()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "ab") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        f.write(gzip.compress(line))
+
+
+def read_entries(path):
+    """Yields the journal's entries in order, stopping at a truncated tail."""
+    with gzip.open(path, "rt") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, OSError, ValueError):
+            return  # Cut short by a crash while recording
+
+
+# --- Responses ---
+
+
+class ReplayedResponse:
+    """A recorded response presented as the parts of ``requests.Response`` the client uses.
+
+    Reads of the body are paced so that it finishes ``body_seconds``
+    after the first read. ``wire_bytes`` is the size the body had on the
+    wire when it was recorded, which ``tell()`` can't report because the
+    body is kept decoded.
+    """
+
+    def __init__(self, url, status_code, headers, body, body_seconds=0.0, wire_bytes=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.reason = "Replayed"
+        self.raw = self
+        self.decode_content = True
+        self._body = body
+        self._offset = 0
+        self._body_seconds = body_seconds
+        self._started = None
+        self.wire_bytes = wire_bytes
+
+    def read(self, size=-1):
+        if self._started is None:
+            self._started = time.perf_counter()
+        remaining = len(self._body) - self._offset
+        if size < 0 or size > remaining:
+            size = remaining
+        chunk = self._body[self._offset:self._offset + size]
+        self._offset += len(chunk)
+        if self._body_seconds > 0 and self._body:
+            due = self._started + self._body_seconds * self._offset / len(self._body)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return chunk
+
+    def tell(self):
+        return self._offset
+
+    @property
+    def content(self):
+        self.read()
+        return self._body
+
+    @property
+    def text(self):
+        return self._body.decode(errors="replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(
+                f"{self.status_code} Error: {self.reason} for url: {self.url}", response=self
+            )
+
+    def close(self):
+        pass
+
+
+class ReplayMiss(requests.RequestException):
+    """Raised when the journal has no response for a replayed request."""
+
+
+# --- Transports ---
+
+
+class Recorder:
+    """Sends requests over the network and journals every exchange."""
+
+    def __init__(self, path):
+        self.path = path
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    def send(self, url, payload, headers, timeout, stream):
+        import reapi_client
+
+        started = time.perf_counter()
+        response = reapi_client.send_over_network(url, payload, headers, timeout, stream=True)
+        first_byte = time.perf_counter() - started
+        try:
+            body = response.content  # Decoded, as the client would read it
+        except Exception:
+            response.close()
+            raise
+        seconds = time.perf_counter() - started
+        wire_bytes = reapi_client._wire_bytes(response)
+        response.close()
+        entry = {
+            "time": time.time(),
+            "path": urlsplit(url).path,
+            "payload": redact_payload(payload),
+            "request_headers": redact_headers(headers),
+            "status": response.status_code,
+            "headers": {
+                name: value for name, value in response.headers.items()
+                if name.lower() in KEPT_HEADERS
+            },
+            "body": body.decode("utf-8", errors="replace"),
+            "first_byte_seconds": round(first_byte, 6),
+            "seconds": round(seconds, 6),
+            "wire_bytes": wire_bytes,
+        }
+        with self._lock:
+            append_entry(self.path, entry)
+            self.recorded += 1
+        return ReplayedResponse(
+            url, entry["status"], entry["headers"], body, wire_bytes=wire_bytes
+        )
+
+
+class Replayer:
+    """Answers requests from a journal, paced like the recorded responses."""
+
+    offline = True  # Nothing reaches the API, so nothing is charged
+
+    def __init__(self, path, time_scale=REPLAY_TIME_SCALE):
+        self.path = path
+        self.time_scale = time_scale
+        self._entries = defaultdict(list)
+        for entry in read_entries(path):
+            self._entries[request_key(entry["path"], entry["payload"])].append(entry)
+        self._next = defaultdict(int)
+        self._lock = threading.Lock()
+        self.replayed = 0
+        self.misses = 0
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def send(self, url, payload, headers, timeout, stream):
+        key = request_key(urlsplit(url).path, payload)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise ReplayMiss(f"No recorded response for {urlsplit(url).path} {payload}")
+            # Successive requests get successive recordings, then start over
+            entry = entries[self._next[key] % len(entries)]
+            self._next[key] += 1
+            self.replayed += 1
+        first_byte = entry.get("first_byte_seconds", 0) * self.time_scale
+        if first_byte > 0:
+            time.sleep(first_byte)
+        body_seconds = max(0.0, entry.get("seconds", 0) * self.time_scale - first_byte)
+        return ReplayedResponse(
+            url, entry["status"], entry["headers"], entry["body"].encode(), body_seconds,
+            wire_bytes=entry.get("wire_bytes"),
+        )
+
+
+def transport_from_env():
+    """The transport selected by ``REAPI_REPLAY_TRAFFIC`` or ``REAPI_RECORD_TRAFFIC``, if any."""
+    if REPLAY_NAME:
+        return Replayer(journal_path(REPLAY_NAME))
+    if RECORD_NAME:
+        return Recorder(journal_path(RECORD_NAME))
+    return None
+
+
+def render_traffic_status():
+    """Tells the session when its API traffic is being recorded or replayed."""
+    import streamlit as st
+
+    import reapi_client
+
+    transport = reapi_client._configured_transport()
+    if isinstance(transport, Recorder):
+        st.sidebar.caption(f"API traffic is being recorded ({transport.recorded:,} exchanges).")
+    elif isinstance(transport, Replayer):
+        st.sidebar.warning(
+            f"Results are replayed from a recorded journal ({transport.replayed:,} served, "
+            f"{transport.misses:,} not found), not fetched from the API."
+        )
@@ -0,0 +1,143 @@
+"""Lazy loaders for the visualization backends used by the Streamlit apps.
+
+Plotly, pydeck and st_aggrid are comparatively expensive to import and each
+rerun only needs the one behind the selected display mode, so they are
+imported on first use and shared by every session in the server process.
+
+Run ``python viz_backends.py`` to measure the cold import cost of each
+backend in a fresh interpreter.
+"""
+import importlib
+import subprocess
+import sys
+import threading
+import time
+
+import streamlit as st
+
+# Backends that are loaded on demand, keyed by the module that is imported
+BACKENDS = {
+    "plotly.express": "Charts",
+    "pydeck": "Map",
+    "st_aggrid": "Table",
+}
+
+_lock = threading.Lock()
+_modules = {}
+_import_seconds = {}
+_process_timings = {"first_rerun_seconds": None, "reruns": 0}
+
+
+def _load(name):
+    """Imports a backend module once per process and records how long it took."""
+    module = _modules.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        if name not in _modules:
+            started = time.perf_counter()
+            _modules[name] = importlib.import_module(name)
+            _import_seconds[name] = time.perf_counter() - started
+        return _modules[name]
+
+
+def plotly_express():
+    """Returns the ``plotly.express`` module, importing it on first use."""
+    return _load("plotly.express")
+
+
+def pydeck():
+    """Returns the ``pydeck`` module, importing it on first use."""
+    return _load("pydeck")
+
+
+def aggrid():
+    """Returns the ``st_aggrid`` module, importing it on first use."""
+    return _load("st_aggrid")
+
+
+# --- Rerun Timing ---
+
+
+def begin_rerun():
+    """Marks the start of a script rerun."""
+    return time.perf_counter()
+
+
+def end_rerun(started):
+    """Records the duration of the rerun that began at ``started``."""
+    elapsed = time.perf_counter() - started
+    with _lock:
+        if _process_timings["first_rerun_seconds"] is None:
+            _process_timings["first_rerun_seconds"] = elapsed
+        _process_timings["reruns"] += 1
+    if "first_rerun_seconds" not in st.session_state:
+        st.session_state.first_rerun_seconds = elapsed
+    st.session_state.last_rerun_seconds = elapsed
+
+
+def timing_report():
+    """Returns the process and backend import timings as a plain dict."""
+    with _lock:
+        return {
+            "process_first_rerun_seconds": _process_timings["first_rerun_seconds"],
+            "process_reruns": _process_timings["reruns"],
+            "backend_import_seconds": dict(_import_seconds),
+        }
+
+
+def render_timing_report():
+    """Displays cold-start, first-rerun and backend import timings."""
+    report = timing_report()
+    first = report["process_first_rerun_seconds"]
+    st.write(
+        "Server first rerun: "
+        + (f"{first * 1000:.0f} ms" if first is not None else "n/a")
+    )
+    if "first_rerun_seconds" in st.session_state:
+        st.write(
+            f"Session first rerun: {st.session_state.first_rerun_seconds * 1000:.0f} ms, "
+            f"last rerun: {st.session_state.last_rerun_seconds * 1000:.0f} ms"
+        )
+    rows = []
+    for name, mode in BACKENDS.items():
+        seconds = report["backend_import_seconds"].get(name)
+        rows.append({
+            "backend": name,
+            "display mode": mode,
+            "loaded": seconds is not None,
+            "import ms": round(seconds * 1000, 1) if seconds is not None else None,
+        })
+    st.table(rows)
+
+
+# --- Cold Import Measurement ---
+
+
+def measure_cold_import(module_name, baseline=("streamlit", "pandas")):
+    """Measures the import time of a module in a fresh interpreter, in seconds.
+
+    The baseline modules are imported first so only the incremental cost of
+    ``module_name`` is reported.
+    """
+    code = (
+        "import time\n"
+        + "".join(f"import {name}\n" for name in baseline)
+        + "started = time.perf_counter()\n"
+        + f"import {module_name}\n"
+        + "print(time.perf_counter() - started)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip())
+
+
+if __name__ == "__main__":
+    total = 0.0
+    print(f"{'backend':<16} {'mode':<8} {'cold import (ms)':>16}")
+    for name, mode in BACKENDS.items():
+        seconds = measure_cold_import(name)
+        total += seconds
+        print(f"{name:<16} {mode:<8} {seconds * 1000:>16.1f}")
+    print(f"{'all (eager)':<25} {total * 1000:>16.1f}")
@@ -2,40 +2,38 @@ import streamlit as st
 import pandas as pd
 import requests
 import json
-from st_aggrid import GridOptionsBuilder, AgGrid
-from st_aggrid.shared import GridUpdateMode, DataReturnMode
-import plotly.express as px
-import streamlit as st
-import pydeck as pdk
 
-# Function to retrieve a single page of results
+import api_metrics
+import chart_modes
+import fetch_budget
+import lead_scoring
+import result_pager
+# Plotly, pydeck and st_aggrid are loaded on first use (see viz_backends.py)
+import viz_backends
 
+rerun_started = viz_backends.begin_rerun()
+api_metrics.start_metrics_server()
+
+PAGE_SIZE = 40  # Number of results per page
+
+# Function to show a page of the current search, prefetching the next one
 
-def get_page_of_properties(filter_params, result_index=0, page_size=40):
-    url = "https://api.realestateapi.com/v2/PropertySearch"
-    headers = {
-        "accept": "application/json",
-        "content-type": "application/json",
-        "x-user-id": st.session_state.user_id,
-        "x-api-key": st.session_state.api_key
-    }
-    payload = {
-        "count": False,
-        "size": page_size,
-        "resultIndex": result_index,
-        **filter_params
-    }
 
+def show_page(pager, page):
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        return data
+        results = pager.get(page)
+    except fetch_budget.BudgetExceeded as e:
+        st.warning(str(e))
+        return
     except requests.RequestException as e:
         st.error(f"API call failed: {str(e)}")
         if hasattr(e, 'response') and e.response is not None:
             st.error(f"Response content: {e.response.text}")
-        return None
+        return
+    st.session_state.results = results
+    st.session_state.total_pages = pager.total_pages
+    st.session_state.current_page = page
+    pager.prefetch_around(page)
 
 
 # Set page config
@@ -54,6 +52,8 @@ if 'total_pages' not in st.session_state:
     st.session_state.total_pages = 1
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 1
+if 'pager' not in st.session_state:
+    st.session_state.pager = None
 
 # Streamlit UI
 st.title("Real Estate Property Search")
@@ -110,14 +110,24 @@ if st.sidebar.button("Search Properties"):
     st.session_state.search_filter = params
 
     # Fetch the first page of results
-    st.session_state.results = get_page_of_properties(params, result_index=0)
+    if st.session_state.pager is not None:
+        st.session_state.pager.close()
+    st.session_state.pager = result_pager.Pager(
+        params, st.session_state.user_id, st.session_state.api_key, page_size=PAGE_SIZE)
+    show_page(st.session_state.pager, 1)
     if st.session_state.results and 'resultCount' in st.session_state.results:
-        total_results = st.session_state.results['resultCount']
-        records_per_page = len(st.session_state.results.get('data', []))
-        st.session_state.total_pages = (
-            total_results + records_per_page - 1) // records_per_page
-        st.session_state.current_page = 1
-        st.write(f"Total Results Found: {total_results}")
+        st.write(f"Total Results Found: {st.session_state.results['resultCount']}")
+
+# Page through the results; the next page is usually already prefetched
+if st.session_state.pager is not None and st.session_state.results:
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("Previous Page", disabled=st.session_state.current_page <= 1):
+        show_page(st.session_state.pager, st.session_state.current_page - 1)
+    if next_col.button("Next Page",
+                       disabled=st.session_state.current_page >= st.session_state.total_pages):
+        show_page(st.session_state.pager, st.session_state.current_page + 1)
+    page_col.caption(
+        f"Page {st.session_state.current_page} of {st.session_state.total_pages}")
 
 # Display results
 if st.session_state.results:
@@ -141,7 +151,13 @@ if st.session_state.results:
 
     # Check specifically if DataFrame is empty
     if not df.empty:
+        # Weighted lead score (see lead_scoring.py), shown as the first column
+        df.insert(0, lead_scoring.SCORE_COLUMN, lead_scoring.score(df).round(1))
+
         # Using Ag-Grid to display data
+        st_aggrid = viz_backends.aggrid()
+        GridOptionsBuilder, AgGrid = st_aggrid.GridOptionsBuilder, st_aggrid.AgGrid
+        DataReturnMode, GridUpdateMode = st_aggrid.DataReturnMode, st_aggrid.GridUpdateMode
         gb = GridOptionsBuilder.from_dataframe(df)
         gb.configure_pagination(paginationAutoPageSize=True)  # Add pagination
         gb.configure_side_bar()  # Enable sidebar for pivot and other options.
@@ -174,6 +190,8 @@ if st.session_state.results:
         )
 # Ensure your DataFrame is up to date
 if st.session_state.results:
+    px = viz_backends.plotly_express()
+    pdk = viz_backends.pydeck()
     df = pd.DataFrame(display_data)
 
     # Counting relevant distressed properties
@@ -243,25 +261,28 @@ if st.session_state.results:
 if st.session_state.results:
     df = pd.DataFrame(display_data)
 
-    # Creating a scatter plot for Equity vs Property Value
+    # Creating a scatter plot for Equity vs Property Value (WebGL or a
+    # binned density image once there are many points)
     if 'estimatedEquity' in df.columns and 'estimatedValue' in df.columns:
-        fig = px.scatter(df, x="estimatedValue", y="equity",
-                         size='squareFeet', color='propertyType',
-                         hover_name='address_street', log_x=True, size_max=60)
+        fig, mode = chart_modes.scatter_figure(
+            px, df, x="estimatedValue", y="estimatedEquity",
+            size='squareFeet', color='propertyType',
+            hover_name='address_street', log_x=True, size_max=60)
 
         fig.update_layout(title="Equity vs. Property Value",
                           xaxis_title="Estimated Property Value (USD)",
                           yaxis_title="Equity (USD)")
 
         st.plotly_chart(fig)
+        st.caption(chart_modes.describe_mode(mode, len(df)))
 
 # Debug: Display constructed API call
 st.header("Constructed API Call Debugging Info")
 if 'search_filter' in st.session_state:
     payload = {
         "count": False,
-        "size": 50,
-        "resultIndex": (st.session_state.current_page - 1) * 10,
+        "size": PAGE_SIZE,
+        "resultIndex": result_pager.page_offset(st.session_state.current_page, PAGE_SIZE),
         **st.session_state.search_filter
     }
     formatted_payload = json.dumps(payload, indent=4)
@@ -273,10 +294,19 @@ if 'search_filter' in st.session_state:
         "accept": "application/json",
         "content-type": "application/json",
         "x-user-id": "{st.session_state.user_id}",
-        "x-api-key": "{st.session_state.api_key}"
+        "x-api-key": "YOUR_API_KEY"  # Never echo the real key
     }}
     payload = {formatted_payload}
 
     response = requests.post(url, json=payload, headers=headers)
     print(response.json())
     """)
+
+with st.sidebar.expander("Startup Timing"):
+    viz_backends.render_timing_report()
+with st.sidebar.expander("Page Cache"):
+    result_pager.render_pager_stats(st.session_state.pager)
+with st.sidebar.expander("API Diagnostics"):
+    api_metrics.render_diagnostics_panel()
+
+viz_backends.end_rerun(rerun_started)